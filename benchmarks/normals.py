@@ -0,0 +1,94 @@
+"""
+Compares the vectorized compute_vertex_normals with the old per face loop
+on the largest SHP found (or the one given on the command line).
+
+    python -m benchmarks.normals [path/to/file.SHP]
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.Reader import Reader
+from src.SHP import SHP
+from src.VSTOOLS import compute_vertex_normals
+
+OBJ_DIR = "VagrantStory_data/OBJ"
+
+
+def compute_vertex_normals_loop(positions, indices, face_sizes):
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    normals = np.zeros_like(positions, dtype=np.float32)
+
+    idx = 0
+    for size in face_sizes:
+        face = indices[idx:idx + size]
+        idx += size
+
+        if size == 3:
+            tris = [face]
+        else:
+            tris = [
+                (face[0], face[1], face[2]),
+                (face[0], face[2], face[3])
+            ]
+
+        for i0, i1, i2 in tris:
+            v0, v1, v2 = positions[i0], positions[i1], positions[i2]
+            face_normal = np.cross(v1 - v0, v2 - v0)
+
+            normals[i0] += face_normal
+            normals[i1] += face_normal
+            normals[i2] += face_normal
+
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    normals /= lengths[:, None]
+
+    return normals.flatten()
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        files = glob.glob(os.path.join(OBJ_DIR, "*.SHP"))
+        if not files:
+            sys.exit("No SHP files in {}".format(OBJ_DIR))
+        path = max(files, key=os.path.getsize)
+
+    with open(path, "rb") as f:
+        shp = SHP(Reader(f.read()))
+    shp.read()
+    shp.build()
+
+    positions = shp.geometry.attributes["positions"]
+    indices = shp.geometry.attributes["indices"]
+    face_sizes = [3] * (len(indices) // 3)
+
+    expected = compute_vertex_normals_loop(positions, indices, face_sizes)
+    actual = compute_vertex_normals(positions, indices, face_sizes)
+    if not np.allclose(expected, actual, atol=1e-5):
+        sys.exit("Vectorized normals differ from the loop")
+
+    loop = best_of(lambda: compute_vertex_normals_loop(positions, indices, face_sizes))
+    vectorized = best_of(lambda: compute_vertex_normals(positions, indices, face_sizes))
+
+    print("{}: {} vertices, {} triangles".format(path, len(positions) // 3, len(face_sizes)))
+    print("loop        {:8.2f} ms".format(loop * 1000))
+    print("vectorized  {:8.2f} ms  ({:.0f}x)".format(vectorized * 1000, loop / vectorized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Startup budget for main.py: the -X importtime total of "import main" and
+the time from launch to the viewport's first frame, median of a few runs.
+
+    python -m benchmarks.startup [--runs 5] [--imports-only]
+
+The first paint run starts main.py with VSTOOL_EXIT_AFTER_PAINT=1, which
+prints "first paint" after the first frame and quits. Exits non zero when
+a median is over its budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# milliseconds
+IMPORT_BUDGET = 400
+FIRST_PAINT_BUDGET = 1500
+
+PAINT_TIMEOUT = 60
+
+
+def import_times(module="main"):
+    """
+    Summed self time of every import, in ms, and {import made by module: cumulative ms}
+    for one fresh interpreter importing module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        sys.exit("import {} failed:\n{}".format(module, result.stderr.strip().splitlines()[-1]))
+
+    total = 0
+    direct = {}
+    children = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+
+        # nested imports are indented two spaces per level and listed
+        # before the import that made them, so the level 1 rows seen since
+        # the last top level row belong to that row (site, encodings, module)
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            children[name.strip()] = int(cumulative_us) / 1000
+        elif level == 0:
+            if name.strip() == module:
+                direct = children
+            children = {}
+
+    return total / 1000, direct
+
+
+def first_paint():
+    """ms from launching main.py until it reports its first frame"""
+    env = dict(os.environ, VSTOOL_EXIT_AFTER_PAINT="1")
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+
+    elapsed = None
+    for line in process.stdout:
+        if line.strip() == "first paint":
+            elapsed = (time.perf_counter() - start) * 1000
+            break
+
+    try:
+        _, errors = process.communicate(timeout=PAINT_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        _, errors = process.communicate()
+
+    if elapsed is None:
+        sys.exit("main.py exited without painting:\n{}".format(errors.strip()))
+    return elapsed
+
+
+def report(label, values, budget):
+    median = statistics.median(values)
+    status = "ok" if median <= budget else "OVER BUDGET"
+    print("{:<12} {:8.1f} ms  (min {:.1f}, budget {} ms)  {}".format(label, median, min(values), budget, status))
+    return median <= budget
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports of main to list")
+    parser.add_argument("--imports-only", action="store_true", help="skip the first paint runs, no display needed")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, direct = import_times()
+        totals.append(total)
+
+    ok = report("import main", totals, IMPORT_BUDGET)
+
+    slowest = sorted(direct.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for name, cumulative in slowest:
+        print("    {:<32} {:8.1f} ms".format(name, cumulative))
+
+    if not args.imports_only:
+        paints = [first_paint() for _ in range(args.runs)]
+        ok = report("first paint", paints, FIRST_PAINT_BUDGET) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
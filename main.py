@@ -3,28 +3,44 @@ import sys
 import uuid
 import glob
 
-from PIL.ImageQt import ImageQt
-from PySide6.QtCore import Qt, QTimer, QFile, QTextStream
+from PySide6.QtCore import Qt, QTimer, QFile, QTextStream, QThread, Signal
 from PySide6.QtGui import  QFontDatabase
 from PySide6.QtWidgets import (
     QApplication, QMainWindow,
     QVBoxLayout, QGroupBox,
      QLabel, QCheckBox, QGridLayout,
     QSpinBox, QFileDialog,
-    QScrollArea)
+    QScrollArea, QLineEdit)
 from ui_elements.ui_elements import *
 from src.MPD import MPD
 from src.OpenGLViewer import GLViewport
 from src.Reader import Reader
+from src.export_manifest import ExportManifest
 from src.SEQ import SEQ
 from src.SHP import SHP
 from src.VSTOOLS import bytearray_to_image, export_png
 from src.WEP import WEP
 from src.ZND import ZND
+from src import catalogue
 from src.vs_strings import HUD_TEXT
 
+# Exporters, PIL and the fbx SDK are imported where they are first used,
+# see benchmarks/startup.py for the startup budget.
+
 SEQ_TO_DEG = 360.0 / 4096.0
 
+# the viewer builds the FBX meshes, so its code versions the outputs too
+MANIFEST_MODULES = ("main", "src.OpenGLViewer", "src.GLUpload")
+
+
+class CatalogueScan(QThread):
+    """Probes the SHP/WEP headers off the GUI thread"""
+    scanned = Signal(dict)
+
+    def run(self):
+        # inline, a process pool is not worth starting from inside the GUI
+        self.scanned.emit(catalogue.scan(workers=0))
+
 
 
 class MainWindow(QMainWindow):
@@ -42,6 +58,8 @@ class MainWindow(QMainWindow):
 
         main_layout = QHBoxLayout(central)
         self.map_names = json.load(open('VagrantStory_data/level_map_names.json'))
+        # filled by CatalogueScan, the selectors show stats once it is done
+        self.catalogue = {}
         # Viewport placeholder
         viewport = QWidget()
         viewport.setStyleSheet("background-color: #202020;")
@@ -69,6 +87,7 @@ class MainWindow(QMainWindow):
             self.viewport
         )
         self.opened_file = None
+        self.source_paths = []
 
         # Sidebar
         sidebar = QWidget()
@@ -86,6 +105,19 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(sidebar)
         main_layout.addWidget(viewport)
 
+        self.catalogue_scan = CatalogueScan(self)
+        self.catalogue_scan.scanned.connect(self.set_catalogue)
+        self.catalogue_scan.start()
+
+    def set_catalogue(self, entries):
+        self.catalogue = entries
+        self.weapon_selector.refresh()
+        self.character_selector.refresh()
+
+    def closeEvent(self, event):
+        self.catalogue_scan.wait()
+        super().closeEvent(event)
+
     # ---------- Panels ----------
 
     def selector_panel(self):
@@ -101,8 +133,29 @@ class MainWindow(QMainWindow):
         layout.addWidget(QLabel('Characters'))
         layout.addWidget(self.character_selector)
 
+        sort_combo = QComboBox()
+        sort_combo.addItems(catalogue.SORT_KEYS.keys())
+        sort_combo.currentTextChanged.connect(self.sort_selectors)
+        layout.addWidget(QLabel('Sort by'))
+        layout.addWidget(sort_combo)
+
+        filter_edit = QLineEdit()
+        filter_edit.setPlaceholderText('name, bones>10, polygons<500')
+        filter_edit.setClearButtonEnabled(True)
+        filter_edit.textChanged.connect(self.filter_selectors)
+        layout.addWidget(QLabel('Filter'))
+        layout.addWidget(filter_edit)
+
         return box
 
+    def sort_selectors(self, key):
+        self.weapon_selector.sort_by(key)
+        self.character_selector.sort_by(key)
+
+    def filter_selectors(self, text):
+        self.weapon_selector.filter_by(text)
+        self.character_selector.filter_by(text)
+
     def file_panel(self):
         box = QGroupBox("File")
         layout = QVBoxLayout(box)
@@ -237,7 +290,17 @@ class MainWindow(QMainWindow):
         bt_export_fbx = QPushButton('Export FBX')
         layout.addWidget(bt_export_fbx)
         bt_export_fbx.clicked.connect(self.export_to_fbx)
-        layout.addWidget(QPushButton("Export OBJ"))
+        bt_export_glb = QPushButton('Export GLB')
+        layout.addWidget(bt_export_glb)
+        bt_export_glb.clicked.connect(self.export_to_glb)
+        bt_export_obj = QPushButton("Export OBJ")
+        layout.addWidget(bt_export_obj)
+        bt_export_obj.clicked.connect(self.export_to_obj)
+        self.checkbox_atlas = QCheckBox('Room texture atlas')
+        layout.addWidget(self.checkbox_atlas)
+        bt_export_cache = QPushButton('Export Vertex Cache')
+        layout.addWidget(bt_export_cache)
+        bt_export_cache.clicked.connect(self.export_vertex_cache)
         layout.addWidget(
             QLabel(
                 "Exports the geometry as is,\nwithout skeleton and animations.",
@@ -251,6 +314,15 @@ class MainWindow(QMainWindow):
             asset_type = "weapons"
             file_name = self.weapon_selector.combo.currentText().casefold().replace(" ", "_")
             folder_path = "{}/{}".format(asset_type, file_name)
+
+            kind = "character" if isinstance(self.opened_file, SHP) else "weapon"
+            key = "{}/{}.fbx".format(file_name, file_name)
+            manifest = ExportManifest(asset_type, MANIFEST_MODULES)
+            if manifest.is_current(key, self.source_paths, kind, "fbx"):
+                self.statusBar().showMessage("{}/{} is up to date, nothing exported".format(asset_type, key), 5000)
+                return
+
+            written = []
             for i_texture, texture in enumerate(self.opened_file.texture_map.textures):
                 if not os.path.exists(asset_type):
                     os.mkdir(asset_type)
@@ -258,9 +330,12 @@ class MainWindow(QMainWindow):
                 if not os.path.exists(folder_path):
                     os.mkdir(folder_path)
 
-                export_png(texture['data'], self.opened_file.texture_map.get_width(), texture['height'],
-                           "{}/{}_{}.png".format(folder_path, file_name, i_texture), False)
-            self.viewport.export_fbx_scene("{}/{}.fbx".format(folder_path, file_name))
+                written.append(export_png(texture['data'], self.opened_file.texture_map.get_width(), texture['height'],
+                                          "{}/{}_{}.png".format(folder_path, file_name, i_texture), False))
+            self.show_key_counts(self.viewport.export_fbx_scene("{}/{}.fbx".format(folder_path, file_name)))
+
+            manifest.record(key, self.source_paths, kind, "fbx", None, written + ["{}/{}.fbx".format(folder_path, file_name)])
+            manifest.save()
             return
         elif isinstance(self.opened_file, MPD):
             asset_type = "levels"
@@ -269,27 +344,93 @@ class MainWindow(QMainWindow):
 
             folder_path = "{}/{}/{}".format(asset_type, "".join(self.get_map_name(element='area').title().split()),
                                             file_name)
+
+            key = "{}/{}.fbx".format(os.path.relpath(folder_path, asset_type).replace(os.sep, "/"), file_name)
+            options = {"atlas": True} if self.checkbox_atlas.isChecked() else None
+            manifest = ExportManifest(asset_type, MANIFEST_MODULES)
+            if manifest.is_current(key, self.source_paths, "map", "fbx", options):
+                self.statusBar().showMessage("{}/{} is up to date, nothing exported".format(asset_type, key), 5000)
+                return
+
+            # rooms share the area's textures folder, so the atlas is named after the room
+            room = self.export_asset("{}_atlas".format(file_name))
+
             exported_textures = []
+            written = []
 
             os.makedirs(folder_path, exist_ok=True)
-            for imesh, mesh in enumerate(self.opened_file.meshes):
+            for imesh, mesh in enumerate(room.meshes):
 
                 material = mesh.material
-                if material['data'] not in exported_textures:
+                if material is not None and material['data'] not in exported_textures:
                     exported_textures.append(material['data'])
-                    export_png(material['data'], material['width'], material['height'],
-                               "{}/{}/textures/{}-{}.png".format(asset_type, "".join(
-                                   self.get_map_name(element='area').title().split()), mesh.texture_id, mesh.clut_id),
-                               False)
-
-            self.viewport.export_fbx_scene("{}/{}.fbx".format(folder_path, file_name))
+                    written.append(export_png(material['data'], material['width'], material['height'],
+                                              "{}/{}/textures/{}.png".format(asset_type, "".join(
+                                                  self.get_map_name(element='area').title().split()), mesh.material_id),
+                                              False))
+
+            if room is self.opened_file:
+                self.viewport.export_fbx_scene("{}/{}.fbx".format(folder_path, file_name))
+            else:
+                # the viewport holds the room's own materials, the atlased copy is exported directly
+                from src.FBX_exporter import export_fbx_scene
+                from src.V3DClasses import SceneMesh
+                export_fbx_scene("{}/{}.fbx".format(folder_path, file_name), SceneMesh.from_mpd(room))
+
+            manifest.record(key, self.source_paths, "map", "fbx", options, written + ["{}/{}.fbx".format(folder_path, file_name)])
+            manifest.save()
             return
         else:
             export_path = QFileDialog.getSaveFileName(self, 'Save FBX', "", "FBX *.fbx")
             if export_path[0]:
-                self.viewport.export_fbx_scene(export_path[0])
+                self.show_key_counts(self.viewport.export_fbx_scene(export_path[0]))
             return
 
+    def show_key_counts(self, counts):
+        if counts:
+            from src.FBX_exporter import describe_key_counts
+            self.statusBar().showMessage("FBX exported, {}".format(describe_key_counts(counts)), 5000)
+
+    def export_to_obj(self):
+        if not isinstance(self.opened_file, (MPD, WEP)):
+            return
+
+        export_path = QFileDialog.getSaveFileName(self, 'Save OBJ', "", "Wavefront OBJ *.obj")
+        if export_path[0]:
+            from src.OBJexporter import export_obj_scene
+            export_obj_scene(export_path[0], self.export_asset())
+
+    def export_asset(self, atlas_id="atlas"):
+        """The opened file, or a room with its textures baked into one atlas material named atlas_id."""
+        if isinstance(self.opened_file, MPD) and self.checkbox_atlas.isChecked():
+            from src.atlas import bake_room_atlas
+            return bake_room_atlas(self.opened_file, material_id=atlas_id)
+        return self.opened_file
+
+    def export_to_glb(self):
+        if not isinstance(self.opened_file, (MPD, WEP)):
+            return
+
+        export_path = QFileDialog.getSaveFileName(self, 'Save GLB', "", "glTF binary *.glb")
+        if not export_path[0]:
+            return
+
+        animations = None
+        if isinstance(self.opened_file, SHP) and self.viewport.activeSEQ:
+            animations = self.viewport.activeSEQ.animations
+
+        from src import GLTF_exporter
+        GLTF_exporter.export_glb(export_path[0], self.export_asset(), animations)
+
+    def export_vertex_cache(self):
+        if not isinstance(self.opened_file, SHP) or not self.viewport.activeSEQ:
+            return
+
+        export_path = QFileDialog.getSaveFileName(self, 'Save Vertex Cache', "", "Vertex cache manifest *.json")
+        if export_path[0]:
+            from src import vertex_cache
+            vertex_cache.export_vertex_cache(self.opened_file, self.viewport.activeSEQ.animations, export_path[0])
+
     def get_map_name(self, map_file=None, element=None):
         if not map_file:
             map_file = os.path.basename(self.current_path)
@@ -318,6 +459,16 @@ class MainWindow(QMainWindow):
             data = f.read()
         if 'mpd' in path.lower():
             self.current_path = path
+
+        # files the opened asset is built from, for the export manifest,
+        # a newly loaded SEQ or ZND replaces the one loaded before
+        if file_type in ('MPD', 'SHP', 'WEP'):
+            self.source_paths = []
+        self.source_paths = [
+            p for p in self.source_paths if os.path.splitext(p)[1].upper() != os.path.splitext(path)[1].upper()
+        ]
+        self.source_paths.append(path)
+
         return Reader(data)
 
     def open_mpd(self, path=None, zndpath=None):
@@ -337,6 +488,8 @@ class MainWindow(QMainWindow):
 
         self.opened_file = mpd
 
+        from PIL.ImageQt import ImageQt
+
         mesh_batches = []
         materials_used = []
         counter = 0
@@ -422,6 +575,8 @@ class MainWindow(QMainWindow):
 
         self.opened_file = shp
 
+        from PIL.ImageQt import ImageQt
+
         for i_texture, texture in enumerate(shp.texture_map.textures):
             qim = ImageQt(bytearray_to_image(texture['data'], shp.texture_map.get_width(), texture['height']))
             pix = QPixmap.fromImage(qim)
@@ -453,6 +608,8 @@ class MainWindow(QMainWindow):
 
         self.opened_file = wep
 
+        from PIL.ImageQt import ImageQt
+
         for i_texture, texture in enumerate(wep.texture_map.textures):
             qim = ImageQt(bytearray_to_image(texture['data'], wep.texture_map.get_width(), texture['height']))
             pix = QPixmap.fromImage(qim)
@@ -526,5 +683,14 @@ if __name__ == "__main__":
     stream = QTextStream(file)
     app.setStyleSheet(stream.readAll())
     win = MainWindow()
+
+    if os.environ.get("VSTOOL_EXIT_AFTER_PAINT"):
+        # startup benchmark: report the first frame of the viewport and quit
+        def first_paint():
+            print("first paint", flush=True)
+            app.quit()
+
+        win.viewport.frameSwapped.connect(first_paint)
+
     win.show()
     sys.exit(app.exec())
@@ -0,0 +1,246 @@
+"""
+BVH export for SEQ animations on an SHP skeleton.
+
+Batch mode exports every animation of the given SEQs, one BVH each:
+
+    python -m src.BVH_exporter CHARACTER.SHP [ANIM.SEQ ...] [-o OUT] [-j WORKERS]
+    python -m src.BVH_exporter --all VagrantStory_data/OBJ [-o OUT] [-j WORKERS]
+
+Without SEQ arguments the SEQs next to the SHP sharing its prefix are used,
+like the viewer's autoload. --all does that for every SHP in the folder.
+"""
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.Reader import Reader
+from src.SEQ import SEQ
+from src.SHP import SHP
+
+IDENTITY_QUAT = (0.0, 0.0, 0.0, 1.0)
+
+
+def write_bvh_joint(f, bone_id, indent, bones, children, offsets, is_root):
+    tab = "  " * indent
+    name = bones[bone_id].name
+
+    if is_root:
+        f.write(f"{tab}ROOT {name}\n")
+    else:
+        f.write(f"{tab}JOINT {name}\n")
+
+    f.write(f"{tab}{{\n")
+
+    ox, oy, oz = offsets[bone_id]
+    f.write(f"{tab}  OFFSET {ox:.6f} {oy:.6f} {oz:.6f}\n")
+
+    if is_root:
+        f.write(f"{tab}  CHANNELS 6 Xposition Yposition Zposition Zrotation Yrotation Xrotation\n")
+    else:
+        f.write(f"{tab}  CHANNELS 3 Zrotation Yrotation Xrotation\n")
+
+    for child in children[bone_id]:
+        write_bvh_joint(f, child, indent + 1, bones, children, offsets, False)
+
+    if not children[bone_id]:
+        f.write(f"{tab}  End Site\n")
+        f.write(f"{tab}  {{\n")
+        f.write(f"{tab}    OFFSET 0 0 0\n")
+        f.write(f"{tab}  }}\n")
+
+    f.write(f"{tab}}}\n")
+
+
+def index_tracks(tracks):
+    """{(bone, type): track}, SEQAnimation.build keeps one as track_index"""
+    if isinstance(tracks, dict):
+        return tracks
+    return {(track["bone"], track["type"]): track for track in tracks}
+
+
+def get_rotation_at_time(tracks, bone_id, t):
+    """
+    Value of the first key at or after t, the last one past the end.
+    t can be a scalar or an array of times, the result is (4,) or (T, 4).
+    """
+    track = index_tracks(tracks).get((bone_id, "rotation"))
+    t = np.asarray(t, dtype=np.float64)
+
+    if track is None or not len(track["times"]):
+        return np.broadcast_to(np.array(IDENTITY_QUAT), t.shape + (4,))
+
+    times = np.asarray(track["times"], dtype=np.float64)
+    values = np.asarray(track["values"], dtype=np.float64)
+
+    i = np.minimum(np.searchsorted(times, t, side="left"), len(times) - 1)
+    return values[i]
+
+
+def quat_to_euler_zyx(q):
+    """
+    (..., 4) quaternions (x, y, z, w) to ZYX Euler angles in degrees,
+    returned as (rz, ry, rx), each shaped like q[..., 0].
+    """
+    q = np.asarray(q, dtype=np.float64)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+
+    # ZYX order
+    t0 = +2.0 * (w * z + x * y)
+    t1 = +1.0 - 2.0 * (y * y + z * z)
+    rz = np.arctan2(t0, t1)
+
+    t2 = +2.0 * (w * y - z * x)
+    ry = np.arcsin(np.clip(t2, -1.0, 1.0))
+
+    t3 = +2.0 * (w * x + y * z)
+    t4 = +1.0 - 2.0 * (x * x + y * y)
+    rx = np.arctan2(t3, t4)
+
+    return (
+        np.degrees(rz),
+        np.degrees(ry),
+        np.degrees(rx),
+    )
+
+
+def export_bvh(animation, filename, skeleton, fps=30):
+    frame_time = 1.0 / fps
+    num_frames = animation.length
+    num_bones = len(skeleton.bones)
+
+    children = [np.flatnonzero(skeleton.parents == i).tolist() for i in range(num_bones)]
+    tracks = getattr(animation, "track_index", None) or index_tracks(animation.tracks)
+
+    # track times are SEQ frames scaled by the SEQ time scale
+    time_scale = getattr(animation.seq, "time_scale", 1.0)
+    times = np.arange(num_frames) * time_scale
+
+    # (frames, bones, 4) -> (frames, bones, 3) as Z Y X
+    rotations = np.stack([get_rotation_at_time(tracks, bone_id, times) for bone_id in range(num_bones)], axis=1)
+    euler = np.stack(quat_to_euler_zyx(rotations), axis=-1)
+
+    # root position channels stay at the origin
+    motion = np.concatenate([np.zeros((num_frames, 3)), euler.reshape(num_frames, -1)], axis=1)
+
+    with open(filename, "w") as f:
+        # --- HIERARCHY ---
+        f.write("HIERARCHY\n")
+
+        root = 0
+        write_bvh_joint(
+            f,
+            root,
+            0,
+            skeleton.bones,
+            children,
+            skeleton.positions,
+            True,
+        )
+
+        # --- MOTION ---
+        f.write("MOTION\n")
+        f.write(f"Frames: {num_frames}\n")
+        f.write(f"Frame Time: {frame_time:.6f}\n")
+
+        if num_frames:
+            line = " ".join(["%.6f"] * motion.shape[1]) + "\n"
+            f.write((line * num_frames) % tuple(motion.ravel().tolist()))
+
+
+# ───────────────────────── batch ─────────────────────────
+
+def read_file(cls, path):
+    with open(path, "rb") as f:
+        obj = cls(Reader(f.read()))
+    obj.read()
+    obj.build()
+    return obj
+
+
+def find_seqs(shp_path):
+    """SEQs sharing the SHP's file prefix, e.g. 01.SHP -> 01_COM.SEQ, 01_BT1.SEQ"""
+    folder, name = os.path.split(shp_path)
+    prefix = os.path.splitext(name)[0]
+    return sorted(
+        p for p in glob.glob(os.path.join(folder, prefix + "*"))
+        if p.upper().endswith(".SEQ")
+    )
+
+
+def export_seq(shp_path, seq_path, output_dir, fps=30):
+    """Writes every animation of seq_path, returns the written paths."""
+    shp = read_file(SHP, shp_path)
+    seq = read_file(SEQ, seq_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(seq_path))[0]
+
+    written = []
+    for anim_id, animation in enumerate(seq.animations):
+        path = os.path.join(output_dir, f"{name}_{anim_id:02d}.bvh")
+        export_bvh(animation, path, shp.Skeleton, fps)
+        written.append(path)
+
+    return written
+
+
+def export_batch(jobs, output_dir, workers=None, fps=30):
+    """
+    jobs: [(shp_path, seq_path)], one pool task per SEQ.
+    Returns the number of BVH files written.
+    """
+    total = 0
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(export_seq, shp_path, seq_path, output_dir, fps): seq_path
+            for shp_path, seq_path in jobs
+        }
+
+        for done, future in enumerate(as_completed(futures), 1):
+            seq_path = futures[future]
+            try:
+                written = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(jobs)}] {seq_path}: {e}", file=sys.stderr)
+                continue
+
+            total += len(written)
+            print(f"[{done}/{len(jobs)}] {seq_path}: {len(written)} animations")
+
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.BVH_exporter", description="Export SEQ animations to BVH.")
+    parser.add_argument("shp", nargs="?", help="character SHP")
+    parser.add_argument("seq", nargs="*", help="SEQ files, defaults to the ones sharing the SHP prefix")
+    parser.add_argument("--all", metavar="DIR", help="export every SHP in DIR with its SEQs")
+    parser.add_argument("-o", "--output", default="bvh", help="output folder")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    if args.all:
+        shps = sorted(p for p in glob.glob(os.path.join(args.all, "*")) if p.upper().endswith(".SHP"))
+        jobs = [(shp, seq) for shp in shps for seq in find_seqs(shp)]
+    elif args.shp:
+        jobs = [(args.shp, seq) for seq in (args.seq or find_seqs(args.shp))]
+    else:
+        parser.error("give an SHP or --all DIR")
+
+    if not jobs:
+        print("No SEQ files found")
+        return 1
+
+    total = export_batch(jobs, args.output, args.workers, args.fps)
+    print(f"{total} BVH files written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,46 @@
-import math
 import numpy as np
 import fbx
 from collections import defaultdict
 
+from src.VSTOOLS import quat_slerp_array, reduce_keys, sample_quat_track, weld
+from src.BVH_exporter import quat_to_euler_zyx
+
+# curve reduction tolerances, degrees for rotations, file units otherwise
+KEY_TOLERANCE = {
+    "rotation": 0.05,
+    "scale": 1e-4,
+    "translation": 1e-3,
+}
 
-def add_skinning(scene, fbx_mesh, skinned_mesh, bone_nodes):
-    skin = fbx.FbxSkin.Create(scene, "Skin")
 
-    geom = skinned_mesh.geometry
-    skin_indices = geom.attributes["skin_index"]
-    skin_weights = geom.attributes["skin_weight"]
+def add_skinning(scene, fbx_mesh, mesh_node, skeleton, bone_nodes, skin_indices, skin_weights):
+    """
+    skin_indices / skin_weights are (control points, 4), aligned with the
+    control points of fbx_mesh. mesh_node and the bone nodes must already
+    sit in the scene, their global transforms are the bind pose.
+    """
+    skin = fbx.FbxSkin.Create(scene, "Skin")
 
-    mesh_node = fbx_mesh.GetNode()
+    skin_indices = np.asarray(skin_indices).astype(np.int64)
+    skin_weights = np.asarray(skin_weights, dtype=np.float64)
 
-    mesh_global = fbx.FbxAMatrix()
-    mesh_global.SetIdentity()
+    mesh_global = mesh_node.EvaluateGlobalTransform()
 
-    for bone_idx, bone in enumerate(skinned_mesh.Skeleton.bones):
+    for bone_idx, bone in enumerate(skeleton.bones):
         bone_node = bone_nodes[bone]
 
         cluster = fbx.FbxCluster.Create(scene, bone.name)
         cluster.SetLink(bone_node)
         cluster.SetLinkMode(fbx.FbxCluster.ELinkMode.eNormalize)
 
-        for v in range(len(skin_indices)):
-            for i in range(4):
-                idx = int(skin_indices[v, i])
-                w = float(skin_weights[v, i])
-                if idx == bone_idx and w > 0.0:
-                    cluster.AddControlPointIndex(v, w)
+        vertices, slots = np.nonzero((skin_indices == bone_idx) & (skin_weights > 0.0))
+        for v, w in zip(vertices.tolist(), skin_weights[vertices, slots].tolist()):
+            cluster.AddControlPointIndex(v, w)
 
         bone_global = bone_node.EvaluateGlobalTransform()
 
-        cluster.SetTransformMatrix(mesh_global)  # IDENTITY
-        cluster.SetTransformLinkMatrix(bone_global)  # REAL bind pose
+        cluster.SetTransformMatrix(mesh_global)
+        cluster.SetTransformLinkMatrix(bone_global)
 
         skin.AddCluster(cluster)
 
@@ -70,42 +77,110 @@ def build_fbx_skeleton(scene, skeleton):
     return bone_nodes
 
 
-def flatten_mesh(mesh):
-    new_vertices = []
-    new_uvs = []
-    new_colors = []
-    new_faces = []
+def mesh_corners(mesh):
+    """
+    Packs every face corner of a GL mesh into one row
+    [x, y, z, (u, v), (r, g, b)]. Returns the rows, face sizes and the
+    source vertex index of every corner.
+    """
+    if isinstance(mesh.faces, np.ndarray):
+        sizes = np.full(len(mesh.faces), mesh.faces.shape[1], dtype=np.int64)
+        corners = mesh.faces.reshape(-1, 2).astype(np.int64)
+    else:
+        sizes = np.array([len(face) for face in mesh.faces], dtype=np.int64)
+        corners = np.array([c for face in mesh.faces for c in face], dtype=np.int64).reshape(-1, 2)
+    v_idx, uv_idx = corners[:, 0], corners[:, 1]
+
+    columns = [np.asarray(mesh.vertices, dtype=np.float64).reshape(-1, 3)[v_idx]]
+
+    if mesh.uvs is not None and len(mesh.uvs):
+        columns.append(np.asarray(mesh.uvs, dtype=np.float64).reshape(-1, 2)[uv_idx])
+
+    if mesh.colors is not None and len(mesh.colors):
+        colors = np.asarray(mesh.colors, dtype=np.float64)
+        columns.append(colors.reshape(len(colors), -1)[v_idx])
+
+    return np.hstack(columns), sizes, v_idx
+
+
+def set_curve(curve, frames, values, fps):
+    curve.KeyModifyBegin()
+    for frame, value in zip(frames.tolist(), values.tolist()):
+        time = fbx.FbxTime()
+        time.SetSecondDouble(frame / fps)
+        key = curve.KeyAdd(time)[0]
+        curve.KeySetValue(key, value)
+        curve.KeySetInterpolation(key, fbx.FbxAnimCurveDef.EInterpolationType.eInterpolationLinear)
+    curve.KeyModifyEnd()
+    return len(frames)
+
+
+def add_curves(prop, layer, values, fps, tolerance):
+    """one reduced curve per X, Y, Z channel of (frames, 3) values"""
+    written = 0
+    for channel, name in enumerate(("X", "Y", "Z")):
+        curve = prop.GetCurve(layer, name, True)
+        frames = reduce_keys(values[:, channel], tolerance)
+        written += set_curve(curve, frames, values[frames, channel], fps)
+    return written
+
+
+def add_animation_stacks(scene, skeleton, bone_nodes, animations, fps=30, key_tolerance=None):
+    """
+    One animation stack per SEQ animation, from its baked pose.
+    key_tolerance overrides KEY_TOLERANCE per channel type, None for a type
+    keeps every frame.
+    Returns [(stack name, keys written, keys baked)], one per animation.
+    """
+    tolerance = dict(KEY_TOLERANCE, **(key_tolerance or {}))
+    bones = skeleton.bones
+    counts = []
+
+    for anim_id, animation in enumerate(animations):
+        pose = animation.bake()
+        num_frames = len(pose["rotation"])
+        num_bones = min(len(bones), pose["rotation"].shape[1])
+
+        stack = fbx.FbxAnimStack.Create(scene, f"anim{anim_id:02d}")
+        layer = fbx.FbxAnimLayer.Create(scene, "Base Layer")
+        stack.AddMember(layer)
+
+        stop = fbx.FbxTime()
+        stop.SetSecondDouble(max(num_frames - 1, 0) / fps)
+        stack.SetLocalTimeSpan(fbx.FbxTimeSpan(fbx.FbxTime(0), stop))
 
-    vert_map = {}  # (v_idx, uv_idx) -> new index
+        # LclRotation is XYZ order, rotation = Rz * Ry * Rx
+        rz, ry, rx = quat_to_euler_zyx(pose["rotation"][:, :num_bones])
+        euler = np.degrees(np.unwrap(np.radians(np.stack([rx, ry, rz], axis=-1)), axis=0))
 
-    for face in mesh.faces:
-        new_face = []
-        for v_idx, uv_idx in face:
-            key = (v_idx, uv_idx)
+        keys = 0
+        for bone_id in range(num_bones):
+            node = bone_nodes[bones[bone_id]]
+            keys += add_curves(node.LclRotation, layer, euler[:, bone_id], fps, tolerance["rotation"])
 
-            if key not in vert_map:
-                vert_map[key] = len(new_vertices)
-                new_vertices.append(mesh.vertices[v_idx])
+            if pose["scale"] is not None:
+                keys += add_curves(node.LclScaling, layer, pose["scale"][:, bone_id], fps, tolerance["scale"])
 
-                if mesh.uvs is not None:
-                    new_uvs.append(mesh.uvs[uv_idx])
+        keys += add_curves(bone_nodes[bones[0]].LclTranslation, layer, pose["translation"], fps, tolerance["translation"])
 
-                if mesh.colors is not None:
-                    new_colors.append(mesh.colors[v_idx])
+        channels = num_bones * (2 if pose["scale"] is not None else 1) + 1
+        counts.append((f"anim{anim_id:02d}", keys, channels * 3 * num_frames))
 
-            new_face.append(vert_map[key])
+    return counts
 
-        new_faces.append(new_face)
 
-    return (
-        new_vertices,
-        new_uvs if mesh.uvs is not None else None,
-        new_colors if mesh.colors is not None else None,
-        new_faces,
-    )
+def describe_key_counts(counts):
+    """one line summary of add_animation_stacks counts"""
+    written = sum(keys for _, keys, _ in counts)
+    baked = sum(total for _, _, total in counts)
+    return "{} animations, {} of {} keys ({:.0%})".format(len(counts), written, baked, written / max(baked, 1))
 
 
-def export_fbx_scene(path, meshes):
+def export_fbx_scene(path, meshes, animations=None, fps=30, key_tolerance=None):
+    """
+    Writes meshes, their skeletons and the animations to path.
+    Returns the add_animation_stacks counts of every skeleton.
+    """
     manager = fbx.FbxManager.Create()
     ios = fbx.FbxIOSettings.Create(manager, fbx.IOSROOT)
     manager.SetIOSettings(ios)
@@ -129,52 +204,37 @@ def export_fbx_scene(path, meshes):
     # Process each material group
     # -------------------------------
     parent = fbx.FbxNode.Create(scene, path.split('/')[-1].split('.')[0])
+    root.AddChild(parent)
+
+    skeletons = {}  # skeleton -> bone nodes
 
     for material_id, mesh_list in meshes_by_material.items():
 
-        combined_vertices = []
-        combined_uvs = []
-        combined_colors = []
-        combined_faces = []
-
-        vert_map = {}  # maps (vertex_tuple, uv_tuple, color_tuple) -> new index
-
-        # Merge all meshes in this group
-        for gl_mesh in mesh_list:
-            vertices, uvs, colors, faces = flatten_mesh(gl_mesh)
-
-            for i, v in enumerate(vertices):
-                key = [tuple(v)]
-                if uvs is not None:
-                    key.append(tuple(uvs[i]))
-                if colors is not None:
-                    key.append(tuple(colors[i]))
-                key = tuple(key)
-
-                if key not in vert_map:
-                    vert_map[key] = len(combined_vertices)
-                    combined_vertices.append(v)
-                    if uvs is not None:
-                        combined_uvs.append(uvs[i])
-                    if colors is not None:
-                        combined_colors.append(colors[i])
-
-            # Remap faces
-            for face in faces:
-                new_face = []
-                for idx in face:
-                    key = [tuple(vertices[idx])]
-                    if uvs is not None:
-                        key.append(tuple(uvs[idx]))
-                    if colors is not None:
-                        key.append(tuple(colors[idx]))
-                    key = tuple(key)
-                    new_face.append(vert_map[key])
-                combined_faces.append(new_face)
-
-            if gl_mesh.skinned_mesh:  # SOMTHING BROKE THE MESH ... CHECK THIS FUNCTION
-                bone_nodes = build_fbx_skeleton(scene, gl_mesh.skinned_mesh.Skeleton)
-                add_skinning(scene, fbx_mesh, gl_mesh.skinned_mesh, bone_nodes)
+        # Merge all meshes in this group, one row per face corner
+        packed = [mesh_corners(gl_mesh) for gl_mesh in mesh_list]
+        width = packed[0][0].shape[1]
+        if any(rows.shape[1] != width for rows, _, _ in packed):
+            raise ValueError(f"Meshes of material {material_id} do not share the same attributes")
+
+        rows = np.concatenate([rows for rows, _, _ in packed])
+        face_sizes = np.concatenate([sizes for _, sizes, _ in packed])
+        corner_mesh = np.repeat(np.arange(len(mesh_list)), [len(rows) for rows, _, _ in packed])
+        corner_vertex = np.concatenate([v_idx for _, _, v_idx in packed])
+
+        first, corner_index = weld(rows)
+        combined = rows[first]
+
+        has_uvs = mesh_list[0].uvs is not None and len(mesh_list[0].uvs) > 0
+        color_start = 5 if has_uvs else 3
+
+        combined_vertices = combined[:, :3]
+        combined_uvs = combined[:, 3:5] if has_uvs else None
+        combined_colors = combined[:, color_start:] if width > color_start else None
+        combined_faces = np.split(corner_index, np.cumsum(face_sizes)[:-1])
+
+        # mesh and vertex index each control point came from
+        source_mesh = corner_mesh[first]
+        source_vertex = corner_vertex[first]
 
         # -------------------------------
         # Create FBX mesh
@@ -190,38 +250,37 @@ def export_fbx_scene(path, meshes):
         node.SetNodeAttribute(fbx_mesh)
         node.LclScaling.Set(fbx.FbxDouble3(100, 100, 100))
         node.LclRotation.Set(fbx.FbxDouble3(0, 0, 0))
+        # in the scene before skinning, the clusters bind to its global transform
+        parent.AddChild(node)
         # Control points
         fbx_mesh.InitControlPoints(len(combined_vertices))
-        for i, v in enumerate(combined_vertices):
-            fbx_mesh.SetControlPointAt(
-                fbx.FbxVector4(float(v[0]), float(v[1]), float(v[2])), i
-            )
+        for i, (x, y, z) in enumerate(combined_vertices.tolist()):
+            fbx_mesh.SetControlPointAt(fbx.FbxVector4(x, y, z), i)
 
         # Polygons
         for face in combined_faces:
             fbx_mesh.BeginPolygon()
-            for idx in face:
+            for idx in face.tolist():
                 fbx_mesh.AddPolygon(idx)
             fbx_mesh.EndPolygon()
 
         # UVs
-        if combined_uvs:
+        if combined_uvs is not None:
             uv_layer = fbx.FbxLayerElementUV.Create(fbx_mesh, "UVs")
             uv_layer.SetMappingMode(fbx.FbxLayerElement.EMappingMode.eByPolygonVertex)
             uv_layer.SetReferenceMode(fbx.FbxLayerElement.EReferenceMode.eIndexToDirect)
-            for uv in combined_uvs:
-                uv_layer.GetDirectArray().Add(fbx.FbxVector2(float(uv[0]), float(uv[1])))
-            for face in combined_faces:
-                for idx in face:
-                    uv_layer.GetIndexArray().Add(idx)
+            for u, v in combined_uvs.tolist():
+                uv_layer.GetDirectArray().Add(fbx.FbxVector2(u, v))
+            for idx in corner_index.tolist():
+                uv_layer.GetIndexArray().Add(idx)
             layer.SetUVs(uv_layer)
 
         # Vertex colors
-        if combined_colors:
+        if combined_colors is not None:
             col_layer = fbx.FbxLayerElementVertexColor.Create(fbx_mesh, "Colors")
             col_layer.SetMappingMode(fbx.FbxLayerElement.EMappingMode.eByControlPoint)
             col_layer.SetReferenceMode(fbx.FbxLayerElement.EReferenceMode.eDirect)
-            for c in combined_colors:
+            for c in combined_colors.tolist():
                 col_layer.GetDirectArray().Add(
                     fbx.FbxColor(
                         float(c[0]),
@@ -235,6 +294,27 @@ def export_fbx_scene(path, meshes):
         # Normals
         fbx_mesh.GenerateNormals(True)
 
+        # Skinning, once the control points exist
+        skinned = [m for m in mesh_list if m.skeleton is not None and m.skin_index is not None]
+        if skinned:
+            skeleton = skinned[0].skeleton
+
+            if skeleton not in skeletons:
+                bone_nodes = build_fbx_skeleton(scene, skeleton)
+                for bone_id in np.flatnonzero(skeleton.parents < 0):
+                    parent.AddChild(bone_nodes[skeleton.bones[bone_id]])
+                skeletons[skeleton] = bone_nodes
+
+            skin_indices = np.zeros((len(combined_vertices), 4), dtype=np.int64)
+            skin_weights = np.zeros((len(combined_vertices), 4), dtype=np.float64)
+            for mesh_id, gl_mesh in enumerate(mesh_list):
+                if gl_mesh.skeleton is skeleton:
+                    points = source_mesh == mesh_id
+                    skin_indices[points] = np.asarray(gl_mesh.skin_index)[source_vertex[points]]
+                    skin_weights[points] = np.asarray(gl_mesh.skin_weight)[source_vertex[points]]
+
+            add_skinning(scene, fbx_mesh, node, skeleton, skeletons[skeleton], skin_indices, skin_weights)
+
 
 
         # -------------------------------
@@ -261,9 +341,13 @@ def export_fbx_scene(path, meshes):
             material = material_cache[material_id]
 
         node.AddMaterial(material)
-        parent.AddChild(node)
 
-    root.AddChild(parent)
+    # Animations go in after skinning, which reads the bind pose
+    counts = []
+    if animations is not None:
+        for skeleton, bone_nodes in skeletons.items():
+            counts += add_animation_stacks(scene, skeleton, bone_nodes, animations, fps, key_tolerance)
+
     # -------------------------------
     # Export FBX
     # -------------------------------
@@ -274,74 +358,39 @@ def export_fbx_scene(path, meshes):
     manager.Destroy()
 
     print('File Exported')
-
-
-def write_bvh_joint(f, bone_id, indent, bones, children, offsets, is_root):
-    tab = "  " * indent
-    name = bones[bone_id].name
-
-    if is_root:
-        f.write(f"{tab}ROOT {name}\n")
-    else:
-        f.write(f"{tab}JOINT {name}\n")
-
-    f.write(f"{tab}{{\n")
-
-    ox, oy, oz = offsets[bone_id]
-    f.write(f"{tab}  OFFSET {ox:.6f} {oy:.6f} {oz:.6f}\n")
-
-    if is_root:
-        f.write(f"{tab}  CHANNELS 6 Xposition Yposition Zposition Zrotation Yrotation Xrotation\n")
-    else:
-        f.write(f"{tab}  CHANNELS 3 Zrotation Yrotation Xrotation\n")
-
-    for child in children[bone_id]:
-        write_bvh_joint(f, child, indent + 1, bones, children, offsets, False)
-
-    if not children[bone_id]:
-        f.write(f"{tab}  End Site\n")
-        f.write(f"{tab}  {{\n")
-        f.write(f"{tab}    OFFSET 0 0 0\n")
-        f.write(f"{tab}  }}\n")
-
-    f.write(f"{tab}}}\n")
-
-
-def get_rotation_at_time(tracks, bone_id, t):
-    for tr in tracks:
-        if tr["bone"] == bone_id and tr["type"] == "rotation":
-            times = tr["times"]
-            values = tr["values"]
-
-            for i in range(len(times)):
-                if t <= times[i]:
-                    return values[i]
-            return values[-1]
-
-    return (0, 0, 0, 1)
+    return counts
 
 
 def sample_rotation(track, time):
-    times = track['times']
-    values = track['values']
-
-    if time <= times[0]:
-        return np.array(values[0], dtype=np.float32)
+    """
+    Slerped rotation of a track at a time or an array of times,
+    (4,) or (..., 4) float32.
+    """
+    return sample_quat_track(track['times'], track['values'], time).astype(np.float32)
+
+
+def sample_rotations(tracks, times, num_bones):
+    """
+    Resamples every rotation track at the given times, e.g. an export frame
+    rate. Returns (len(times), num_bones, 4), bones without a track stay
+    at identity.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    rotations = np.zeros((len(times), num_bones, 4), dtype=np.float32)
+    rotations[..., 3] = 1.0
 
-    if time >= times[-1]:
-        return np.array(values[-1], dtype=np.float32)
+    for track in tracks:
+        if track['type'] == 'rotation' and track['bone'] < num_bones:
+            rotations[:, track['bone']] = sample_rotation(track, times)
 
-    for i in range(len(times) - 1):
-        t0, t1 = times[i], times[i + 1]
-        if t0 <= time <= t1:
-            alpha = (time - t0) / (t1 - t0)
-            q0 = np.array(values[i], dtype=np.float32)
-            q1 = np.array(values[i + 1], dtype=np.float32)
-            return quat_slerp(q0, q1, alpha)
+    return rotations
 
 
 def apply_animation(tracks, time, bones):
     for track in tracks:
+        if track['type'] != 'rotation':
+            continue
+
         bone = bones[track['bone']]
         q = sample_rotation(track, time)
 
@@ -353,22 +402,7 @@ def apply_animation(tracks, time, bones):
 
 
 def quat_slerp(q1, q2, t):
-    dot = np.dot(q1, q2)
-
-    if dot < 0.0:
-        q2 = -q2
-        dot = -dot
-
-    if dot > 0.9995:
-        return q1 + t * (q2 - q1)
-
-    theta_0 = np.arccos(dot)
-    theta = theta_0 * t
-
-    q3 = q2 - q1 * dot
-    q3 /= np.linalg.norm(q3)
-
-    return q1 * np.cos(theta) + q3 * np.sin(theta)
+    return quat_slerp_array(q1, q2, t)
 
 
 def make_transform(pos, rot):
@@ -389,66 +423,3 @@ def quat_to_mat4(q):
         [2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy), 0],
         [0, 0, 0, 1],
     ], dtype=np.float32)
-
-
-def quat_to_euler_zyx(q):
-    x, y, z, w = q
-
-    # ZYX order
-    t0 = +2.0 * (w * z + x * y)
-    t1 = +1.0 - 2.0 * (y * y + z * z)
-    rz = math.atan2(t0, t1)
-
-    t2 = +2.0 * (w * y - z * x)
-    t2 = max(-1.0, min(1.0, t2))
-    ry = math.asin(t2)
-
-    t3 = +2.0 * (w * x + y * z)
-    t4 = +1.0 - 2.0 * (x * x + y * y)
-    rx = math.atan2(t3, t4)
-
-    return (
-        math.degrees(rz),
-        math.degrees(ry),
-        math.degrees(rx),
-    )
-
-
-def export_bvh(animation, filename, skeleton, fps=30):
-    frame_time = 1.0 / fps
-    num_frames = animation.length
-
-    with open(filename, "w") as f:
-        # --- HIERARCHY ---
-        f.write("HIERARCHY\n")
-
-        root = 0
-        write_bvh_joint(
-            f,
-            root,
-            0,
-            skeleton.bones,
-            [[skeleton.bones.index(y) for y in x.children] for x in skeleton.bones],
-            [a.position.get() for a in skeleton.bones],
-            True,
-        )
-
-        # --- MOTION ---
-        f.write("MOTION\n")
-        f.write(f"Frames: {num_frames}\n")
-        f.write(f"Frame Time: {frame_time:.6f}\n")
-
-        for frame in range(num_frames):
-            t = frame * frame_time
-            values = []
-
-            for bone_id in range(len(skeleton.bones)):
-                q = get_rotation_at_time(animation.tracks, bone_id, t)
-                rz, ry, rx = quat_to_euler_zyx(q)
-
-                if bone_id == 0:
-                    values.extend([0.0, 0.0, 0.0])  # root position
-
-                values.extend([rz, ry, rx])
-
-            f.write(" ".join(f"{v:.6f}" for v in values) + "\n")
@@ -1,10 +1,12 @@
-from OpenGL.GL import *
-
 WIDTH = 1024
 HEIGHT = 512
 
 
 class FrameBuffer:
+    """
+    Plain RGBA VRAM image, the GL texture for it lives in src.GLUpload
+    (init_frame_buffer_texture / update_frame_buffer_texture).
+    """
     def __init__(self):
         # Create a raw byte buffer (RGBA)
         self.buffer = bytearray(WIDTH * HEIGHT * 4)
@@ -24,38 +26,6 @@ class FrameBuffer:
             self.buffer[i + 3] = int(c[3])
             self._needs_update = True
 
-    def init_texture(self):
-
-        """Initializes the OpenGL texture for this buffer."""
-
-        self.texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-
-        # PS1 style rendering usually requires Nearest filtering
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-        # Initialize with empty data
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, WIDTH, HEIGHT, 0,
-                     GL_RGBA, GL_UNSIGNED_BYTE, bytes(self.buffer))
-        glBindTexture(GL_TEXTURE_2D, 0)
-
-
-
-    def update_texture_gpu(self):
-        """Uploads the current CPU buffer to the GPU if it has changed."""
-        if not self._needs_update or self.texture_id is None:
-            return
-
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        # glTexSubImage2D is faster than glTexImage2D for updating existing textures
-        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, WIDTH, HEIGHT,
-                        GL_RGBA, GL_UNSIGNED_BYTE, bytes(self.buffer))
-        glBindTexture(GL_TEXTURE_2D, 0)
-        self._needs_update = False
-
     def mark_clut(self, clut_id):
         """Debug helper to highlight a specific CLUT area in the buffer."""
         ilo = clut_id * 64
@@ -71,7 +41,6 @@ class FrameBuffer:
         """
         In JS, this creates a Three.js Mesh.
         In your Python GL_Viewer, you would instead bind self.texture_id
-        when drawing your quad/mesh.
+        when drawing your quad/mesh, see src.GLUpload.init_frame_buffer_texture.
         """
-        pass
-        #self.init_texture()
\ No newline at end of file
+        pass
\ No newline at end of file
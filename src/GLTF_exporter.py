@@ -0,0 +1,413 @@
+"""
+glTF 2.0 binary (.glb) export, no SDK needed.
+
+Geometry, skins and animations go straight from the NumPy buffers of the
+MPD / WEP / SHP builds into buffer views, textures are embedded as PNG
+(or written next to the file). SEQ animations become one glTF animation
+each, sampled from the baked pose.
+
+Batch mode exports every SHP (with its SEQs) and WEP in a folder:
+
+    python -m src.GLTF_exporter VagrantStory_data/OBJ [-o OUT] [-j WORKERS]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.MPD import MPD
+from src.VSTOOLS import bytearray_to_image, export_png
+from src.WEP import WEP
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+COMPONENT_TYPES = {
+    np.dtype(np.int8): 5120,
+    np.dtype(np.uint8): 5121,
+    np.dtype(np.int16): 5122,
+    np.dtype(np.uint16): 5123,
+    np.dtype(np.uint32): 5125,
+    np.dtype(np.float32): 5126,
+}
+
+ACCESSOR_TYPES = {
+    (): "SCALAR",
+    (2,): "VEC2",
+    (3,): "VEC3",
+    (4,): "VEC4",
+    (4, 4): "MAT4",
+}
+
+NEAREST = 9728
+
+# rotation of the whole model, like the viewer's rotation.x = pi
+FLIP_X = [1.0, 0.0, 0.0, 0.0]
+
+
+class GLBBuilder:
+    def __init__(self, generator="VSTool_Python"):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": generator},
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": [],
+            "accessors": [],
+            "bufferViews": [],
+            "buffers": [],
+        }
+        self.chunks = []
+        self.offset = 0
+
+    def append(self, key, item):
+        items = self.gltf.setdefault(key, [])
+        items.append(item)
+        return len(items) - 1
+
+    def add_view(self, data, target=None):
+        data = bytes(data)
+        pad = (-self.offset) % 4
+        if pad:
+            self.chunks.append(b"\0" * pad)
+            self.offset += pad
+
+        view = {"buffer": 0, "byteOffset": self.offset, "byteLength": len(data)}
+        if target:
+            view["target"] = target
+
+        self.chunks.append(data)
+        self.offset += len(data)
+        return self.append("bufferViews", view)
+
+    def add_accessor(self, array, target=None, min_max=False, normalized=False):
+        """
+        array is (count, *element shape), see ACCESSOR_TYPES.
+        """
+        array = np.ascontiguousarray(array)
+
+        accessor = {
+            "bufferView": self.add_view(array.tobytes(), target),
+            "componentType": COMPONENT_TYPES[array.dtype],
+            "count": len(array),
+            "type": ACCESSOR_TYPES[array.shape[1:]],
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if min_max and len(array):
+            flat = array.reshape(len(array), -1)
+            accessor["min"] = flat.min(axis=0).tolist()
+            accessor["max"] = flat.max(axis=0).tolist()
+
+        return self.append("accessors", accessor)
+
+    def add_texture(self, data, width, height, embed=True, path=None):
+        """
+        RGBA bytes to a texture, embedded as PNG or written to path.
+        """
+        if embed:
+            stream = io.BytesIO()
+            bytearray_to_image(data, width, height).save(stream, format="PNG")
+            image = {"bufferView": self.add_view(stream.getvalue()), "mimeType": "image/png"}
+        else:
+            export_png(data, width, height, path)
+            image = {"uri": os.path.basename(path)}
+
+        if "samplers" not in self.gltf:
+            # PS1 textures are point sampled
+            self.append("samplers", {"magFilter": NEAREST, "minFilter": NEAREST})
+
+        return self.append("textures", {"sampler": 0, "source": self.append("images", image)})
+
+    def add_material(self, name, texture=None):
+        material = {
+            "name": name,
+            "pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 1.0},
+            "alphaMode": "MASK",
+        }
+        if texture is not None:
+            material["pbrMetallicRoughness"]["baseColorTexture"] = {"index": texture}
+        return self.append("materials", material)
+
+    def add_node(self, node, root=False):
+        index = self.append("nodes", node)
+        if root:
+            self.gltf["scenes"][0]["nodes"].append(index)
+        return index
+
+    def write(self, path):
+        binary = b"".join(self.chunks)
+        binary += b"\0" * ((-len(binary)) % 4)
+        self.gltf["buffers"] = [{"byteLength": len(binary)}]
+
+        gltf = {key: value for key, value in self.gltf.items() if value != []}
+        text = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+        text += b" " * ((-len(text)) % 4)
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(path, "wb") as f:
+            f.write(struct.pack("<III", GLB_MAGIC, 2, 12 + 8 + len(text) + 8 + len(binary)))
+            f.write(struct.pack("<II", len(text), CHUNK_JSON))
+            f.write(text)
+            f.write(struct.pack("<II", len(binary), CHUNK_BIN))
+            f.write(binary)
+
+        return path
+
+
+def add_primitive(builder, attributes, triangles, material=None, joints=None, weights=None):
+    """
+    attributes: geometry dict with flat positions / normals / uvs / colors.
+    """
+    positions = np.asarray(attributes["positions"], dtype=np.float32).reshape(-1, 3)
+    count = len(positions)
+
+    primitive = {
+        "attributes": {"POSITION": builder.add_accessor(positions, ARRAY_BUFFER, min_max=True)},
+        "indices": builder.add_accessor(
+            np.asarray(triangles).astype(np.uint16 if count <= 0xFFFF else np.uint32).ravel(),
+            ELEMENT_ARRAY_BUFFER,
+        ),
+        "mode": 4,
+    }
+
+    normals = attributes.get("normals")
+    if normals is not None and len(normals):
+        primitive["attributes"]["NORMAL"] = builder.add_accessor(
+            np.asarray(normals, dtype=np.float32).reshape(count, 3), ARRAY_BUFFER
+        )
+
+    uvs = attributes.get("uvs")
+    if uvs is not None and len(uvs):
+        primitive["attributes"]["TEXCOORD_0"] = builder.add_accessor(
+            np.asarray(uvs, dtype=np.float32).reshape(count, 2), ARRAY_BUFFER
+        )
+
+    colors = attributes.get("colors")
+    if colors is not None and len(colors):
+        primitive["attributes"]["COLOR_0"] = builder.add_accessor(
+            np.asarray(colors, dtype=np.float32).reshape(count, -1), ARRAY_BUFFER
+        )
+
+    if joints is not None:
+        joints = np.asarray(joints)
+        primitive["attributes"]["JOINTS_0"] = builder.add_accessor(
+            joints.astype(np.uint8 if joints.max(initial=0) < 256 else np.uint16), ARRAY_BUFFER
+        )
+        primitive["attributes"]["WEIGHTS_0"] = builder.add_accessor(
+            np.asarray(weights, dtype=np.float32), ARRAY_BUFFER
+        )
+
+    if material is not None:
+        primitive["material"] = material
+
+    return primitive
+
+
+def add_skeleton(builder, skeleton):
+    """Joint nodes and the skin, returns (skin index, joint node indices)."""
+    num_bones = len(skeleton.bones)
+    first = len(builder.gltf["nodes"])
+    joints = list(range(first, first + num_bones))
+
+    for bone_id, bone in enumerate(skeleton.bones):
+        node = {"name": bone.name, "translation": skeleton.positions[bone_id].tolist()}
+        children = np.flatnonzero(skeleton.parents == bone_id)
+        if len(children):
+            node["children"] = (children + first).tolist()
+        builder.add_node(node)
+
+    # glTF matrices are column major
+    inverses = np.transpose(skeleton.boneInverses, (0, 2, 1)).astype(np.float32)
+
+    skin = builder.append("skins", {
+        "joints": joints,
+        "inverseBindMatrices": builder.add_accessor(inverses),
+        "skeleton": joints[0],
+    })
+    return skin, joints
+
+
+def add_animations(builder, skeleton, joints, animations, fps=30):
+    for anim_id, animation in enumerate(animations):
+        pose = animation.bake()
+        num_frames = len(pose["rotation"])
+        num_bones = min(len(joints), pose["rotation"].shape[1])
+
+        times = builder.add_accessor((np.arange(num_frames) / fps).astype(np.float32), min_max=True)
+
+        samplers = []
+        channels = []
+
+        def channel(node, path, values):
+            channels.append({"sampler": len(samplers), "target": {"node": node, "path": path}})
+            samplers.append({
+                "input": times,
+                "output": builder.add_accessor(np.asarray(values, dtype=np.float32)),
+                "interpolation": "LINEAR",
+            })
+
+        for bone_id in range(num_bones):
+            channel(joints[bone_id], "rotation", pose["rotation"][:, bone_id])
+            if pose["scale"] is not None:
+                channel(joints[bone_id], "scale", pose["scale"][:, bone_id])
+
+        channel(joints[0], "translation", pose["translation"])
+
+        builder.append("animations", {
+            "name": f"anim{anim_id:02d}",
+            "samplers": samplers,
+            "channels": channels,
+        })
+
+
+def texture_path(path, name):
+    return os.path.join(os.path.dirname(path), f"{os.path.splitext(os.path.basename(path))[0]}_{name}.png")
+
+
+def export_wep_glb(path, wep, animations=None, fps=30, embed=True):
+    """WEP or SHP, skinned, with SEQ animations for an SHP."""
+    builder = GLBBuilder()
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    material = None
+    if wep.material:
+        texture = wep.material.texture
+        material = builder.add_material(name, builder.add_texture(
+            texture["data"], wep.texture_map.get_width(), texture["height"], embed, texture_path(path, "0")
+        ))
+
+    attributes = wep.geometry.attributes
+    triangles = np.asarray(attributes["indices"]).reshape(-1, 3)
+
+    skin, joints = add_skeleton(builder, wep.Skeleton)
+    mesh = builder.append("meshes", {
+        "name": name,
+        "primitives": [add_primitive(
+            builder, attributes, triangles, material, attributes["skin_index"], attributes["skin_weight"]
+        )],
+    })
+    # the skinned mesh node's own transform is ignored, the joints carry the flip
+    builder.add_node({"name": name, "mesh": mesh, "skin": skin}, root=True)
+
+    roots = [joints[i] for i in np.flatnonzero(wep.Skeleton.parents < 0)]
+    builder.add_node({"name": f"{name}_skeleton", "rotation": FLIP_X, "children": roots}, root=True)
+
+    if animations is not None:
+        add_animations(builder, wep.Skeleton, joints, animations, fps)
+
+    return builder.write(path)
+
+
+def export_mpd_glb(path, mpd, embed=True):
+    """One primitive per merged MPD mesh, one material per texture / clut pair."""
+    builder = GLBBuilder()
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    materials = {}
+    primitives = []
+    rotation_x, scale = np.pi, (0.1, 0.1, 0.1)
+
+    for mesh in mpd.meshes:
+        texture = mesh.material
+        if texture is not None and mesh.material_id not in materials:
+            materials[mesh.material_id] = builder.add_material(mesh.material_id, builder.add_texture(
+                texture["data"], texture["width"], texture["height"], embed, texture_path(path, mesh.material_id)
+            ))
+
+        attributes = mesh.geometry.attributes
+        triangles = np.asarray(attributes["indices"], dtype=np.int64).reshape(-1, 3)
+        primitives.append(add_primitive(builder, attributes, triangles, materials.get(mesh.material_id)))
+        rotation_x, scale = mesh.rotation_x, mesh.scale
+
+    mesh = builder.append("meshes", {"name": name, "primitives": primitives})
+    builder.add_node({
+        "name": name,
+        "mesh": mesh,
+        "rotation": [float(np.sin(rotation_x / 2)), 0.0, 0.0, float(np.cos(rotation_x / 2))],
+        "scale": list(scale),
+    }, root=True)
+
+    return builder.write(path)
+
+
+def export_glb(path, obj, animations=None, fps=30, embed=True):
+    if isinstance(obj, MPD):
+        return export_mpd_glb(path, obj, embed)
+    if isinstance(obj, WEP):
+        return export_wep_glb(path, obj, animations, fps, embed)
+    raise TypeError(f"Cannot export {type(obj).__name__} to glTF")
+
+
+# ───────────────────────── batch ─────────────────────────
+
+def export_file(file_path, output_dir, fps=30):
+    # the readers live next to the BVH batch code
+    from src.BVH_exporter import find_seqs, read_file
+    from src.SEQ import SEQ
+    from src.SHP import SHP
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+
+    if file_path.upper().endswith(".SHP"):
+        shp = read_file(SHP, file_path)
+        animations = [a for seq_path in find_seqs(file_path) for a in read_file(SEQ, seq_path).animations]
+        return export_wep_glb(os.path.join(output_dir, f"{name}.glb"), shp, animations or None, fps)
+
+    return export_wep_glb(os.path.join(output_dir, f"{name}.glb"), read_file(WEP, file_path))
+
+
+def export_batch(paths, output_dir, workers=None, fps=30):
+    written = 0
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(export_file, p, output_dir, fps): p for p in paths}
+
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+                written += 1
+                print(f"[{done}/{len(paths)}] {futures[future]}")
+            except Exception as e:
+                print(f"[{done}/{len(paths)}] {futures[future]}: {e}", file=sys.stderr)
+
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.GLTF_exporter", description="Export SHP / WEP files to GLB.")
+    parser.add_argument("paths", nargs="+", help="SHP / WEP files or folders")
+    parser.add_argument("-o", "--output", default="glb", help="output folder")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.paths:
+        candidates = glob.glob(os.path.join(path, "*")) if os.path.isdir(path) else [path]
+        paths += sorted(p for p in candidates if p.upper().endswith((".SHP", ".WEP")))
+
+    if not paths:
+        print("No SHP / WEP files found")
+        return 1
+
+    written = export_batch(paths, args.output, args.workers, args.fps)
+    print(f"{written} GLB files written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+OpenGL side of the core classes: texture creation, frame buffer upload
+and GLMesh. The parsers and exporters never import this module, only the
+viewer does, so reading or converting files needs no GL context.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+from src.FrameBuffer import WIDTH, HEIGHT
+from src.V3DClasses import SceneMesh
+
+
+def create_texture(data, width, height, filtering=GL_NEAREST, wrap=GL_REPEAT):
+    """RGBA bytes to a new 2D texture, returns its id. Needs a current context."""
+    tex_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex_id)
+
+    # PS1 style rendering usually requires Nearest filtering
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, filtering)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, filtering)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrap)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrap)
+
+    glTexImage2D(
+        GL_TEXTURE_2D,
+        0,
+        GL_RGBA,
+        width,
+        height,
+        0,
+        GL_RGBA,
+        GL_UNSIGNED_BYTE,
+        data if isinstance(data, bytes) else bytes(data),
+    )
+
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return tex_id
+
+
+def init_frame_buffer_texture(frame_buffer):
+    """Creates the texture for a FrameBuffer, filled with its current pixels."""
+    frame_buffer.texture_id = create_texture(frame_buffer.buffer, WIDTH, HEIGHT)
+    frame_buffer._needs_update = False
+    return frame_buffer.texture_id
+
+
+def update_frame_buffer_texture(frame_buffer):
+    """Uploads the FrameBuffer pixels to its texture if they changed."""
+    if not frame_buffer._needs_update or frame_buffer.texture_id is None:
+        return
+
+    glBindTexture(GL_TEXTURE_2D, frame_buffer.texture_id)
+    # glTexSubImage2D is faster than glTexImage2D for updating existing textures
+    glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, WIDTH, HEIGHT,
+                    GL_RGBA, GL_UNSIGNED_BYTE, bytes(frame_buffer.buffer))
+    glBindTexture(GL_TEXTURE_2D, 0)
+    frame_buffer._needs_update = False
+
+
+class GLMesh(SceneMesh):
+    """SceneMesh plus its texture and vertex buffers."""
+    def __init__(self, vertices, uvs, faces, colors, texture_id, material_id, skinned_mesh=None, skeleton=None):
+        super().__init__(vertices, uvs, faces, colors, material_id, skinned_mesh, skeleton)
+        self.texture_id = texture_id
+        self.vao = None
+        self.vbo = None
+        self.skin_vbo = None
+        self.vertex_count = 0
+
+    def upload(self):
+        data = []
+
+        for face in self.faces:
+            for v_idx, uv_idx in face:
+                data.extend(self.vertices[v_idx])
+                data.extend(self.uvs[uv_idx])
+                if self.colors and v_idx < len(self.colors):
+                    c = self.colors[v_idx]
+                    # If your build function did r/255, c is already 0.0-1.0
+                    # We add 1.0 for the Alpha channel
+                    data.extend([c[0], c[1], c[2], 1.0])
+                else:
+                    # Default to PS1 Neutral Gray (0.5) so that 0.5 * 2 = 1.0 brightness
+                    data.extend([0.5, 0.5, 0.5, 1.0])
+
+        data = np.array(data, dtype=np.float32)
+        self.vertex_count = len(data) // 9  # 3 pos + 2 uv + 4 color
+
+        self.vao = glGenVertexArrays(1)
+        self.vbo = glGenBuffers(1)
+
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+
+        stride = 9 * 4
+
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(1)
+
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(20))
+        glEnableVertexAttribArray(2)
+
+        if self.skin_index is not None and self.skin_weight is not None:
+            self.upload_skin()
+
+        glBindVertexArray(0)
+
+    def upload_skin(self):
+        """
+        bone_ids (location 3, ivec4) and bone_weights (location 4, vec4),
+        expanded per face corner like the vertex data. Expects the VAO bound.
+        """
+        corners = np.array([v_idx for face in self.faces for v_idx, _ in face], dtype=np.int64)
+
+        skin = np.zeros(len(corners), dtype=[("ids", np.int32, 4), ("weights", np.float32, 4)])
+        skin["ids"] = np.asarray(self.skin_index, dtype=np.float32).reshape(-1, 4)[corners]
+        skin["weights"] = np.asarray(self.skin_weight, dtype=np.float32).reshape(-1, 4)[corners]
+
+        self.skin_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.skin_vbo)
+        glBufferData(GL_ARRAY_BUFFER, skin.nbytes, skin, GL_STATIC_DRAW)
+
+        stride = skin.itemsize
+
+        glVertexAttribIPointer(3, 4, GL_INT, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(3)
+
+        glVertexAttribPointer(4, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16))
+        glEnableVertexAttribArray(4)
+
+    def delete(self):
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+        if self.skin_vbo:
+            glDeleteBuffers(1, [self.skin_vbo])
+        if self.vao:
+            glDeleteVertexArrays(1, [self.vao])
+        self.vao = self.vbo = self.skin_vbo = None
@@ -1,4 +1,5 @@
 from src.MPDGroup import MPDGroup
+from src.MPDmesh import MPDMesh
 
 class MPD:
     def __init__(self, reader, znd=None):
@@ -217,14 +218,32 @@ class MPD:
         """
         Builds all geometry buffers.
         Result:
-          self.meshes → list of MPDMesh
+          self.meshes → list of MPDMesh, one per material_id
         """
-        self.meshes = []
-
         for g in self.groups:
             g.build()
+
+        self.merge_meshes()
+
+    def merge_meshes(self):
+        """
+        Merges the per group meshes that share a material_id into a single
+        mesh, so draw calls, texture uploads and exported nodes scale with
+        the number of unique materials instead of groups x materials.
+        """
+        meshes_by_material = {}
+
+        for g in self.groups:
             for mesh in g.meshes.values():
-                self.meshes.append(mesh)
+                meshes_by_material.setdefault(mesh.material_id, []).append(mesh)
+
+        self.meshes = []
+
+        for meshes in meshes_by_material.values():
+            if len(meshes) == 1:
+                self.meshes.append(meshes[0])
+            else:
+                self.meshes.append(MPDMesh.merged(meshes))
 
     def set_material(self, material):
         """
@@ -233,3 +252,6 @@ class MPD:
         for g in self.groups:
             for mesh in g.meshes.values():
                 mesh.material = material
+
+        for mesh in getattr(self, "meshes", []):
+            mesh.material = material
@@ -110,4 +110,37 @@ class MPDMesh:
 
             # ---- Transform (matches JS) ----
         self.rotation_x = math.pi
-        self.scale = (0.1, 0.1, 0.1)
\ No newline at end of file
+        self.scale = (0.1, 0.1, 0.1)
+
+    @classmethod
+    def merged(cls, meshes):
+        """
+        Concatenates already built meshes sharing a material into one buffer.
+        Indices are rebased onto the combined vertex list.
+        """
+        first = meshes[0]
+        mesh = cls(first.reader, None, first.texture_id, first.clut_id)
+
+        for m in meshes:
+            iv = len(mesh.positions) // 3
+
+            mesh.faces += m.faces
+            mesh.positions += m.positions
+            mesh.normals += m.normals
+            mesh.colors += m.colors
+            mesh.uvs += m.uvs
+            mesh.indices += [i + iv for i in m.indices]
+
+        mesh.geometry = Geometry()
+        mesh.geometry.attributes["positions"] = mesh.positions
+        mesh.geometry.attributes["normals"] = mesh.normals
+        mesh.geometry.attributes["indices"] = mesh.indices
+        mesh.geometry.attributes["colors"] = mesh.colors
+        mesh.geometry.attributes["uvs"] = mesh.uvs
+
+        mesh.material = first.material
+        mesh.material_id = first.material_id
+        mesh.rotation_x = first.rotation_x
+        mesh.scale = first.scale
+
+        return mesh
\ No newline at end of file
@@ -1,3 +1,24 @@
+import os
+
+import numpy as np
+
+from src.VSTOOLS import export_png, weld
+
+
+def format_rows(prefix, array, fmt="%.6f"):
+    """
+    One formatted block for a whole (N, C) array, "prefix c0 c1 ...\n" per row.
+    fmt covers one or more columns, e.g. "%d/%d/%d" for face corners.
+    """
+    array = np.asarray(array)
+    if not array.size:
+        return ""
+
+    array = array.reshape(len(array), -1)
+    line = prefix + " " + " ".join([fmt] * (array.shape[1] // fmt.count("%"))) + "\n"
+    return (line * len(array)) % tuple(array.ravel().tolist())
+
+
 def export_obj(mesh, file_path):
     """
     Export a mesh to Wavefront OBJ format.
@@ -8,40 +29,173 @@ def export_obj(mesh, file_path):
       - normals: [x, y, z, ...]
       - indices: [i0, i1, i2, ...]
     """
+    positions = np.asarray(mesh.positions, dtype=np.float64).reshape(-1, 3)
+    uvs = np.asarray(mesh.uvs, dtype=np.float64).reshape(-1, 2)
+    normals = np.asarray(mesh.normals, dtype=np.float64).reshape(-1, 3)
+
+    # OBJ indices are 1-based!
+    faces = np.asarray(mesh.indices, dtype=np.int64).reshape(-1, 3) + 1
 
     with open(file_path, "w") as f:
         f.write("# Exported OBJ\n")
+        f.write(format_rows("v", positions))
+        # OBJ uses (u, v) with v flipped
+        f.write(format_rows("vt", np.column_stack([uvs[:, 0], 1.0 - uvs[:, 1]])))
+        f.write(format_rows("vn", normals))
+        # f v/vt/vn
+        f.write(format_rows("f", np.repeat(faces, 3, axis=1), "%d/%d/%d"))
 
-        # ----------------------------------
-        # Write vertex positions
-        # ----------------------------------
-        for i in range(0, len(mesh.positions), 3):
-            x, y, z = mesh.positions[i:i+3]
-            f.write(f"v {x} {y} {z}\n")
 
-        # ----------------------------------
-        # Write texture coordinates (UVs)
-        # OBJ uses (u, v) with v flipped
-        # ----------------------------------
-        for i in range(0, len(mesh.uvs), 2):
-            u, v = mesh.uvs[i:i+2]
-            f.write(f"vt {u} {1.0 - v}\n")
-
-        # ----------------------------------
-        # Write normals
-        # ----------------------------------
-        for i in range(0, len(mesh.normals), 3):
-            nx, ny, nz = mesh.normals[i:i+3]
-            f.write(f"vn {nx} {ny} {nz}\n")
-
-        # ----------------------------------
-        # Write faces
-        # OBJ indices are 1-based!
-        # ----------------------------------
-        for i in range(0, len(mesh.indices), 3):
-            i1 = mesh.indices[i] + 1
-            i2 = mesh.indices[i + 1] + 1
-            i3 = mesh.indices[i + 2] + 1
-
-            # f v/vt/vn
-            f.write(f"f {i1}/{i1}/{i1} {i2}/{i2}/{i2} {i3}/{i3}/{i3}\n")
\ No newline at end of file
+# ───────────────────────── scenes ─────────────────────────
+
+def scene_parts(obj):
+    """
+    (material name, geometry attributes, (T, 3) triangles, texture, transform)
+    per part of an MPD or WEP / SHP, texture is (rgba, width, height) or None,
+    transform the (rotation_x, scale) the viewer and the GLB put on it.
+    """
+    if hasattr(obj, "Skeleton"):
+        texture = None
+        if obj.material:
+            t = obj.material.texture
+            texture = (t["data"], obj.texture_map.get_width(), t["height"])
+
+        attributes = obj.geometry.attributes
+        # like the skinned mesh's rotation.x = pi
+        transform = (np.pi, (1.0, 1.0, 1.0))
+        return [("texture0", attributes, np.asarray(attributes["indices"]).reshape(-1, 3), texture, transform)]
+
+    parts = []
+    for mesh in obj.meshes:
+        m = mesh.material
+        texture = (m["data"], m["width"], m["height"]) if m is not None else None
+
+        attributes = mesh.geometry.attributes
+        transform = (mesh.rotation_x, mesh.scale)
+        parts.append((mesh.material_id, attributes, np.asarray(attributes["indices"]).reshape(-1, 3), texture, transform))
+
+    return parts
+
+
+def node_matrix(rotation_x, scale):
+    """3x3 of a node scaled by scale, then rotated by rotation_x about X."""
+    c, s = np.cos(rotation_x), np.sin(rotation_x)
+    rotation = np.array([[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]])
+    return rotation * np.asarray(scale, dtype=np.float64)
+
+
+def corner_attribute(attributes, key, width, triangles):
+    values = attributes.get(key)
+    if values is None or not len(values):
+        return None
+    return np.asarray(values, dtype=np.float64).reshape(-1, width)[triangles.ravel()]
+
+
+def export_obj_scene(file_path, obj, weld_vertices=False, vertex_colors=True, compress_level=6, texture_files=None):
+    """
+    Writes an MPD or WEP / SHP to file_path plus a .mtl and one PNG per
+    material next to it. Every material gets its own usemtl group. The
+    model's flip and scale are baked in, so the OBJ lines up with the GLB.
+
+    weld_vertices   shares identical positions, uvs and normals between faces
+    vertex_colors   writes "v x y z r g b", the PS1 meshes are vertex lit
+    compress_level  zlib level of the PNGs written next to the OBJ
+    texture_files   {material: path} of textures written elsewhere, map_Kd
+                    points at them instead of a copy next to the OBJ
+
+    Returns every file written, the OBJ first, then the MTL and the PNGs.
+    """
+    texture_files = texture_files or {}
+    folder, name = os.path.split(file_path)
+    folder = folder or "."
+    name = os.path.splitext(name)[0]
+    mtl_name = f"{name}.mtl"
+
+    obj_blocks = ["# Exported OBJ\n", f"mtllib {mtl_name}\n"]
+    written = [file_path, os.path.join(folder, mtl_name)]
+    mtl_blocks = ["# Exported MTL\n"]
+    written_materials = set()
+
+    offsets = np.zeros(3, dtype=np.int64)  # v, vt, vn written so far
+
+    for material, attributes, triangles, texture, transform in scene_parts(obj):
+        triangles = np.asarray(triangles, dtype=np.int64)
+
+        # per corner attributes, OBJ indexes each pool on its own
+        position = corner_attribute(attributes, "positions", 3, triangles)
+        color = corner_attribute(attributes, "colors", 3, triangles) if vertex_colors else None
+        uv = corner_attribute(attributes, "uvs", 2, triangles)
+        normal = corner_attribute(attributes, "normals", 3, triangles)
+
+        matrix = node_matrix(*transform)
+        position = position @ matrix.T
+        if normal is not None:
+            # inverse transpose, then back to unit length
+            normal = normal @ np.linalg.inv(matrix)
+            lengths = np.linalg.norm(normal, axis=1, keepdims=True)
+            normal = np.divide(normal, lengths, out=np.zeros_like(normal), where=lengths > 0)
+
+        if color is not None:
+            position = np.hstack([position, color])
+
+        pools = []
+        for values in (position, uv, normal):
+            if values is None:
+                pools.append(None)
+            elif weld_vertices:
+                first, index = weld(values)
+                pools.append((values[first], index))
+            else:
+                pools.append((values, np.arange(len(values))))
+
+        (v, v_index), uv_pool, normal_pool = pools
+
+        obj_blocks.append(f"g {name}_{material}\nusemtl {material}\n")
+        obj_blocks.append(format_rows("v", v))
+
+        # corner -> 1-based index per pool, (T, 3 corners, k)
+        columns = [v_index + offsets[0] + 1]
+        fmt = "%d"
+
+        if uv_pool is not None:
+            values, index = uv_pool
+            # OBJ uses (u, v) with v flipped
+            obj_blocks.append(format_rows("vt", np.column_stack([values[:, 0], 1.0 - values[:, 1]])))
+            columns.append(index + offsets[1] + 1)
+            fmt += "/%d"
+            offsets[1] += len(values)
+
+        if normal_pool is not None:
+            values, index = normal_pool
+            obj_blocks.append(format_rows("vn", values))
+            columns.append(index + offsets[2] + 1)
+            fmt += "/%d" if uv_pool is not None else "//%d"
+            offsets[2] += len(values)
+
+        offsets[0] += len(v)
+
+        corners = np.stack(columns, axis=-1).reshape(len(triangles), -1)
+        obj_blocks.append(format_rows("f", corners, fmt))
+
+        if material not in written_materials:
+            written_materials.add(material)
+            mtl_blocks.append(f"\nnewmtl {material}\nKa 1.000 1.000 1.000\nKd 1.000 1.000 1.000\nKs 0.000 0.000 0.000\nillum 1\n")
+
+            if material in texture_files:
+                texture_name = os.path.relpath(texture_files[material], folder).replace(os.sep, "/")
+                mtl_blocks.append(f"map_Kd {texture_name}\n")
+            elif texture is not None:
+                data, width, height = texture
+                texture_name = f"{name}_{material}.png"
+                written.append(export_png(data, width, height, os.path.join(folder, texture_name), compress_level=compress_level))
+                mtl_blocks.append(f"map_Kd {texture_name}\n")
+
+    os.makedirs(folder, exist_ok=True)
+
+    with open(file_path, "w") as f:
+        f.write("".join(obj_blocks))
+
+    with open(os.path.join(folder, mtl_name), "w") as f:
+        f.write("".join(mtl_blocks))
+
+    return written
@@ -4,15 +4,18 @@ from PySide6.QtOpenGL import QOpenGLShaderProgram, QOpenGLShader
 from PySide6.QtGui import QMatrix4x4, QVector3D, QImage
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtCore import Qt, QTimer
-from src.FBX_exporter import *
-from src.VSTOOLS import rot2quat, rot13_to_rad_func
+from src.GLUpload import GLMesh, create_texture
 from src.V3DClasses import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
+import ctypes
 import math
 from src.vs_strings import *
 import numpy as np
 
+# size of u_bones in ASSET_SHADER_VERTEX
+MAX_BONES = 100
+
 
 class GLViewport(QOpenGLWidget):
     def __init__(self, parent):
@@ -81,28 +84,8 @@ class GLViewport(QOpenGLWidget):
         img = QImage(path).convertToFormat(QImage.Format.Format_RGBA8888)
         img = img.mirrored()
 
-        tex_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, tex_id)
-
-        glTexImage2D(
-            GL_TEXTURE_2D,
-            0,
-            GL_RGBA,
-            img.width(),
-            img.height(),
-            0,
-            GL_RGBA,
-            GL_UNSIGNED_BYTE,
-            img.bits()
-        )
-
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        return create_texture(img.bits(), img.width(), img.height(), GL_LINEAR, GL_CLAMP_TO_EDGE)
 
-        glBindTexture(GL_TEXTURE_2D, 0)
-        return tex_id
     @staticmethod
     def compute_bbox(vertices):
         min_v = QVector3D(vertices[0])
@@ -139,147 +122,20 @@ class GLViewport(QOpenGLWidget):
 
         self.apply_pose(self.current_animation, self.anim_time)
 
-    def eval_scale(self, animation, bone_id, frame):
-        if animation.scale_flags & 0x1:
-            base = animation.scale_per_bone[bone_id]
-            sx = base["x"] / 64.0
-            sy = base["y"] / 64.0
-            sz = base["z"] / 64.0
-        else:
-            sx = sy = sz = 1.0
-
-        if not (animation.scale_flags & 0x2):
-            return sx, sy, sz
-
-        keys = animation.scale_keys_per_bone[bone_id]
-
-        f_acc = 0
-        prev_x = prev_y = prev_z = 0
-
-        for key in keys:
-            kf = key["f"]
-
-            if key["x"] is not None:
-                prev_x = key["x"]
-            if key["y"] is not None:
-                prev_y = key["y"]
-            if key["z"] is not None:
-                prev_z = key["z"]
-
-            for _ in range(kf):
-                if f_acc >= frame:
-                    return sx, sy, sz
-
-                sx += (prev_x / 64.0)
-                sy += (prev_y / 64.0)
-                sz += (prev_z / 64.0)
-                f_acc += 1
-
-        return sx, sy, sz
-
-    def eval_translation(self, animation, frame):
-        base = animation.translation
-        tx = base["x"]
-        ty = base["y"]
-        tz = base["z"]
-
-        keys = animation.translation_keys
-
-        f_acc = 0
-        prev_x = prev_y = prev_z = 0
-
-        for key in keys:
-            kf = key["f"]
-
-            if key["x"] is not None:
-                prev_x = key["x"]
-            if key["y"] is not None:
-                prev_y = key["y"]
-            if key["z"] is not None:
-                prev_z = key["z"]
-
-            for _ in range(kf):
-                if f_acc >= frame:
-                    return tx, ty, tz
-
-                tx += prev_x
-                ty += prev_y
-                tz += prev_z
-                f_acc += 1
-
-        return tx, ty, tz
-
-    def eval_rotation(self, animation, bone_id, frame):
-        # base pose
-        if animation.base_animation_id == -1:
-            base = animation.rotation_per_bone[bone_id]
-        else:
-            base = animation.seq.animations[
-                animation.base_animation_id
-            ].rotation_per_bone[bone_id]
-
-        rx = base['x'] * 2
-        ry = base['y'] * 2
-        rz = base['z'] * 2
-
-        keys = animation.rotation_keys_per_bone[bone_id]
-
-        f_acc = 0
-
-        prev_x = prev_y = prev_z = 0
-
-        for key in keys:
-            kf = key["f"]
-
-            if key["x"] is not None:
-                prev_x = key["x"]
-            if key["y"] is not None:
-                prev_y = key["y"]
-            if key["z"] is not None:
-                prev_z = key["z"]
-
-            for _ in range(kf):
-                if f_acc >= frame:
-                    return rot2quat(
-                        rot13_to_rad_func(rx),
-                        rot13_to_rad_func(ry),
-                        rot13_to_rad_func(rz),
-                    )
-
-                rx += prev_x
-                ry += prev_y
-                rz += prev_z
-                f_acc += 1
-
-        return rot2quat(
-            rot13_to_rad_func(rx),
-            rot13_to_rad_func(ry),
-            rot13_to_rad_func(rz),
-        )
-
     def time_to_frame(self, time_sec: float) -> int:
         return int(time_sec / 24)
 
     def apply_pose(self, animation, time_sec):
-        frame = self.time_to_frame(time_sec)
+        pose = animation.bake()
+        frame = min(self.time_to_frame(time_sec), len(pose["rotation"]) - 1)
 
         skeleton = self.activeSHP.Skeleton
-        bones = skeleton.bones
-
-        for bone_id, bone in enumerate(bones):
-
-            bone.quaternion = self.eval_rotation(animation, bone_id, frame)
-
-            if animation.scale_flags & 0x3:
-                bone.scale = self.eval_scale(animation, bone_id, frame)
-            bone.updateMatrixWorld()
-
-        # root translation
-        tx, ty, tz = self.eval_translation(animation, frame)
-        bones[0].position.x = tx
-        bones[0].position.y = ty
-        bones[0].position.z = tz
-
+        skeleton.set_pose(
+            pose["rotation"][frame],
+            pose["scale"][frame] if pose["scale"] is not None else None,
+            pose["translation"][frame],
+        )
+        skeleton.update()
 
 
     def apply_animation(self, animation, time):
@@ -356,6 +212,8 @@ class GLViewport(QOpenGLWidget):
             if 'SkinnedMesh' in batch:
                 mesh.skinned_mesh = batch['SkinnedMesh']
                 mesh.skeleton = batch['Skeleton']
+                mesh.skin_index = batch['skinIndex']
+                mesh.skin_weight = batch['skinWeight']
 
             mesh.upload()
             self.meshes.append(mesh)
@@ -397,8 +255,19 @@ class GLViewport(QOpenGLWidget):
         self.update()
 
     def export_fbx_scene(self, path):
-        if self.meshes:
-            export_fbx_scene(path, self.meshes)
+        """returns the animation key counts of the export"""
+        if not self.meshes:
+            return []
+
+        # SEQ animations only make sense on the skeleton they were loaded with
+        animations = None
+        if self.activeSEQ and self.activeSHP:
+            if any(mesh.skeleton is self.activeSHP.Skeleton for mesh in self.meshes):
+                animations = self.activeSEQ.animations
+
+        # the fbx SDK is only loaded once something is exported
+        from src.FBX_exporter import export_fbx_scene
+        return export_fbx_scene(path, self.meshes, animations)
 
     def initializeGL(self):
         self.makeCurrent()
@@ -426,7 +295,6 @@ class GLViewport(QOpenGLWidget):
 
         # ---- SHADER ----
         self.program = QOpenGLShaderProgram()
-        self.program.setUniformValue("u_use_skinning", True)
         self.program.addShaderFromSourceCode(
             QOpenGLShader.ShaderTypeBit.Vertex, ASSET_SHADER_VERTEX)
 
@@ -446,10 +314,7 @@ class GLViewport(QOpenGLWidget):
         """
         if hasattr(self, "meshes"):
             for m in self.meshes:
-                if m.vbo:
-                    glDeleteBuffers(1, [m.vbo])
-                if m.vao:
-                    glDeleteVertexArrays(1, [m.vao])
+                m.delete()
         self.meshes = []
 
         # --- Delete VBO ---
@@ -527,29 +392,11 @@ class GLViewport(QOpenGLWidget):
 
         glMatrixMode(GL_MODELVIEW)
 
-    def extract_position(self, matrix4):
-        # assuming column-major 4x4 matrix
-        return (
-            matrix4.elements[0][3],
-            matrix4.elements[1][3],
-            matrix4.elements[2][3],
-        )
-
-    def build_skeleton_lines(self, bones):
-        lines = []
-
-        for bone in bones:
-            if bone.parent is None:
-                continue
-
-            bone.parent.updateMatrixWorld()
-            bone.updateMatrixWorld()
-            p0 = self.extract_position(bone.parent.matrixWorld)
-            p1 = self.extract_position(bone.matrixWorld)
-
-            lines.append((p0, p1))
+    def build_skeleton_lines(self, skeleton):
+        joints = skeleton.joint_positions()
+        children = np.flatnonzero(skeleton.parents >= 0)
 
-        return lines
+        return list(zip(joints[skeleton.parents[children]].tolist(), joints[children].tolist()))
 
     def draw_skeleton(self, lines):
         glUseProgram(0)
@@ -662,7 +509,19 @@ class GLViewport(QOpenGLWidget):
                     )
 
         # ---- Draw ----
+        skinning_loc = glGetUniformLocation(self.program.programId(), b"u_use_skinning")
+        bones_loc = glGetUniformLocation(self.program.programId(), b"u_bones")
+
         for mesh in self.meshes:
+            skinned = mesh.skin_vbo is not None and mesh.skeleton is not None
+            if skinning_loc != -1:
+                glUniform1i(skinning_loc, int(skinned))
+
+            if skinned and bones_loc != -1:
+                # one upload of the whole (bones, 4, 4) palette, numpy is row major
+                palette = np.ascontiguousarray(mesh.skeleton.boneMatrices[:MAX_BONES], dtype=np.float32)
+                glUniformMatrix4fv(bones_loc, len(palette), GL_TRUE, palette)
+
             glBindTexture(GL_TEXTURE_2D, mesh.texture_id)
             glBindVertexArray(mesh.vao)
             glDrawArrays(GL_TRIANGLES, 0, mesh.vertex_count)
@@ -683,34 +542,12 @@ class GLViewport(QOpenGLWidget):
             glMatrixMode(GL_MODELVIEW)
             glLoadMatrixf(np.array((view * model).data(), dtype=np.float32))
 
-            lines = self.build_skeleton_lines(self.activeSHP.Skeleton.bones)
+            lines = self.build_skeleton_lines(self.activeSHP.Skeleton)
             self.draw_skeleton(lines)
 
     def create_gl_texture_from_rgba(self, buffer, width, height):
         self.makeCurrent()
-        tex_id = glGenTextures(1)
-
-        glBindTexture(GL_TEXTURE_2D, tex_id)
-
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-        glTexImage2D(
-            GL_TEXTURE_2D,
-            0,
-            GL_RGBA,
-            width,
-            height,
-            0,
-            GL_RGBA,
-            GL_UNSIGNED_BYTE,
-            bytes(buffer),
-        )
-
-        glBindTexture(GL_TEXTURE_2D, 0)
-        return tex_id
+        return create_texture(buffer, width, height)
 
     """CAMERA CONTROLS"""
 
@@ -842,56 +679,3 @@ class GLViewport(QOpenGLWidget):
 
 
         self.update()
-
-class GLMesh:
-    def __init__(self, vertices, uvs, faces, colors, texture_id, material_id, skinned_mesh=None, skeleton=None):
-        self.vertices = vertices
-        self.uvs = uvs
-        self.faces = faces
-        self.colors = colors
-        self.texture_id = texture_id
-        self.material_id = material_id
-        self.skinned_mesh = skinned_mesh
-        self.skeleton = skeleton
-        self.vao = None
-        self.vbo = None
-        self.vertex_count = 0
-
-    def upload(self):
-        data = []
-
-        for face in self.faces:
-            for v_idx, uv_idx in face:
-                data.extend(self.vertices[v_idx])
-                data.extend(self.uvs[uv_idx])
-                if self.colors and v_idx < len(self.colors):
-                    c = self.colors[v_idx]
-                    # If your build function did r/255, c is already 0.0-1.0
-                    # We add 1.0 for the Alpha channel
-                    data.extend([c[0], c[1], c[2], 1.0])
-                else:
-                    # Default to PS1 Neutral Gray (0.5) so that 0.5 * 2 = 1.0 brightness
-                    data.extend([0.5, 0.5, 0.5, 1.0])
-
-        data = np.array(data, dtype=np.float32)
-        self.vertex_count = len(data) // 9  # 3 pos + 2 uv + 4 color
-
-        self.vao = glGenVertexArrays(1)
-        self.vbo = glGenBuffers(1)
-
-        glBindVertexArray(self.vao)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
-
-        stride = 9 * 4
-
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
-        glEnableVertexAttribArray(0)
-
-        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
-        glEnableVertexAttribArray(1)
-
-        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(20))
-        glEnableVertexAttribArray(2)
-
-        glBindVertexArray(0)
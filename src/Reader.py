@@ -1,3 +1,5 @@
+import numpy as np
+
 from src.VSTOOLS import hex2
 class Reader:
     def __init__(self, data):
@@ -6,6 +8,7 @@ class Reader:
         """
         self.data = data
         self.pos = 0
+        self._array = None
 
         # Match JS Int8Array behavior
         self.type = [0] * len(data)
@@ -90,6 +93,22 @@ class Reader:
 
         return r
 
+    # -------------------------
+    # Vectorized access
+    # -------------------------
+
+    def u8_array(self):
+        """
+        Whole buffer as a uint8 array, for decoding fixed size records
+        in bulk. Reads through it are not tracked in self.type.
+        """
+        if self._array is None:
+            if isinstance(self.data, (bytes, bytearray)):
+                self._array = np.frombuffer(self.data, dtype=np.uint8)
+            else:
+                self._array = np.asarray(self.data, dtype=np.uint8)
+        return self._array
+
     # -------------------------
     # Buffers & validation
     # -------------------------
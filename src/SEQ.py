@@ -1,9 +1,40 @@
 from src.SEQAnimation import SEQAnimation
 
 
+class SEQAnimationList:
+    """
+    Animations of a SEQ, decoded (and built, once SEQ.build was called)
+    the first time they are accessed.
+    """
+
+    def __init__(self, seq, animations):
+        self.seq = seq
+        self.animations = animations
+
+    def __len__(self):
+        return len(self.animations)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        animation = self.animations[i]
+        animation.load()
+        return animation
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def loaded(self):
+        return [a for a in self.animations if a.loaded]
+
+
 class SEQ:
     def __init__(self, reader):
         self.reader = reader
+        self.built = False
+        self.time_scale = 1.0
 
     def read(self):
         self.header()
@@ -38,12 +69,14 @@ class SEQ:
         )
 
         # read animation headers
-        self.animations = []
+        animations = []
 
         for i in range(self.num_animations):
             animation = SEQAnimation(self.reader, self)
             animation.header(i)
-            self.animations.append(animation)
+            animations.append(animation)
+
+        self.animations = SEQAnimationList(self, animations)
 
         # read "slots"
         # these are animation ids, usable as self.animations[id]
@@ -57,13 +90,17 @@ class SEQ:
 
             self.slots.append(slot)
 
-        # read animation data
-        for animation in self.animations:
-            animation.data()
+        # animation data is read on first access, see SEQAnimationList
+
+    def build(self, time_scale=1.0):
+        """
+        Animations loaded from now on get their tracks built as well.
+        """
+        self.built = True
+        self.time_scale = time_scale
 
-    def build(self):
-        for animation in self.animations:
-            animation.build()
+        for animation in self.animations.loaded():
+            animation.build(time_scale)
 
     def ptr_data(self, i):
         return i + self.header_offset + self.base_offset
@@ -1,5 +1,6 @@
-from src.VSTOOLS import hex2, rot2quat, rot13_to_rad_func
+from src.VSTOOLS import hex2, rot13_to_quat
 import math
+import numpy as np
 
 ACTIONS = {
     0x01: ("loop", 0),
@@ -40,6 +41,8 @@ class SEQAnimation:
     def __init__(self, reader, seq):
         self.reader = reader
         self.seq = seq
+        self.pose = None
+        self.loaded = False
 
     # -----------------
     # Header
@@ -74,6 +77,20 @@ class SEQAnimation:
     # Data
     # -----------------
 
+    def load(self):
+        """
+        Decodes the keys (and builds the tracks if the SEQ was built)
+        the first time the animation is needed.
+        """
+        if self.loaded:
+            return
+
+        self.loaded = True
+        self.data()
+
+        if self.seq.built:
+            self.build(self.seq.time_scale)
+
     def data(self):
         r = self.reader
 
@@ -240,56 +257,59 @@ class SEQAnimation:
         }
 
     # -----------------
-    # Build (engine-facing)
+    # Key integration
     # -----------------
-    # Left as data preparation — engine export comes next
-    def build_scale_track(self, bone_id, time_scale=1.0):
-        if self.scale_flags & 0x1:
-            base = self.scale_per_bone[bone_id]
-            sx = base["x"] / 64.0
-            sy = base["y"] / 64.0
-            sz = base["z"] / 64.0
-        else:
-            sx = sy = sz = 1.0
 
-        if self.scale_flags & 0x2:
-            keys = self.scale_keys_per_bone[bone_id]
-        else:
+    @staticmethod
+    def key_arrays(keys):
+        """
+        Converts read_keys output to (frame counts, (n, 3) deltas).
+        Missing components repeat the previous delta.
+        """
+        if not keys:
             keys = [{"f": 0, "x": 0, "y": 0, "z": 0}]
 
-        times = []
-        values = []
-
-        t = 0
-        prev_x = prev_y = prev_z = 0
+        counts = np.array([key["f"] for key in keys], dtype=np.int64)
+        deltas = np.array(
+            [[key["x"], key["y"], key["z"]] for key in keys],
+            dtype=np.float64,
+        )
 
-        for key in keys:
-            f = key["f"]
+        # forward fill None (nan) from the last key that had the component
+        known = ~np.isnan(deltas)
+        known[0] = True
+        rows = np.where(known, np.arange(len(keys))[:, None], 0)
+        rows = np.maximum.accumulate(rows, axis=0)
+        deltas = deltas[rows, np.arange(3)]
+        deltas[np.isnan(deltas)] = 0
 
-            dx = key["x"] if key["x"] is not None else prev_x
-            dy = key["y"] if key["y"] is not None else prev_y
-            dz = key["z"] if key["z"] is not None else prev_z
+        return counts, deltas
 
-            t += f
-
-            sx += (dx / 64.0) * f
-            sy += (dy / 64.0) * f
-            sz += (dz / 64.0) * f
-
-            times.append(t * time_scale)
-            values.append((sx, sy, sz))
-
-            prev_x, prev_y, prev_z = dx, dy, dz
+    def integrate_keys(self, base, keys, num_frames=None):
+        """
+        Per frame values, every key adds its delta once per frame it spans.
+        Returns (frames, 3) starting at base, frames defaults to the frame
+        the last key ends on + 1, longer requests hold the last value.
+        Also returns the frame every key ends on.
+        """
+        counts, deltas = self.key_arrays(keys)
+        key_frames = np.cumsum(counts)
+
+        steps = np.repeat(deltas, counts, axis=0)
+        values = np.empty((len(steps) + 1, 3), dtype=np.float64)
+        values[0] = base
+        np.cumsum(steps, axis=0, out=values[1:])
+        values[1:] += base
+
+        if num_frames is not None:
+            if num_frames <= len(values):
+                values = values[:num_frames]
+            else:
+                values = np.concatenate([values, np.repeat(values[-1:], num_frames - len(values), axis=0)])
 
-        return {
-            "bone": bone_id,
-            "type": "scale",
-            "times": times,
-            "values": values,
-        }
+        return values, key_frames
 
-    def build_rotation_track(self, bone_id, time_scale=1.0):
-        # Base rotation
+    def base_rotation(self, bone_id):
         if self.base_animation_id == -1:
             base = self.rotation_per_bone[bone_id]
         else:
@@ -298,49 +318,54 @@ class SEQAnimation:
             ].rotation_per_bone[bone_id]
 
         # PS1 quirk: base * 2
-        rx = base["x"] * 2
-        ry = base["y"] * 2
-        rz = base["z"] * 2
-
-        keys = self.rotation_keys_per_bone[bone_id]
-
-        times = []
-        values = []
-
-        t = 0
-        prev_x = prev_y = prev_z = 0
+        return base["x"] * 2, base["y"] * 2, base["z"] * 2
 
-        for key in keys:
-            f = key["f"]
-
-            dx = key["x"] if key["x"] is not None else prev_x
-            dy = key["y"] if key["y"] is not None else prev_y
-            dz = key["z"] if key["z"] is not None else prev_z
+    def base_scale(self, bone_id):
+        """Scale in 1/64 units"""
+        if self.scale_flags & 0x1:
+            base = self.scale_per_bone[bone_id]
+            return base["x"], base["y"], base["z"]
+        return 64, 64, 64
 
-            t += f
+    def scale_keys(self, bone_id):
+        if self.scale_flags & 0x2:
+            return self.scale_keys_per_bone[bone_id]
+        return []
 
-            rx += dx * f
-            ry += dy * f
-            rz += dz * f
+    # -----------------
+    # Build (engine-facing)
+    # -----------------
+    # Tracks hold one value per key, sampled from the same integration as bake()
+    def build_scale_track(self, bone_id, time_scale=1.0):
+        values, key_frames = self.integrate_keys(
+            self.base_scale(bone_id), self.scale_keys(bone_id)
+        )
+        values = values[key_frames] / 64.0
 
-            q = rot2quat(
-                rot13_to_rad_func(rx),
-                rot13_to_rad_func(ry),
-                rot13_to_rad_func(rz),
-            )
+        return {
+            "bone": bone_id,
+            "type": "scale",
+            "times": [int(t) * time_scale for t in key_frames],
+            "values": [tuple(v) for v in values.tolist()],
+        }
 
-            times.append(t * time_scale)
-            values.append((q[0], q[1], q[2], q[3]))
+    def build_rotation_track(self, bone_id, time_scale=1.0):
+        values, key_frames = self.integrate_keys(
+            self.base_rotation(bone_id), self.rotation_keys_per_bone[bone_id]
+        )
 
-            prev_x, prev_y, prev_z = dx, dy, dz
+        quats = [tuple(q) for q in rot13_to_quat(values[key_frames]).tolist()]
 
         return {
             "bone": bone_id,
             "type": "rotation",
-            "times": times,
-            "values": values,
+            "times": [int(t) * time_scale for t in key_frames],
+            "values": quats,
         }
 
+    def get_track(self, bone_id, track_type="rotation"):
+        return self.track_index.get((bone_id, track_type))
+
     def build(self, time_scale=1.0):
         """
         Builds engine-facing animation tracks.
@@ -359,5 +384,58 @@ class SEQAnimation:
                 tracks.append(self.build_scale_track(bone_id, time_scale))
 
         self.tracks = tracks
+        self.track_index = {(track["bone"], track["type"]): track for track in tracks}
         self.duration = self.length * time_scale
 
+    # -----------------
+    # Baked pose (per frame)
+    # -----------------
+
+    def bake(self):
+        """
+        Evaluates the whole animation once and caches it.
+        Result:
+          self.pose["rotation"]    → (frames, bones, 4) quaternions (x, y, z, w)
+          self.pose["scale"]       → (frames, bones, 3) or None without scale keys
+          self.pose["translation"] → (frames, 3) root translation
+        """
+        if self.pose is not None:
+            return self.pose
+
+        num_frames = max(self.length, 1)
+        num_bones = self.seq.num_bones
+
+        rotation = np.empty((num_frames, num_bones, 4), dtype=np.float32)
+        scale = None
+
+        for bone_id in range(num_bones):
+            angles, _ = self.integrate_keys(
+                self.base_rotation(bone_id),
+                self.rotation_keys_per_bone[bone_id],
+                num_frames,
+            )
+
+            rotation[:, bone_id] = rot13_to_quat(angles)
+
+        if self.scale_flags & 0x3:
+            scale = np.empty((num_frames, num_bones, 3), dtype=np.float32)
+
+            for bone_id in range(num_bones):
+                values, _ = self.integrate_keys(
+                    self.base_scale(bone_id), self.scale_keys(bone_id), num_frames
+                )
+                scale[:, bone_id] = values / 64.0
+
+        base = self.translation
+        translation, _ = self.integrate_keys(
+            (base["x"], base["y"], base["z"]),
+            self.translation_keys,
+            num_frames,
+        )
+
+        self.pose = {
+            "rotation": rotation,
+            "scale": scale,
+            "translation": translation.astype(np.float32),
+        }
+        return self.pose
@@ -1,7 +1,6 @@
 import random
 import numpy as np
 from src.VSTOOLS import parse_color, bytearray_to_image, flip_image, image_to_bytearray
-from PIL import Image
 import io
 
 class TIM:
@@ -73,6 +72,18 @@ class TIM:
 
         return buffer
 
+    def indices(self):
+        """
+        (height, width * 4) uint8 CLUT indices, the texels build() expands,
+        low nibble first.
+        """
+        packed = np.frombuffer(self.reader.data, dtype=np.uint8, count=self.width * self.height * 2, offset=self.data_ptr)
+
+        indices = np.empty(packed.size * 2, dtype=np.uint8)
+        indices[0::2] = packed & 0x0F
+        indices[1::2] = packed >> 4
+        return indices.reshape(self.height, self.width * 4)
+
     def build(self, clut):
         r = self.reader
         r.seek(self.data_ptr)
@@ -1,6 +1,8 @@
 import numpy as np
 import math
 
+from src.VSTOOLS import compose_matrix_array, skin_positions
+
 
 class Vector3:
     def __init__(self, x=0, y=0, z=0):
@@ -100,6 +102,7 @@ class Object3D:
 
         self.position = Vector3()
         self.rotation = Vector3()  # radians
+        self.quaternion = (0.0, 0.0, 0.0, 1.0)  # x, y, z, w
         self.scale = Vector3(1, 1, 1)
 
         self.matrix = Matrix4()
@@ -113,11 +116,9 @@ class Object3D:
         self.children.append(child)
 
     def updateMatrix(self):
-        m = np.identity(4, dtype=np.float32)
-        m[0, 3] = self.position.x
-        m[1, 3] = self.position.y
-        m[2, 3] = self.position.z
-        self.matrix.elements[:] = m
+        # animation code may assign plain tuples for scale
+        scale = self.scale.get() if isinstance(self.scale, Vector3) else self.scale
+        self.matrix.elements[:] = compose_matrix_array(self.position.get(), self.quaternion, scale)
 
     def updateMatrixWorld(self, force=False):
         self.updateMatrix()
@@ -160,6 +161,59 @@ class Material:
         self.texture = texture
         self.vertex_color = vertex_color
 
+
+class SceneMesh:
+    """
+    Mesh in the layout the exporters read, without any GL state, the
+    viewer's GLMesh (src.GLUpload) adds the buffers on top. faces is
+    (T, 3, 2) of (vertex index, uv index) pairs.
+    """
+    def __init__(self, vertices, uvs, faces, colors, material_id, skinned_mesh=None, skeleton=None):
+        self.vertices = vertices
+        self.uvs = uvs
+        self.faces = faces
+        self.colors = colors
+        self.material_id = material_id
+        self.skinned_mesh = skinned_mesh
+        self.skeleton = skeleton
+        self.skin_index = None
+        self.skin_weight = None
+
+    @classmethod
+    def from_geometry(cls, attributes, material_id):
+        positions = np.asarray(attributes["positions"], dtype=np.float32).reshape(-1, 3)
+
+        uvs = np.asarray(attributes["uvs"], dtype=np.float32).reshape(-1, 2).copy()
+        uvs[:, 1] = 1.0 - uvs[:, 1]  # OpenGL flip, as the viewer uploads them
+
+        colors = attributes.get("colors")
+        if colors is not None and len(colors):
+            colors = np.asarray(colors, dtype=np.float32).reshape(len(positions), -1)
+        else:
+            colors = None
+
+        triangles = np.asarray(attributes["indices"], dtype=np.int64).reshape(-1, 3)
+        faces = np.stack([triangles, triangles], axis=-1)
+
+        return cls(positions, uvs, faces, colors, material_id)
+
+    @classmethod
+    def from_wep(cls, wep, material_id):
+        mesh = cls.from_geometry(wep.geometry.attributes, material_id)
+        mesh.skinned_mesh = wep.mesh
+        mesh.skeleton = wep.Skeleton
+        mesh.skin_index = wep.geometry.attributes["skin_index"]
+        mesh.skin_weight = wep.geometry.attributes["skin_weight"]
+        return mesh
+
+    @classmethod
+    def from_mpd(cls, mpd):
+        return [
+            cls.from_geometry(mesh.geometry.attributes, mesh.material_id)
+            for mesh in mpd.meshes
+            if mesh.material is not None
+        ]
+
 class Mesh(Object3D):
     def __init__(self, geometry=None, material=None):
         super().__init__()
@@ -181,33 +235,35 @@ class SkinnedMesh(Mesh):
         self.bindMatrix.copy(self.matrixWorld)
         self.bindMatrixInverse.getInverse(self.bindMatrix)
 
-    def boneTransform(self, index, target):
-        base = Vector3().fromBufferAttribute(
-            self.geometry.attributes["position"], index
-        ).applyMatrix4(self.bindMatrix)
-
-        skinIndex = Vector4().fromBufferAttribute(
-            self.geometry.attributes["skinIndex"], index
-        )
-        skinWeight = Vector4().fromBufferAttribute(
-            self.geometry.attributes["skinWeight"], index
+    def skin(self, palette=None):
+        """
+        Deformed positions for all vertices, (V, 3) for the current pose
+        or (frames, V, 3) for a (frames, bones, 4, 4) palette.
+        """
+        if palette is None:
+            self.skeleton.update()
+            palette = self.skeleton.boneMatrices
+
+        attributes = self.geometry.attributes
+        return skin_positions(
+            attributes["positions"],
+            attributes["skin_index"],
+            attributes["skin_weight"],
+            palette,
         )
 
-        target.set(0, 0, 0)
+    def boneTransform(self, index, target):
+        self.skeleton.update()
+        attributes = self.geometry.attributes
 
-        for i in range(4):
-            w = skinWeight.getComponent(i)
-            if w != 0:
-                bi = int(skinIndex.getComponent(i))
-                m = Matrix4().multiplyMatrices(
-                    self.skeleton.bones[bi].matrixWorld,
-                    self.skeleton.boneInverses[bi]
-                )
-                target.addScaledVector(
-                    Vector3().copy(base).applyMatrix4(m), w
-                )
+        x, y, z = skin_positions(
+            np.asarray(attributes["positions"]).reshape(-1, 3)[index],
+            np.asarray(attributes["skin_index"])[index],
+            np.asarray(attributes["skin_weight"])[index],
+            self.skeleton.boneMatrices,
+        )[0]
 
-        return target.applyMatrix4(self.bindMatrixInverse)
+        return target.set(x, y, z)
 
 class MPDGeometry:
     def __init__(self, positions, normals, colors, uvs, indices):
@@ -219,64 +275,164 @@ class MPDGeometry:
 
 
 
-_identityMatrix = Matrix4()
-_offsetMatrix = Matrix4()
+class Skeleton:
+    """
+    Flat skeleton. Bone objects only describe the hierarchy (name, parent,
+    children, bind position), transforms live in arrays:
 
+      parents      (N,)      parent index, -1 for roots
+      order        (N,)      bone indices, parents before children
+      local/world  (N, 4, 4) matrices, world evaluated level by level
+      boneInverses (N, 4, 4) inverse bind matrices
+      boneMatrices (N, 4, 4) skinning palette, world * inverse bind
+    """
 
-class Skeleton:
     def __init__(self, bones=None, boneInverses=None):
         self.bones = list(bones) if bones else []
-        self.boneMatrices = [0.0] * (len(self.bones) * 16)
         self.frame = -1
 
+        index = {bone: i for i, bone in enumerate(self.bones)}
+        self.parents = np.array(
+            [index.get(bone.parent, -1) for bone in self.bones], dtype=np.int64
+        )
+
+        depth = np.zeros(len(self.bones), dtype=np.int64)
+        for i in range(len(self.bones)):
+            p = self.parents[i]
+            while p >= 0:
+                depth[i] += 1
+                p = self.parents[p]
+
+        self.order = np.argsort(depth, kind="stable")
+        self.levels = [np.flatnonzero(depth == d) for d in range(int(depth.max()) + 1)] if self.bones else []
+
+        # bind pose
+        self.positions = np.array(
+            [bone.position.get() for bone in self.bones], dtype=np.float64
+        ).reshape(-1, 3)
+
+        self.local = compose_matrix_array(self.positions, (0.0, 0.0, 0.0, 1.0), (1.0, 1.0, 1.0))
+        self.world = np.zeros_like(self.local)
+        self.dirty = np.ones(len(self.bones), dtype=bool)
+        self.update_world()
+
         if boneInverses is None:
             self.calculateInverses()
         else:
             if len(boneInverses) == len(self.bones):
-                self.boneInverses = list(boneInverses)
+                self.boneInverses = np.array(boneInverses, dtype=np.float64)
             else:
                 print("Skeleton boneInverses is the wrong length.")
-                self.boneInverses = [Matrix4() for _ in self.bones]
+                self.boneInverses = np.repeat(np.identity(4)[None], len(self.bones), axis=0)
 
+        self.boneMatrices = np.zeros((len(self.bones), 4, 4), dtype=np.float32)
         self.boneTexture = None
+        self.update()
 
     def calculateInverses(self):
-        self.boneInverses = []
-
-        for bone in self.bones:
-            inverse = Matrix4()
-            if bone:
-                inverse.getInverse(bone.matrixWorld)
-            self.boneInverses.append(inverse)
+        self.boneInverses = np.linalg.inv(self.world)
 
     def pose(self):
-        # restore bind pose world matrices
-        for i, bone in enumerate(self.bones):
-            if bone:
-                bone.matrixWorld.getInverse(self.boneInverses[i])
-
-        # compute local transforms
-        for bone in self.bones:
-            if bone:
-                if bone.parent and getattr(bone.parent, "isBone", False):
-                    bone.matrix.getInverse(bone.parent.matrixWorld)
-                    bone.matrix.multiply(bone.matrixWorld)
-                else:
-                    bone.matrix.copy(bone.matrixWorld)
-
-                bone.matrix.decompose(
-                    bone.position, bone.quaternion, bone.scale
+        """restore the bind pose"""
+        self.set_pose()
+
+    def pose_locals(self, rotation=None, scale=None, translation=None):
+        """
+        Local matrices for rotations (..., n, 4), scales (..., n, 3) and a
+        root translation (..., 3), n <= N bones. Leading dims are frames.
+        Bones without a value keep their bind transform.
+        """
+        lead = ()
+        for value, core in ((rotation, 2), (scale, 2), (translation, 1)):
+            if value is not None:
+                lead = np.asarray(value).shape[:-core]
+                break
+
+        num_bones = len(self.bones)
+
+        quaternions = np.zeros(lead + (num_bones, 4))
+        quaternions[..., 3] = 1.0
+        if rotation is not None:
+            rotation = np.asarray(rotation)[..., :num_bones, :]
+            quaternions[..., :rotation.shape[-2], :] = rotation
+
+        scales = np.ones(lead + (num_bones, 3))
+        if scale is not None:
+            scale = np.asarray(scale)[..., :num_bones, :]
+            scales[..., :scale.shape[-2], :] = scale
+
+        positions = np.broadcast_to(self.positions, lead + (num_bones, 3)).copy()
+        if translation is not None and num_bones:
+            positions[..., 0, :] = translation
+
+        return compose_matrix_array(positions, quaternions, scales)
+
+    def evaluate(self, local):
+        """
+        World matrices for (..., N, 4, 4) locals, one batched matmul per depth.
+        """
+        world = np.empty_like(local)
+        for i, level in enumerate(self.levels):
+            if i == 0:
+                world[..., level, :, :] = local[..., level, :, :]
+            else:
+                world[..., level, :, :] = np.matmul(
+                    world[..., self.parents[level], :, :], local[..., level, :, :]
                 )
+        return world
+
+    def set_pose(self, rotation=None, scale=None, translation=None):
+        self.local = self.pose_locals(rotation, scale, translation)
+        self.dirty[:] = True
+
+    def set_local(self, bone_id, matrix):
+        self.local[bone_id] = matrix
+        self.dirty[bone_id] = True
+
+    def update_world(self):
+        """
+        Ordered pass over the dirty bones and their descendants.
+        """
+        if not self.dirty.any():
+            return
+
+        dirty = self.dirty.copy()
+        for level in self.levels[1:]:
+            dirty[level] |= dirty[self.parents[level]]
+
+        for i, level in enumerate(self.levels):
+            level = level[dirty[level]]
+            if not len(level):
+                continue
+            if i == 0:
+                self.world[level] = self.local[level]
+            else:
+                self.world[level] = np.matmul(self.world[self.parents[level]], self.local[level])
+
+        self.dirty[:] = False
+
+    def palettes(self, world):
+        """(..., N, 4, 4) world matrices to skinning palettes"""
+        return np.matmul(world, self.boneInverses)
+
+    def pose_palettes(self, rotation=None, scale=None, translation=None):
+        """
+        Skinning palettes for a stack of poses, see pose_locals.
+        A baked SEQ pose gives (frames, N, 4, 4).
+        """
+        return self.palettes(self.evaluate(self.pose_locals(rotation, scale, translation)))
 
     def update(self):
-        for i, bone in enumerate(self.bones):
-            matrix = bone.matrixWorld if bone else _identityMatrix
-            _offsetMatrix.multiplyMatrices(matrix, self.boneInverses[i])
-            _offsetMatrix.toArray(self.boneMatrices, i * 16)
+        self.update_world()
+        self.boneMatrices = self.palettes(self.world).astype(np.float32)
 
         if self.boneTexture:
             self.boneTexture.needsUpdate = True
 
+    def joint_positions(self):
+        self.update_world()
+        return self.world[:, :3, 3]
+
     def clone(self):
         return Skeleton(self.bones, self.boneInverses)
 
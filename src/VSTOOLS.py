@@ -1,7 +1,5 @@
 import math
 import os
-from PIL import Image
-from PySide6.QtGui import QQuaternion, QVector3D
 import io
 import numpy as np
 
@@ -49,43 +47,47 @@ def assert_val(expr, expected=None):
 
 
 # --- Image Processing ---
+# PIL is imported on first use, the viewer starts without it
 
-def export_png(data, width, height, output_path="output.png", flip=False):
+def export_png(data, width, height, output_path="output.png", flip=False, compress_level=6):
     """
     Converts raw RGBA byte data to a PNG file.
     Note: Python's PIL doesn't require the 'canvas flip' logic used in JS
     unless your source data is specifically bottom-to-top.
+
+    compress_level is zlib's 0-9, 1 writes much faster for slightly larger files.
     """
-    # Create image from bytes
-    img = Image.frombytes("RGBA", (width, height), bytes(data))
+    from PIL import Image
+
+    # Wraps the buffer without copying it
+    img = Image.frombuffer("RGBA", (width, height), data, "raw", "RGBA", 0, 1)
 
     # The JS version performs a vertical flip during the loop.
     # To match that behavior exactly:
     if flip:
         img = img.transpose(Image.FLIP_TOP_BOTTOM)
-    os.makedirs(os.path.split(output_path)[0], exist_ok=True)
-    img.save(output_path)
+    os.makedirs(os.path.split(output_path)[0] or ".", exist_ok=True)
+    img.save(output_path, compress_level=compress_level)
     return output_path
 
 
-def bytearray_to_image(buffer: bytearray, width: int, height: int, byte_depth=4) -> Image.Image:
+def bytearray_to_image(buffer: bytearray, width: int, height: int, byte_depth=4) -> "Image.Image":
     """
     Convert raw RGBA bytearray into a PIL Image.
     """
+    from PIL import Image
 
 
     expected_size = width * height * byte_depth
-    if len(buffer) != expected_size:
+    size = memoryview(buffer).nbytes
+    if size != expected_size:
         raise ValueError(
-            f"Buffer size mismatch: got {len(buffer)}, expected {expected_size}"
+            f"Buffer size mismatch: got {size}, expected {expected_size}"
         )
 
     if byte_depth == 4:
-        img = Image.frombytes(
-            mode="RGBA",
-            size=(width, height),
-            data=bytes(buffer)
-        )
+        # shares the buffer instead of copying it
+        img = Image.frombuffer("RGBA", (width, height), buffer, "raw", "RGBA", 0, 1)
     else:
         img = Image.frombytes(
             mode="I;16",
@@ -103,6 +105,8 @@ def bytearray_to_image_rg8(buffer, width, height):
     arr = np.frombuffer(buffer, dtype=np.uint8)
     arr = arr.reshape((height, width, 2))
 
+    from PIL import Image
+
     # Expand to RGBA for display
     rgba = np.zeros((height, width, 4), dtype=np.uint8)
     rgba[..., 0] = arr[..., 0]  # R
@@ -113,10 +117,12 @@ def bytearray_to_image_rg8(buffer, width, height):
 
 
 def flip_image(image):
+    from PIL import Image
+
     return image.transpose(Image.FLIP_TOP_BOTTOM)
 
 
-def image_to_bytearray(image: Image) -> bytes:
+def image_to_bytearray(image: "Image.Image") -> bytes:
   # BytesIO is a file-like buffer stored in memory
   imgByteArr = io.BytesIO()
   # image.save expects a file-like as a argument
@@ -161,15 +167,214 @@ def rot2quat(rx, ry, rz):
     Apply X, then Y, then Z
     Angles are in radians
     """
+    q = rot2quat_array(rx, ry, rz)
+
+    return tuple(q.tolist())
+
+
+def rot2quat_array(rx, ry, rz):
+    """
+    Vectorized rot2quat, angles are scalars or arrays of the same shape
+    in radians. Returns (..., 4) normalized quaternions as (x, y, z, w).
+    """
+    hx = np.asarray(rx, dtype=np.float64) * 0.5
+    hy = np.asarray(ry, dtype=np.float64) * 0.5
+    hz = np.asarray(rz, dtype=np.float64) * 0.5
 
-    qx = QQuaternion.fromAxisAndAngle(QVector3D(1, 0, 0), math.degrees(rx))
-    qy = QQuaternion.fromAxisAndAngle(QVector3D(0, 1, 0), math.degrees(ry))
-    qz = QQuaternion.fromAxisAndAngle(QVector3D(0, 0, 1), math.degrees(rz))
+    cx, sx = np.cos(hx), np.sin(hx)
+    cy, sy = np.cos(hy), np.sin(hy)
+    cz, sz = np.cos(hz), np.sin(hz)
 
-    q = qz * (qy * qx)
-    q.normalize()
+    # Qy * Qx
+    pw = cy * cx
+    px = cy * sx
+    py = sy * cx
+    pz = -sy * sx
+
+    # Qz * (Qy * Qx)
+    q = np.stack([
+        cz * px - sz * py,
+        cz * py + sz * px,
+        cz * pz + sz * pw,
+        cz * pw - sz * pz,
+    ], axis=-1)
+
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def quat_to_mat3_array(q):
+    """
+    (..., 4) quaternions (x, y, z, w) to (..., 3, 3) rotation matrices.
+    """
+    q = np.asarray(q, dtype=np.float64)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+
+    return np.stack([
+        np.stack([1 - 2 * (yy + zz), 2 * (xy - wz), 2 * (xz + wy)], axis=-1),
+        np.stack([2 * (xy + wz), 1 - 2 * (xx + zz), 2 * (yz - wx)], axis=-1),
+        np.stack([2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy)], axis=-1),
+    ], axis=-2)
+
+
+def compose_matrix_array(position, quaternion, scale):
+    """
+    Translation * Rotation * Scale, like Three.js Matrix4.compose.
+    (..., 3), (..., 4), (..., 3) -> (..., 4, 4)
+    """
+    position = np.asarray(position, dtype=np.float64)
+    rotation = quat_to_mat3_array(quaternion)
+    scale = np.asarray(scale, dtype=np.float64)
 
-    return (q.x(), q.y(), q.z(), q.scalar())
+    shape = np.broadcast_shapes(position.shape[:-1], rotation.shape[:-2], scale.shape[:-1])
+    m = np.zeros(shape + (4, 4), dtype=np.float64)
+    m[..., :3, :3] = rotation * scale[..., None, :]
+    m[..., :3, 3] = position
+    m[..., 3, 3] = 1.0
+    return m
+
+
+def skin_positions(positions, skin_index, skin_weight, palette):
+    """
+    Linear blend skinning without GL.
+
+    positions   (V, 3) or flat
+    skin_index  (V, K) bone ids
+    skin_weight (V, K) weights
+    palette     (bones, 4, 4) or (frames, bones, 4, 4), world * inverse bind
+
+    Returns (V, 3) or (frames, V, 3) float32 positions.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    skin_index = np.asarray(skin_index).astype(np.int64).reshape(len(positions), -1)
+    skin_weight = np.asarray(skin_weight, dtype=np.float32).reshape(len(positions), -1)
+    palette = np.asarray(palette, dtype=np.float32)
+
+    out = np.zeros(palette.shape[:-3] + positions.shape, dtype=np.float32)
+
+    # one gather + einsum per influence slot, unused slots are skipped
+    for k in range(skin_index.shape[1]):
+        weight = skin_weight[:, k]
+        if not weight.any():
+            continue
+
+        m = palette[..., skin_index[:, k], :3, :]
+        out += weight[:, None] * (np.einsum("...vij,vj->...vi", m[..., :3], positions) + m[..., 3])
+
+    return out
+
+
+def quat_slerp_array(q0, q1, t):
+    """
+    Slerp between (..., 4) quaternions for (...) factors t, broadcasting.
+    Takes the short way round and falls back to a normalized lerp when the
+    two are nearly parallel.
+    """
+    q0 = np.asarray(q0, dtype=np.float64)
+    q1 = np.asarray(q1, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)[..., None]
+
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+
+    # hemisphere flip
+    q1 = np.where(dot < 0.0, -q1, q1)
+    dot = np.abs(dot)
+
+    near = dot > 0.9995
+    theta_0 = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_0 = np.where(near, 1.0, np.sin(theta_0))
+
+    s0 = np.where(near, 1.0 - t, np.sin((1.0 - t) * theta_0) / sin_0)
+    s1 = np.where(near, t, np.sin(t * theta_0) / sin_0)
+
+    q = s0 * q0 + s1 * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def sample_quat_track(times, values, query):
+    """
+    Slerps a keyframed quaternion track at any array of query times.
+    times (K,), values (K, 4), query (...) -> (..., 4), clamped at both ends.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    query = np.asarray(query, dtype=np.float64)
+
+    if len(times) == 1:
+        return np.broadcast_to(values[0], query.shape + (4,)).copy()
+
+    i = np.clip(np.searchsorted(times, query, side="right") - 1, 0, len(times) - 2)
+    t0 = times[i]
+    span = times[i + 1] - t0
+
+    alpha = np.divide(query - t0, span, out=np.zeros_like(query), where=span > 0)
+    return quat_slerp_array(values[i], values[i + 1], np.clip(alpha, 0.0, 1.0))
+
+
+def last_fitting_key(values, a, tolerance, window=4, max_window=64):
+    """
+    Furthest frame c after a such that every segment a..c' with c' <= c
+    stays within tolerance, the frame the greedy reduction keeps next.
+    values is (frames, channels). Candidate ends are tested a window at a
+    time, the window doubling up to max_window while every candidate fits,
+    so noisy curves do little wasted work and long straight runs take few
+    steps.
+    """
+    n = len(values)
+    start = a + 2
+
+    while start < n:
+        ends = np.arange(start, min(start + window, n))
+        inner = np.arange(a + 1, ends[-1])
+
+        # (ends, inner, channels) deviation of every dropped frame from each candidate line
+        t = (inner - a) / (ends[:, None] - a)
+        line = values[a] + t[..., None] * (values[ends] - values[a])[:, None]
+        fits = (np.abs(line - values[inner]) <= tolerance) | (inner >= ends[:, None])[..., None]
+        fits = fits.all(axis=(1, 2))
+
+        if not fits.all():
+            return ends[np.argmin(fits)] - 1
+        start = ends[-1] + 1
+        window = min(window * 2, max_window)
+
+    return n - 1
+
+
+def reduce_keys(values, tolerance):
+    """
+    Frames to keep from a (frames,) or (frames, channels) curve so that
+    linear interpolation between them stays within tolerance of every
+    dropped frame. Constant curves keep a single key, tolerance None keeps
+    them all.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+
+    if tolerance is None or n <= 2:
+        return np.arange(n)
+
+    values = values.reshape(n, -1)
+
+    if np.all(np.abs(values - values[0]) <= tolerance):
+        return np.array([0])
+
+    keep = [0]
+    while keep[-1] < n - 1:
+        keep.append(last_fitting_key(values, keep[-1], tolerance))
+
+    return np.array(keep)
+
+
+def rot13_to_quat(angles):
+    """
+    (..., 3) SEQ rotations in rot13 units to (..., 4) quaternions (x, y, z, w).
+    """
+    angles = np.asarray(angles, dtype=np.float64) * ROT13_TO_RAD
+    return rot2quat_array(angles[..., 0], angles[..., 1], angles[..., 2])
 
 # --- Note on Mesh and Material Functions ---
 # Functions like 'cloneMeshWithPose' and 'newVSMaterial' are deeply tied
@@ -186,32 +391,83 @@ def float32_buffer_attribute(buffer, shape):
     array = np.array(buffer, dtype=np.float32)
     return array.reshape((-1, shape))
 
-def compute_vertex_normals(positions, indices, face_sizes):
+def triangulate(indices, face_sizes):
+    """
+    Splits consecutive faces of face_sizes indices into an (N, 3) array of
+    triangles, quads become (0, 1, 2) and (0, 2, 3).
+    """
+    face_sizes = np.asarray(face_sizes, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+
+    if np.any((face_sizes != 3) & (face_sizes != 4)):
+        raise ValueError("Only triangles and quads supported")
+
+    face_starts = np.cumsum(face_sizes) - face_sizes
+
+    # a quad contributes two triangles, keep them next to each other
+    tri_counts = face_sizes - 2
+    tri_face = np.repeat(np.arange(len(face_sizes)), tri_counts)
+    second = np.arange(len(tri_face)) - (np.cumsum(tri_counts) - tri_counts)[tri_face]
+
+    corners = np.where(second[:, None] == 0, (0, 1, 2), (0, 2, 3))
+    return indices[face_starts[tri_face][:, None] + corners]
+
+
+def weld(rows):
+    """
+    np.unique over packed vertex rows, keeping first-seen order.
+    Returns (index of the first row of every unique vertex, corner -> vertex).
+    """
+    rows = np.asarray(rows)
+    rows = rows.reshape(len(rows), -1)
+    _, first, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return first[order], rank[inverse.reshape(-1)]
+
+
+def compute_vertex_normals(positions, indices, face_sizes, weighting="area"):
+    """
+    Smooth vertex normals from triangle and quad faces.
+
+    weighting:
+      "area"  - face normals weighted by face area (unnormalized cross product)
+      "angle" - unit face normals weighted by the corner angle
+    """
     positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
-    normals = np.zeros_like(positions, dtype=np.float32)
-
-    idx = 0
-    for size in face_sizes:
-        face = indices[idx:idx + size]
-        idx += size
-
-        if size == 3:
-            tris = [face]
-        elif size == 4:
-            tris = [
-                (face[0], face[1], face[2]),
-                (face[0], face[2], face[3])
-            ]
-        else:
-            raise ValueError("Only triangles and quads supported")
-
-        for i0, i1, i2 in tris:
-            v0, v1, v2 = positions[i0], positions[i1], positions[i2]
-            face_normal = np.cross(v1 - v0, v2 - v0)
-
-            normals[i0] += face_normal
-            normals[i1] += face_normal
-            normals[i2] += face_normal
+    tris = triangulate(indices, face_sizes)
+
+    v0 = positions[tris[:, 0]]
+    v1 = positions[tris[:, 1]]
+    v2 = positions[tris[:, 2]]
+    face_normals = np.cross(v1 - v0, v2 - v0)
+
+    if weighting == "area":
+        corner_normals = np.repeat(face_normals[:, None], 3, axis=1)
+    elif weighting == "angle":
+        lengths = np.linalg.norm(face_normals, axis=1)
+        lengths[lengths == 0] = 1.0
+        unit = face_normals / lengths[:, None]
+
+        corners = np.stack([v0, v1, v2], axis=1)
+        a = np.roll(corners, -1, axis=1) - corners
+        b = np.roll(corners, 1, axis=1) - corners
+        cos = np.einsum("ijk,ijk->ij", a, b)
+        sin = np.linalg.norm(np.cross(a, b), axis=2)
+
+        corner_normals = unit[:, None] * np.arctan2(sin, cos)[:, :, None]
+    else:
+        raise ValueError(f"Unknown normal weighting: {weighting}")
+
+    flat = tris.ravel()
+    corner_normals = corner_normals.reshape(-1, 3)
+
+    normals = np.empty_like(positions)
+    for axis in range(3):
+        normals[:, axis] = np.bincount(flat, weights=corner_normals[:, axis], minlength=len(positions))
 
     # Normalize
     lengths = np.linalg.norm(normals, axis=1)
@@ -219,4 +475,3 @@ def compute_vertex_normals(positions, indices, face_sizes):
     normals /= lengths[:, None]
 
     return normals.flatten()
-
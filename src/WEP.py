@@ -7,6 +7,8 @@
 #     VertexColors,
 #     MeshNormalMaterial,
 # )
+import numpy as np
+
 from src.V3DClasses import Geometry, SkinnedMesh, Material, Bone, Skeleton
 from src.VSTOOLS import float32_buffer_attribute, compute_vertex_normals
 from src.WEP_classes import *
@@ -101,27 +103,9 @@ class WEP:
             self.vertices.append(vertex)
 
     def face_section(self):
-        r = self.reader
-        pos = r.pos
-
-        try:
-            self.faces = []
-            for _ in range(self.num_all_polygons):
-                face = WEPFace(r)
-                face.read()
-                self.faces.append(face)
-        except Exception as err:
-            if "Unknown face type" not in str(err):
-                raise
-
-            r.seek(pos)
-            self.faces = []
-            self.version = 2
-
-            for _ in range(self.num_all_polygons):
-                face = WEPFace(r)
-                face.read_colored()
-                self.faces.append(face)
+        self.faces = WEPFaces(self.reader)
+        self.faces.read(self.num_all_polygons)
+        self.version = self.faces.version
 
     def texture_section(self, num_palettes, wep):
         self.texture_map = WEPTextureMap(self.reader)
@@ -139,96 +123,81 @@ class WEP:
         tw = self.texture_map.get_width()
         th = self.texture_map.height
 
-        iv = 0
-        index = []
-        position = []
-        uv = []
-        skin_weight = []
-        skin_index = []
-        color = []
-        face_sizes = []
+        faces = self.faces
+        quad = faces.quad
+        double = faces.double
+        num_faces = len(faces)
 
-        def get_offset(vertex):
-            offset = 0
-            bone = self.get_parent_bone(self.groups[vertex.group_id].bone_id)
+        # vertices, moved along their bone chain once per group
+        group_bones = np.array([g.bone_id for g in self.groups], dtype=np.int64)
+        group_offsets = self.get_bone_offsets()[group_bones]
 
-            while bone:
-                offset += -bone.length
-                bone = self.get_parent_bone(bone.id)
+        vertex_groups = np.array([v.group_id for v in self.vertices], dtype=np.int64)
+        vertex_positions = np.array([(v.x, v.y, v.z) for v in self.vertices], dtype=np.float32).reshape(-1, 3)
+        vertex_positions[:, 0] += group_offsets[vertex_groups]
+        vertex_bones = group_bones[vertex_groups]
+
+        # one geometry vertex per face corner, faces keep their file order
+        face_sizes = np.where(quad, 4, 3)
+        face_starts = np.cumsum(face_sizes) - face_sizes
+
+        corner_face = np.repeat(np.arange(num_faces), face_sizes)
+        corner = np.arange(len(corner_face)) - face_starts[corner_face]
+
+        # triangles store their first uv last
+        uv_corner = np.where(quad[corner_face], corner, (corner + 1) % 3)
+
+        vertex_ids = faces.vertices[corner_face, corner]
+
+        position = vertex_positions[vertex_ids]
+        uv = faces.uvs[corner_face, uv_corner] / np.array([tw, th], dtype=np.float32)
+        color = faces.colors[corner_face, corner] / 255
+
+        skin_index = np.zeros((len(vertex_ids), 4), dtype=np.float32)
+        skin_index[:, 0] = vertex_bones[vertex_ids]
+        skin_weight = np.zeros((len(vertex_ids), 4), dtype=np.float32)
+        skin_weight[:, 0] = 1
+
+        # index templates per face kind, the double sided ones append the back face
+        templates = (
+            (~quad & ~double, (2, 1, 0)),
+            (~quad & double, (2, 1, 0, 0, 1, 2)),
+            (quad & ~double, (2, 1, 0, 1, 2, 3)),
+            (quad & double, (2, 1, 0, 1, 2, 3, 0, 1, 2, 3, 2, 1)),
+        )
+
+        index_sizes = np.zeros(num_faces, dtype=np.int64)
+        for mask, template in templates:
+            index_sizes[mask] = len(template)
+        index_starts = np.cumsum(index_sizes) - index_sizes
 
-            return offset
-
-        def get_bone_id(vertex):
-            return self.groups[vertex.group_id].bone_id
-
-        for f in self.faces:
-            if f.quad():
-                vs = [self.vertices[i] for i in (f.vertex1, f.vertex2, f.vertex3, f.vertex4)]
-                for v in vs:
-                    position.extend((v.x + get_offset(v), v.y, v.z))
-                    skin_weight.extend((1, 0, 0, 0))
-                    skin_index.extend((get_bone_id(v), 0, 0, 0))
-
-                uv.extend((
-                    f.u1 / tw, f.v1 / th,
-                    f.u2 / tw, f.v2 / th,
-                    f.u3 / tw, f.v3 / th,
-                    f.u4 / tw, f.v4 / th,
-                ))
-
-                color.extend((
-                    f.r1 / 255, f.g1 / 255, f.b1 / 255,
-                    f.r2 / 255, f.g2 / 255, f.b2 / 255,
-                    f.r3 / 255, f.g3 / 255, f.b3 / 255,
-                    f.r4 / 255, f.g4 / 255, f.b4 / 255,
-                ))
-
-                index.extend((iv + 2, iv + 1, iv + 0, iv + 1, iv + 2, iv + 3))
-                face_sizes.append(4)
-                if f.double():
-                    index.extend((iv + 0, iv + 1, iv + 2, iv + 3, iv + 2, iv + 1))
-
-                iv += 4
-            else:
-                vs = [self.vertices[i] for i in (f.vertex1, f.vertex2, f.vertex3)]
-                for v in vs:
-                    position.extend((v.x + get_offset(v), v.y, v.z))
-                    skin_weight.extend((1, 0, 0, 0))
-                    skin_index.extend((get_bone_id(v), 0, 0, 0))
-
-                uv.extend((
-                    f.u2 / tw, f.v2 / th,
-                    f.u3 / tw, f.v3 / th,
-                    f.u1 / tw, f.v1 / th,
-                ))
-
-                color.extend((
-                    f.r1 / 255, f.g1 / 255, f.b1 / 255,
-                    f.r2 / 255, f.g2 / 255, f.b2 / 255,
-                    f.r3 / 255, f.g3 / 255, f.b3 / 255,
-                ))
-
-                index.extend((iv + 2, iv + 1, iv + 0))
-                face_sizes.append(3)
-                if f.double():
-                    index.extend((iv + 0, iv + 1, iv + 2))
-
-                iv += 3
+        index = np.zeros(int(index_sizes.sum()), dtype=np.int64)
+        for mask, template in templates:
+            template = np.array(template, dtype=np.int64)
+            slots = index_starts[mask][:, None] + np.arange(len(template))
+            index[slots] = face_starts[mask][:, None] + template
 
+        # front faces only, back faces would cancel the normals out
+        front = np.concatenate([
+            face_starts[~quad][:, None] + np.array((2, 1, 0)),
+            face_starts[quad][:, None] + np.array((2, 1, 0)),
+            face_starts[quad][:, None] + np.array((1, 2, 3)),
+        ]).ravel()
 
+        position = position.ravel()
 
         self.geometry = Geometry()
         self.geometry.attributes["positions"] = position
-        self.geometry.attributes["normals"] = compute_vertex_normals(position, index, face_sizes)
+        self.geometry.attributes["normals"] = compute_vertex_normals(position, front, [3] * (len(front) // 3))
         self.geometry.attributes["face_sizes"] = face_sizes
         self.geometry.attributes["indices"] = index
-        self.geometry.attributes["colors"] = color
-        self.geometry.attributes["uvs"] = uv
-        self.geometry.attributes["skin_weight"] = float32_buffer_attribute(skin_weight, 4)
-        self.geometry.attributes["skin_index"] = float32_buffer_attribute(skin_index, 4)
+        self.geometry.attributes["colors"] = color.astype(np.float32).ravel()
+        self.geometry.attributes["uvs"] = uv.astype(np.float32).ravel()
+        self.geometry.attributes["skin_weight"] = skin_weight
+        self.geometry.attributes["skin_index"] = skin_index
 
 
-        self.uv =float32_buffer_attribute(uv, 2)
+        self.uv = float32_buffer_attribute(self.geometry.attributes["uvs"], 2)
         #geometry.computeBoundingSphere()
         #geometry.computeVertexNormals()
 
@@ -258,11 +227,6 @@ class WEP:
                 skeleton_bones[parent.id].add(skeleton_bones[i])
                 skeleton_bones[i].position.x = -parent.length
 
-        # IMPORTANT: update world matrices before creating skeleton
-        for b in skeleton_bones:
-            if b.parent is None:
-                b.updateMatrixWorld(True)
-
         self.Skeleton = Skeleton(skeleton_bones)
 
     def build_mesh(self):
@@ -271,8 +235,32 @@ class WEP:
         self.mesh.bind(self.Skeleton)
         self.mesh.rotation.x = 3.141592653589793
 
+    def pose_positions(self, animation):
+        """
+        Skins the mesh for every frame of a SEQAnimation, no GL needed.
+        Returns (frames, vertices, 3) float32 positions.
+        """
+        pose = animation.bake()
+        palette = self.Skeleton.pose_palettes(pose["rotation"], pose["scale"], pose["translation"])
+        return self.mesh.skin(palette)
+
     # ───────────────────────── utils ─────────────────────────
 
+    def get_bone_offsets(self):
+        """
+        x offset of every bone, the negated length of its whole parent chain.
+        """
+        offsets = np.zeros(self.num_bones, dtype=np.float32)
+
+        for i in range(self.num_bones):
+            bone = self.get_parent_bone(i)
+
+            while bone:
+                offsets[i] += -bone.length
+                bone = self.get_parent_bone(bone.id)
+
+        return offsets
+
     def get_parent_bone(self, bone_id):
         bone = self.bones[bone_id]
         return self.bones[bone.parent_id] if bone.parent_id < self.num_bones else None
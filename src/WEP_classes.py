@@ -1,3 +1,5 @@
+import numpy as np
+
 from src.VSTOOLS import hex, parse_color
 
 
@@ -16,139 +18,176 @@ class WEPVertex:
         self.z = r.s16()
         r.padding(2)
 
-class WEPFace:
+# byte offsets of every face field inside a record, (triangle, quad)
+# None marks fields a format does not store
+FACE_LAYOUTS = {
+    # type, size, info, pad, vertices, [vertex4], uvs
+    1: {
+        "record_size": (16, 20),
+        "type": (0, 0),
+        "size": (1, 1),
+        "info": (2, 2),
+        "vertices": ((4, 6, 8, None), (4, 6, 8, 10)),
+        "uvs": ((10, 12, 14, None), (12, 14, 16, 18)),
+        "colors": ((None, None, None, None), (None, None, None, None)),
+    },
+    # vertices, colors interleaved with type/size/info, uvs
+    2: {
+        "record_size": (24, 32),
+        "type": (11, 11),
+        "size": (15, 15),
+        "info": (19, 19),
+        "vertices": ((0, 2, 4, None), (0, 2, 4, 6)),
+        "uvs": ((6, 20, 22, None), (24, 26, 28, 30)),
+        "colors": ((8, 12, 16, None), (8, 12, 16, 20)),
+    },
+}
+
+FACE_TYPES = {
+    1: (0x24, 0x2C),
+    2: (0x34, 0x3C),
+}
+
+
+class WEPFaces:
+    """
+    All faces of a WEP/SHP decoded into arrays.
+
+    version 1 faces are uncoloured (type 0x24/0x2C at offset 0),
+    version 2 faces carry vertex colors (type 0x34/0x3C at offset 11).
+    Triangles leave their fourth corner zeroed.
+    """
+
     def __init__(self, reader):
         self.reader = reader
+        self.version = None
 
-    def read(self):
-        r = self.reader
-
-        self.type = r.u8()  # 1
-
-        if self.type != 0x24 and self.type != 0x2C:
-            raise ValueError(f"Unknown face type: {hex(self.type)}")
-
-        self.size = r.u8()  # 2
-        self.info = r.u8()  # 3
-        r.skip(1)           # TODO whats this? 4
-
-        self.vertex1 = r.u16() // 4  # 6
-        self.vertex2 = r.u16() // 4  # 8
-        self.vertex3 = r.u16() // 4  # 10
-
-        if self.quad():
-            self.vertex4 = r.u16() // 4  # + 2
-
-        self.u1 = r.u8()  # 11
-        self.v1 = r.u8()  # 12
-        self.u2 = r.u8()  # 13
-        self.v2 = r.u8()  # 14
-        self.u3 = r.u8()  # 15
-        self.v3 = r.u8()  # 16
-
-        if self.quad():
-            self.u4 = r.u8()  # + 3
-            self.v4 = r.u8()  # + 4
-
-        # size of triangle is 16, quad is 20
-
-        # default vertex color is 0x80
-        self.r1 = self.g1 = self.b1 = 0x80
-        self.r2 = self.g2 = self.b2 = 0x80
-        self.r3 = self.g3 = self.b3 = 0x80
-
-        if self.quad():
-            self.r4 = self.g4 = self.b4 = 0x80
+        self.type = None
+        self.size = None
+        self.info = None
+        self.quad = None
+        self.double = None
+        self.vertices = None
+        self.uvs = None
+        self.colors = None
 
-    def read_colored(self):
+    def read(self, num):
         r = self.reader
-
-        self.type = r.data[r.pos + 11]
-
-        if self.type == 0x34:
-            return self.read_triangle_colored()
-        elif self.type == 0x3C:
-            return self.read_quad_colored()
+        data = r.data
+
+        if not num:
+            # nothing to detect, whatever follows is not a face record
+            self.version = 1
+            self.decode(np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), FACE_LAYOUTS[1])
+            return
+
+        self.version = self.detect_version(data, r.pos)
+
+        try:
+            offsets, quad = self.scan(data, r.pos, num, self.version)
+        except ValueError:
+            # an uncoloured looking first record may still start coloured data
+            if self.version != 1 or not self.matches(data, r.pos, 2):
+                raise
+            self.version = 2
+            offsets, quad = self.scan(data, r.pos, num, self.version)
+
+        self.decode(r.u8_array(), offsets, quad, FACE_LAYOUTS[self.version])
+
+        end = offsets[-1] + FACE_LAYOUTS[self.version]["record_size"][int(quad[-1])]
+        r.seek(int(end))
+
+    @staticmethod
+    def matches(data, pos, version):
+        offset = FACE_LAYOUTS[version]["type"][0]
+        return pos + offset < len(data) and data[pos + offset] in FACE_TYPES[version]
+
+    def detect_version(self, data, pos):
+        for version in (1, 2):
+            if self.matches(data, pos, version):
+                return version
+
+        raise ValueError(f"Unknown face type: {hex(int(data[pos]))}")
+
+    @staticmethod
+    def scan(data, pos, num, version):
+        """
+        Walks the record type bytes once to find where every face starts.
+        """
+        layout = FACE_LAYOUTS[version]
+        type_offset = layout["type"][0]
+        triangle_type, quad_type = FACE_TYPES[version]
+        triangle_size, quad_size = layout["record_size"]
+
+        offsets = np.zeros(num, dtype=np.int64)
+        quad = np.zeros(num, dtype=bool)
+
+        for i in range(num):
+            if pos + type_offset >= len(data):
+                raise ValueError("Unknown face type: out of bounds")
+
+            face_type = data[pos + type_offset]
+            offsets[i] = pos
+
+            if face_type == triangle_type:
+                pos += triangle_size
+            elif face_type == quad_type:
+                quad[i] = True
+                pos += quad_size
+            else:
+                raise ValueError(f"Unknown face type: {hex(int(face_type))}")
+
+        return offsets, quad
+
+    def decode(self, data, offsets, quad, layout):
+        num = len(offsets)
+
+        def u8(field):
+            out = np.zeros(num, dtype=np.int64)
+            for kind in (0, 1):
+                offset = layout[field][kind]
+                mask = quad == bool(kind)
+                out[mask] = data[offsets[mask] + offset]
+            return out
+
+        def u8_at(field, corner, shift):
+            out = np.zeros(num, dtype=np.int64)
+            for kind in (0, 1):
+                offset = layout[field][kind][corner]
+                if offset is None:
+                    continue
+                mask = quad == bool(kind)
+                out[mask] = data[offsets[mask] + offset + shift]
+            return out
+
+        self.type = u8("type")
+        self.size = u8("size")
+        self.info = u8("info")
+        self.quad = quad
+        self.double = self.info == 0x05
+
+        self.vertices = np.stack([
+            (u8_at("vertices", c, 0) | (u8_at("vertices", c, 1) << 8)) // 4
+            for c in range(4)
+        ], axis=1)
+
+        self.uvs = np.stack([
+            np.stack([u8_at("uvs", c, 0), u8_at("uvs", c, 1)], axis=1)
+            for c in range(4)
+        ], axis=1)
+
+        if layout["colors"][0][0] is None:
+            # default vertex color is 0x80
+            self.colors = np.full((num, 4, 3), 0x80, dtype=np.int64)
+            self.colors[~quad, 3] = 0
         else:
-            raise ValueError(f"Unknown face type: {hex(self.type)}")
+            self.colors = np.stack([
+                np.stack([u8_at("colors", c, k) for k in range(3)], axis=1)
+                for c in range(4)
+            ], axis=1)
 
-    def read_triangle_colored(self):
-        r = self.reader
-
-        self.vertex1 = r.u16() // 4
-        self.vertex2 = r.u16() // 4
-        self.vertex3 = r.u16() // 4
-
-        self.u1 = r.u8()
-        self.v1 = r.u8()
-
-        self.r1 = r.u8()
-        self.g1 = r.u8()
-        self.b1 = r.u8()
-        r.constant([0x34])  # type
-
-        self.r2 = r.u8()
-        self.g2 = r.u8()
-        self.b2 = r.u8()
-        self.size = r.u8()
-
-        self.r3 = r.u8()
-        self.g3 = r.u8()
-        self.b3 = r.u8()
-        self.info = r.u8()
-
-        self.u2 = r.u8()
-        self.v2 = r.u8()
-        self.u3 = r.u8()
-        self.v3 = r.u8()
-
-        # 28 bytes total
-
-    def read_quad_colored(self):
-        r = self.reader
-
-        self.vertex1 = r.u16() // 4
-        self.vertex2 = r.u16() // 4
-        self.vertex3 = r.u16() // 4
-        self.vertex4 = r.u16() // 4
-
-        self.r1 = r.u8()
-        self.g1 = r.u8()
-        self.b1 = r.u8()
-        r.constant([0x3C])  # type
-
-        self.r2 = r.u8()
-        self.g2 = r.u8()
-        self.b2 = r.u8()
-        self.size = r.u8()
-
-        self.r3 = r.u8()
-        self.g3 = r.u8()
-        self.b3 = r.u8()
-        self.info = r.u8()
-
-        self.r4 = r.u8()
-        self.g4 = r.u8()
-        self.b4 = r.u8()
-        r.skip(1)  # always 0x00 except for B1.SHP (0x01)
-
-        self.u1 = r.u8()
-        self.v1 = r.u8()
-        self.u2 = r.u8()
-        self.v2 = r.u8()
-
-        self.u3 = r.u8()
-        self.v3 = r.u8()
-        self.u4 = r.u8()
-        self.v4 = r.u8()
-
-        # 36 bytes total
-
-    def quad(self):
-        return self.type in (0x2C, 0x3C)
-
-    def double(self):
-        return self.info == 0x05
+    def __len__(self):
+        return 0 if self.quad is None else len(self.quad)
 
 
 class WEPBone:
@@ -356,3 +395,37 @@ class WEPTextureMap:
 
     def get_width(self):
         return self.width * 2 if self.version == 16 else self.width
+
+    def get_bits(self):
+        """Bits per texel index, None for versions build() does not handle."""
+        return {1: 8, 16: 4}.get(self.version)
+
+    def indices(self):
+        """
+        (height, get_width()) uint8 palette indices, the texels build() expands.
+        """
+        texels = np.array(self.map, dtype=np.uint8).reshape(self.width, self.height).T
+
+        if self.version != 16:
+            return texels
+
+        # two 4-bit texels per byte, low nibble first
+        indices = np.empty((self.height, self.width * 2), dtype=np.uint8)
+        indices[:, 0::2] = texels & 0x0F
+        indices[:, 1::2] = texels >> 4
+        return indices
+
+    def palette_array(self):
+        """
+        (palettes, 2 ** bits, 4) uint8 RGBA. Indices past colors_per_palette
+        stay transparent black, as in build().
+        """
+        size = 1 << self.get_bits()
+        palettes = np.zeros((len(self.palettes), size, 4), dtype=np.uint8)
+
+        for i_palette, palette in enumerate(self.palettes):
+            colors = palette.colors[:min(self.colors_per_palette, size)]
+            if colors:
+                palettes[i_palette, :len(colors)] = np.asarray(colors, dtype=np.uint8).reshape(-1, 4)
+
+        return palettes
@@ -1,3 +1,5 @@
+import numpy as np
+
 from src.TIM import TIM
 from src.FrameBuffer import FrameBuffer
 from src.VSTOOLS import bytearray_to_image, bit_merge
@@ -103,6 +105,35 @@ class ZND:
 
         return None
 
+    def get_clut(self, clut_id):
+        """
+        The 16 RGBA colors of a CLUT as 64 bytes, None if no TIM holds it.
+        """
+        # Locate CLUT in framebuffer
+        x = (clut_id * 16) % 1024
+        y = (clut_id * 16) // 1024
+
+        for tim in self.tims:
+            if (
+                tim.fx <= x < tim.fx + tim.width and
+                tim.fy <= y < tim.fy + tim.height
+            ):
+                return tim.build_clut(x, y)
+
+        return None
+
+    def get_indexed(self, texture_id, clut_id):
+        """
+        (indices, palette) behind get_materials: (height, width) uint8
+        4-bit indices and the (16, 4) uint8 RGBA CLUT, None when missing.
+        """
+        texture_tim = self.get_tim(texture_id)
+        clut = self.get_clut(clut_id)
+        if texture_tim is None or not clut:
+            return None
+
+        return texture_tim.indices(), np.frombuffer(bytes(clut), dtype=np.uint8).reshape(16, 4)
+
     # ------------------------
     # Texture builder (material equivalent)
     # ------------------------
@@ -123,19 +154,7 @@ class ZND:
         # Mark CLUT usage in framebuffer (debug / tracking)
         self.frameBuffer.mark_clut(clut_id)
 
-        # Locate CLUT in framebuffer
-        x = (clut_id * 16) % 1024
-        y = (clut_id * 16) // 1024
-
-        clut = None
-
-        for tim in self.tims:
-            if (
-                tim.fx <= x < tim.fx + tim.width and
-                tim.fy <= y < tim.fy + tim.height
-            ):
-                clut = tim.build_clut(x, y)
-                break
+        clut = self.get_clut(clut_id)
         if clut:
             texture = texture_tim.build(clut)
         #texture.title = key
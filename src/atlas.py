@@ -0,0 +1,134 @@
+"""
+Texture atlas baking for MPD rooms.
+
+Every texture / clut image of a room is packed into one RGBA atlas and the
+UVs are remapped into it, so the room exports with a single material
+instead of one per (texture_id, clut_id):
+
+    room = bake_room_atlas(mpd)
+    export_glb("room.glb", room)
+
+PS1 UVs are texel bytes inside a 256 x 256 texture page, so the parser's
+UVs stay in [0, 1] and a page never has to repeat. A mesh whose UVs leave
+that range would rely on the sampler wrapping, which an atlas rectangle
+cannot do, so it keeps its own material instead.
+"""
+import copy
+import math
+
+import numpy as np
+
+from src.MPDmesh import MPDMesh
+
+ATLAS_MATERIAL = "atlas"
+
+
+def next_pow2(n):
+    return 1 << max(0, math.ceil(n) - 1).bit_length()
+
+
+def shelf_pack(sizes, width):
+    """
+    Places (w, h) rects on shelves of the given width, tallest first.
+    Returns ([(x, y)] per rect, used height).
+    """
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        positions[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+
+    return positions, y + shelf
+
+
+def pack_rects(sizes, padding=0):
+    """
+    sizes: [(w, h)], every rect gets padding texels of gutter on each side.
+    Returns ([(x, y)] of each rect's inner corner, (width, height)), the
+    smallest power of two atlas a shelf packer finds.
+    """
+    padded = [(w + 2 * padding, h + 2 * padding) for w, h in sizes]
+    widest = next_pow2(max(w for w, _ in padded))
+    square = next_pow2(math.sqrt(sum(w * h for w, h in padded)))
+
+    best = None
+    width = widest
+    while width <= max(widest, square * 2):
+        positions, height = shelf_pack(padded, width)
+        size = (width, next_pow2(height))
+        # smallest area, then the squarer one
+        score = (size[0] * size[1], abs(size[0] - size[1]))
+        if best is None or score < best[0]:
+            best = (score, positions, size)
+        width *= 2
+
+    _, positions, size = best
+    return [(x + padding, y + padding) for x, y in positions], size
+
+
+def blit(atlas, image, x, y, padding):
+    """
+    Copies image to (x, y) with a gutter of padding texels around it. The
+    gutter wraps around like the viewer's GL_REPEAT sampler, so filtering
+    at the rect border blends the same texels as the original texture.
+    """
+    h, w = image.shape[:2]
+    if padding:
+        image = np.pad(image, ((padding, padding), (padding, padding), (0, 0)), mode="wrap")
+    atlas[y - padding:y + h + padding, x - padding:x + w + padding] = image
+
+
+def bake_room_atlas(mpd, padding=2, material_id=ATLAS_MATERIAL):
+    """
+    Returns a shallow copy of a built MPD whose meshes are one atlased mesh
+    plus any mesh that could not go into the atlas. The MPD itself is left
+    untouched. The copy's atlas attribute maps the original material ids
+    to their (x, y, w, h) rect.
+    """
+    atlased = []
+    kept = []
+
+    for mesh in mpd.meshes:
+        uvs = np.asarray(mesh.geometry.attributes["uvs"], dtype=np.float64)
+        # no image, or UVs relying on the texture repeating
+        if mesh.material is None or (uvs.size and (uvs.min() < 0.0 or uvs.max() > 1.0)):
+            kept.append(mesh)
+        else:
+            atlased.append(mesh)
+
+    if not atlased:
+        return mpd
+
+    sizes = [(mesh.material["width"], mesh.material["height"]) for mesh in atlased]
+    positions, (width, height) = pack_rects(sizes, padding)
+
+    atlas = np.zeros((height, width, 4), dtype=np.uint8)
+    rects = {}
+    parts = []
+
+    for mesh, (x, y), (w, h) in zip(atlased, positions, sizes):
+        image = np.frombuffer(bytes(mesh.material["data"]), dtype=np.uint8).reshape(h, w, 4)
+        blit(atlas, image, x, y, padding)
+        rects[mesh.material_id] = (x, y, w, h)
+
+        # page space -> atlas space, v runs down the image like the texture rows
+        uvs = np.asarray(mesh.uvs, dtype=np.float64).reshape(-1, 2)
+        uvs = (uvs * (w, h) + (x, y)) / (width, height)
+
+        part = copy.copy(mesh)
+        part.uvs = uvs.ravel().tolist()
+        parts.append(part)
+
+    merged = MPDMesh.merged(parts)
+    merged.material = {"data": atlas.tobytes(), "width": width, "height": height}
+    merged.material_id = material_id
+
+    room = copy.copy(mpd)
+    room.meshes = [merged] + kept
+    room.atlas = rects
+    return room
@@ -0,0 +1,206 @@
+import glob
+import json
+import operator
+import os
+import re
+
+OBJ_DIR = "VagrantStory_data/OBJ"
+CACHE_PATH = "VagrantStory_data/catalogue_cache.json"
+
+# both headers end well before this (SHP 0x138, WEP 0x50)
+HEADER_SIZE = 0x200
+
+# below this many stale files probing inline beats starting a pool
+POOL_THRESHOLD = 32
+
+SORT_KEYS = {
+    "Name": None,
+    "Polygons": "num_all_polygons",
+    "Bones": "num_bones",
+    "Groups": "num_groups",
+}
+
+# "bones>10", "polygons<=500", "groups=3"
+FILTER_TERM = re.compile(r"^(\w+)(<=|>=|<|>|=)(\d+)$")
+FILTER_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "=": operator.eq}
+
+
+def probe(path):
+    """
+    Reads only the SHP/WEP header, no bones, vertices, faces or textures.
+    """
+    # parsers load only when a file has to be probed, a warm cache skips them
+    from src.Reader import Reader
+    from src.SHP import SHP
+    from src.WEP import WEP
+
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+
+    stat = os.stat(path)
+    shp = path.upper().endswith(".SHP")
+
+    model = (SHP if shp else WEP)(Reader(data))
+    model.header()
+
+    entry = {
+        "file": os.path.basename(path).upper(),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "num_bones": model.num_bones,
+        "num_groups": model.num_groups,
+        "num_triangles": model.num_triangles,
+        "num_quads": model.num_quads,
+        "num_polygons": model.num_polygons,
+        "num_all_polygons": model.num_all_polygons,
+    }
+
+    if shp:
+        entry.update({
+            "menu_position_y": model.menu_position_y,
+            "menu_scale": model.menu_scale,
+            "shadow_radius": model.shadow_radius,
+            "shadow_size_increase": model.shadow_size_increase,
+            "shadow_size_decrease": model.shadow_size_decrease,
+            "target_sphere_position_y": model.target_sphere_position_y,
+            "anim_lbas": model.anim_lbas,
+            "chain_ids": model.chain_ids,
+            "special_lbas": model.special_lbas,
+        })
+
+    return entry
+
+
+def load_cache(cache_path=CACHE_PATH):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(entries, cache_path=CACHE_PATH):
+    with open(cache_path, "w") as f:
+        json.dump(entries, f)
+
+
+def scan(directory=OBJ_DIR, cache_path=CACHE_PATH, workers=None):
+    """
+    Probes every SHP/WEP in directory, reusing cached entries whose size
+    and mtime did not change. Returns {FILE NAME: entry}.
+    workers=0 probes in this process instead of a pool, for callers
+    already off the GUI thread.
+    """
+    paths = [
+        p for p in glob.glob(os.path.join(directory, "*"))
+        if p.upper().endswith((".SHP", ".WEP"))
+    ]
+
+    cached = load_cache(cache_path)
+    entries = {}
+    stale = []
+
+    for path in paths:
+        entry = cached.get(os.path.basename(path).upper())
+        stat = os.stat(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            entries[entry["file"]] = entry
+        else:
+            stale.append(path)
+
+    if workers != 0 and len(stale) >= POOL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers) as pool:
+            probed = list(pool.map(probe, stale, chunksize=16))
+    else:
+        probed = [probe(p) for p in stale]
+
+    for entry in probed:
+        entries[entry["file"]] = entry
+
+    if probed or len(entries) != len(cached):
+        try:
+            save_cache(entries, cache_path)
+        except OSError:
+            pass
+
+    return entries
+
+
+def sort_items(items, entries, key, reverse=False):
+    """
+    Sorts (display name, file name) pairs by a header field,
+    files without an entry keep their order at the end.
+    """
+    field = SORT_KEYS.get(key, key)
+    if field is None:
+        return sorted(items, key=lambda item: item[0], reverse=reverse)
+
+    known = [item for item in items if item[1] and item[1].upper() in entries]
+    unknown = [item for item in items if not (item[1] and item[1].upper() in entries)]
+
+    known.sort(key=lambda item: entries[item[1].upper()][field], reverse=reverse)
+    return known + unknown
+
+
+def parse_filter(text):
+    """
+    Splits a filter into name words and (field, op, value) header tests,
+    a test names a SORT_KEYS column: "bones>10", "polygons <= 500".
+    """
+    fields = {name.lower(): field for name, field in SORT_KEYS.items() if field}
+    words = []
+    tests = []
+
+    # "bones > 10" is one test, not three words
+    text = re.sub(r"\s*(<=|>=|<|>|=)\s*", r"\1", text)
+
+    for term in text.split():
+        match = FILTER_TERM.match(term)
+        if match and match.group(1).lower() in fields:
+            name, op, value = match.groups()
+            tests.append((fields[name.lower()], FILTER_OPS[op], int(value)))
+        else:
+            words.append(term.lower())
+
+    return words, tests
+
+
+def filter_items(items, entries, text):
+    """
+    Keeps the (display name, file name) pairs whose name contains every
+    word of text and whose entry passes every header test. Files without
+    an entry fail any header test.
+    """
+    words, tests = parse_filter(text)
+
+    def keep(item):
+        name, file_name = item
+        if not all(word in name.lower() for word in words):
+            return False
+        if not tests:
+            return True
+
+        entry = entries.get(file_name.upper()) if file_name else None
+        return entry is not None and all(op(entry[field], value) for field, op, value in tests)
+
+    return [item for item in items if keep(item)]
+
+
+def describe(entry):
+    if not entry:
+        return ""
+
+    lines = [
+        "Bones: {}  Groups: {}".format(entry["num_bones"], entry["num_groups"]),
+        "Polygons: {} ({} tris, {} quads)".format(
+            entry["num_all_polygons"], entry["num_triangles"], entry["num_quads"]
+        ),
+    ]
+
+    if "menu_scale" in entry:
+        lines.append("Menu scale: {}  Shadow radius: {}".format(entry["menu_scale"], entry["shadow_radius"]))
+        lines.append("Animations: {}".format(sum(1 for lba in entry["anim_lbas"] if lba)))
+
+    return "\n".join(lines)
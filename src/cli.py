@@ -0,0 +1,473 @@
+"""
+Headless batch converter, no Qt or OpenGL involved.
+
+    python -m src.cli --maps --characters --weapons -f glb,png -o exports
+    python -m src.cli --maps "Wine Cellar" MAP010.MPD --characters 00.SHP -f fbx
+    python -m src.cli VagrantStory_data/OBJ -f obj -j 8
+
+Selections come from the data folder's level_map_names.json,
+characters.json and weapon_name_map.json. A selection flag without names
+takes everything in that file. Names match an area, room, file or display
+name, case insensitive. Plain paths (files or folders of MPD / SHP / WEP)
+can be given too.
+
+Formats: glb, obj, fbx (needs the fbx SDK), png (textures only), tex (textures
+as raw .vstex containers, see src.texture_container).
+--atlas bakes each room's textures into one atlas, one material per room.
+
+Exports are incremental: export_manifest.json in the output folder keeps
+the source hashes, code version and options of every output, and outputs
+that are still current are skipped. --force exports everything.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.BVH_exporter import find_seqs
+from src.export_manifest import ExportManifest
+from src.MPD import MPD
+from src.Reader import Reader
+from src.SEQ import SEQ
+from src.SHP import SHP
+from src.VSTOOLS import export_png
+from src.WEP import WEP
+from src.ZND import ZND
+
+DATA_DIR = "VagrantStory_data"
+FORMATS = ("glb", "obj", "fbx", "png", "tex")
+
+# this module loads the assets, bakes atlases and names the textures, so
+# its code versions the outputs too
+MANIFEST_MODULES = ("src.cli",)
+
+
+def slug(name):
+    return "".join(str(name).title().split())
+
+
+def read_file(cls, path, *args):
+    with open(path, "rb") as f:
+        obj = cls(Reader(f.read()), *args)
+    obj.read()
+    return obj
+
+
+# ───────────────────────── selection ─────────────────────────
+
+def load_json(data_dir, name):
+    with open(os.path.join(data_dir, name)) as f:
+        return json.load(f)
+
+
+def matches(names, *candidates):
+    if not names:
+        return True
+    candidates = {str(c).casefold() for c in candidates}
+    return any(n.casefold() in candidates for n in names)
+
+
+def map_job(data_dir, area, room):
+    zone, _, mpd_file, title = room
+    return {
+        "kind": "map",
+        "label": f"{area} / {title}",
+        "name": f"{os.path.splitext(mpd_file)[0]}_{slug(title)}",
+        "folder": os.path.join("levels", slug(area)),
+        "mpd": os.path.join(data_dir, "MAP", mpd_file),
+        "znd": os.path.join(data_dir, "MAP", f"ZONE{zone:03}.ZND"),
+    }
+
+
+def character_job(path, name=None):
+    file_name = os.path.basename(path)
+    return {
+        "kind": "character",
+        "label": name or file_name,
+        "name": slug(name) if name else os.path.splitext(file_name)[0],
+        "folder": "characters",
+        "shp": path,
+        "seqs": find_seqs(path),
+    }
+
+
+def weapon_job(path, name=None):
+    file_name = os.path.basename(path)
+    return {
+        "kind": "weapon",
+        "label": name or file_name,
+        "name": slug(name) if name else os.path.splitext(file_name)[0],
+        "folder": "weapons",
+        "wep": path,
+    }
+
+
+def select_jobs(data_dir, maps=None, characters=None, weapons=None):
+    """
+    maps / characters / weapons: None skips the category, [] takes all of it.
+    """
+    jobs = []
+    obj_dir = os.path.join(data_dir, "OBJ")
+
+    if maps is not None:
+        for area, rooms in load_json(data_dir, "level_map_names.json").items():
+            for room in rooms:
+                if matches(maps, area, room[2], room[-1]):
+                    jobs.append(map_job(data_dir, area, room))
+
+    if characters is not None:
+        for file_name, name in load_json(data_dir, "characters.json").items():
+            if file_name.upper().endswith(".SHP") and matches(characters, file_name, name):
+                jobs.append(character_job(os.path.join(obj_dir, file_name), name))
+
+    if weapons is not None:
+        for name, weapon_id in load_json(data_dir, "weapon_name_map.json").items():
+            if weapon_id and matches(weapons, name, weapon_id, f"{weapon_id}.WEP"):
+                jobs.append(weapon_job(os.path.join(obj_dir, f"{weapon_id}.WEP"), name))
+
+    return jobs
+
+
+def path_jobs(data_dir, paths):
+    rooms = {}
+    try:
+        for area, entries in load_json(data_dir, "level_map_names.json").items():
+            for room in entries:
+                rooms[room[2].upper()] = (area, room)
+    except OSError:
+        pass
+
+    jobs = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*"))) if os.path.isdir(path) else [path]
+
+        for file_path in files:
+            extension = os.path.splitext(file_path)[1].upper()
+
+            if extension == ".SHP":
+                jobs.append(character_job(file_path))
+            elif extension == ".WEP":
+                jobs.append(weapon_job(file_path))
+            elif extension == ".MPD":
+                area, room = rooms.get(os.path.basename(file_path).upper(), ("maps", None))
+                if room:
+                    job = map_job(data_dir, area, room)
+                    job["znd"] = os.path.join(os.path.dirname(file_path), os.path.basename(job["znd"]))
+                else:
+                    name = os.path.splitext(os.path.basename(file_path))[0]
+                    job = {"kind": "map", "label": name, "name": name, "folder": "levels", "znd": None}
+                job["mpd"] = file_path
+                jobs.append(job)
+
+    return jobs
+
+
+# ───────────────────────── export ─────────────────────────
+
+def load_job(job):
+    """(asset, animations) for a job"""
+    if job["kind"] == "map":
+        znd = read_file(ZND, job["znd"]) if job["znd"] and os.path.exists(job["znd"]) else None
+        mpd = read_file(MPD, job["mpd"], znd)
+        mpd.build()
+
+        if job.get("atlas"):
+            from src.atlas import bake_room_atlas
+            mpd = bake_room_atlas(mpd, material_id=f"{job['name']}_atlas")
+        return mpd, None
+
+    if job["kind"] == "character":
+        shp = read_file(SHP, job["shp"])
+        shp.build()
+
+        animations = []
+        for seq_path in job["seqs"]:
+            seq = read_file(SEQ, seq_path)
+            seq.build()
+            animations += list(seq.animations)
+        return shp, animations or None
+
+    wep = read_file(WEP, job["wep"])
+    wep.build()
+    return wep, None
+
+
+def export_textures(asset, job, output_dir, fmt="png"):
+    """
+    Every texture of an asset as PNG, or as .vstex for fmt "tex": decoded
+    RGBA, or the source indices and palettes when job["textures"] asks for
+    indexed ones.
+    """
+    from src.texture_container import EXTENSION, write_texture
+
+    options = job.get("textures", {})
+    indexed = fmt == "tex" and options.get("indexed")
+    compression = options.get("compression", "none")
+
+    def write(path, data, width, height, source=None):
+        if fmt == "png":
+            return export_png(data, width, height, f"{path}.png", compress_level=options.get("png_level", 6))
+        if source is not None:
+            indices, palettes = source
+            return write_texture(path + EXTENSION, width, height, indices=indices, palettes=palettes, compression=compression)
+        return write_texture(path + EXTENSION, width, height, rgba=data, compression=compression)
+
+    written = []
+
+    if isinstance(asset, MPD):
+        # next to the level folders, where the FBX materials look for them
+        folder = os.path.join(output_dir, job["folder"], "textures")
+        done = set()
+        for mesh in asset.meshes:
+            material = mesh.material
+            if material is None or mesh.material_id in done:
+                continue
+            done.add(mesh.material_id)
+
+            source = None
+            # an atlas has no single texture / clut behind it
+            if indexed and asset.znd and mesh.material_id == f"{mesh.texture_id}-{mesh.clut_id}":
+                source = asset.znd.get_indexed(mesh.texture_id, mesh.clut_id)
+
+            written.append(write(
+                os.path.join(folder, mesh.material_id),
+                material["data"], material["width"], material["height"], source,
+            ))
+        return written
+
+    folder = os.path.join(output_dir, job["folder"], job["name"])
+    texture_map = asset.texture_map
+
+    if indexed and texture_map.get_bits():
+        # one file, the palettes are what tells the textures apart
+        source = (texture_map.indices(), texture_map.palette_array())
+        return [write(os.path.join(folder, job["name"]), None, texture_map.get_width(), texture_map.height, source)]
+
+    for i_texture, texture in enumerate(texture_map.textures):
+        if texture:
+            written.append(write(
+                os.path.join(folder, f"{job['name']}_{i_texture}"),
+                texture["data"], texture_map.get_width(), texture["height"],
+            ))
+    return written
+
+
+def texture_files(asset, job, output_dir):
+    """
+    {OBJ material: PNG path} of the textures export_textures writes for the
+    png format, so an OBJ in the same run can point at them.
+    """
+    if isinstance(asset, MPD):
+        folder = os.path.join(output_dir, job["folder"], "textures")
+        return {
+            mesh.material_id: os.path.join(folder, f"{mesh.material_id}.png")
+            for mesh in asset.meshes if mesh.material is not None
+        }
+
+    if not asset.material:
+        return {}
+
+    # the OBJ material is the first palette's texture
+    return {"texture0": os.path.join(output_dir, job["folder"], job["name"], f"{job['name']}_0.png")}
+
+
+def run_job(job, output_dir, formats, fps=30):
+    """
+    Loads one asset and writes every requested format, returns {format: paths}
+    and the FBX animation key counts.
+    """
+    asset, animations = load_job(job)
+
+    folder = os.path.join(output_dir, job["folder"], job["name"])
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, job["name"])
+
+    written = {}
+    keys = []
+
+    if "glb" in formats:
+        from src.GLTF_exporter import export_glb
+        written["glb"] = [export_glb(f"{base}.glb", asset, animations, fps)]
+
+    if "obj" in formats:
+        from src.OBJexporter import export_obj_scene
+
+        # with png in the same run the MTL uses those files instead of copies
+        textures = texture_files(asset, job, output_dir) if "png" in formats else None
+        level = job.get("textures", {}).get("png_level", 6)
+        written["obj"] = export_obj_scene(f"{base}.obj", asset, compress_level=level, texture_files=textures)
+        # the textures it points at, a deleted one makes the OBJ stale
+        written["obj"] += list((textures or {}).values())
+
+    if "fbx" in formats:
+        from src.FBX_exporter import export_fbx_scene
+        from src.V3DClasses import SceneMesh
+
+        if isinstance(asset, MPD):
+            meshes = SceneMesh.from_mpd(asset)
+        else:
+            meshes = [SceneMesh.from_wep(asset, job["name"])]
+
+        keys = export_fbx_scene(f"{base}.fbx", meshes, animations, fps)
+        written["fbx"] = [f"{base}.fbx"]
+
+    for fmt in ("png", "tex"):
+        if fmt in formats:
+            written[fmt] = export_textures(asset, job, output_dir, fmt)
+
+    return written, keys
+
+
+# ───────────────────────── incremental ─────────────────────────
+
+def job_sources(job):
+    if job["kind"] == "map":
+        return [job["mpd"], job["znd"]]
+    if job["kind"] == "character":
+        return [job["shp"]] + job["seqs"]
+    return [job["wep"]]
+
+
+def job_key(job, fmt):
+    return f"{job['folder']}/{job['name']}.{fmt}".replace(os.sep, "/")
+
+
+def job_options(job, fmt, fps):
+    # only animated exports depend on the frame rate
+    if job["kind"] == "character" and fmt in ("glb", "fbx"):
+        return {"fps": fps}
+
+    options = {}
+    if job.get("atlas"):
+        options["atlas"] = True
+    if fmt in ("png", "obj"):
+        options["level"] = job["textures"]["png_level"]
+    if fmt == "tex":
+        options.update(indexed=job["textures"]["indexed"], compression=job["textures"]["compression"])
+    return options
+
+
+def plan_jobs(jobs, formats, manifest=None, fps=30):
+    """[(job, formats to write)] without the outputs the manifest has as current."""
+    plan = []
+    for job in jobs:
+        stale = [
+            fmt for fmt in formats
+            if manifest is None
+            or not manifest.is_current(job_key(job, fmt), job_sources(job), job["kind"], fmt, job_options(job, fmt, fps))
+        ]
+        if stale:
+            plan.append((job, stale))
+    return plan
+
+
+def run_jobs(plan, output_dir, workers=None, fps=30, manifest=None):
+    """
+    Runs (job, formats) pairs over a process pool with a progress readout,
+    records finished outputs in manifest, returns the failed jobs.
+    """
+    failed = []
+    start = time.perf_counter()
+
+    def report(done, job, result):
+        elapsed = time.perf_counter() - start
+        if isinstance(result, Exception):
+            failed.append(job)
+            print(f"[{done}/{len(plan)}] {elapsed:7.1f}s  FAILED {job['label']}: {result}", file=sys.stderr)
+            return
+
+        written, keys = result
+        if manifest is not None:
+            for fmt, files in written.items():
+                manifest.record(job_key(job, fmt), job_sources(job), job["kind"], fmt, job_options(job, fmt, fps), files)
+
+        num_files = sum(len(files) for files in written.values())
+        line = f"[{done}/{len(plan)}] {elapsed:7.1f}s  {job['label']} -> {num_files} files"
+        if keys:
+            from src.FBX_exporter import describe_key_counts
+            line += f", {describe_key_counts(keys)}"
+        print(line)
+
+    if workers == 1:
+        for done, (job, formats) in enumerate(plan, 1):
+            try:
+                result = run_job(job, output_dir, formats, fps)
+            except Exception as e:
+                result = e
+            report(done, job, result)
+        return failed
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(run_job, job, output_dir, formats, fps): job for job, formats in plan}
+
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            report(done, futures[future], result)
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Batch export Vagrant Story assets.")
+    parser.add_argument("paths", nargs="*", help="MPD / SHP / WEP files or folders")
+    parser.add_argument("--data", default=DATA_DIR, help="data folder with MAP/, OBJ/ and the json name maps")
+    parser.add_argument("--maps", nargs="*", metavar="NAME", help="rooms from level_map_names.json, all without names")
+    parser.add_argument("--characters", nargs="*", metavar="NAME", help="SHPs from characters.json, all without names")
+    parser.add_argument("--weapons", nargs="*", metavar="NAME", help="WEPs from weapon_name_map.json, all without names")
+    parser.add_argument("-f", "--formats", default="glb", help=f"comma separated, of {', '.join(FORMATS)}")
+    parser.add_argument("-o", "--output", default="exports", help="output folder")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes, 1 runs inline")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--atlas", action="store_true", help="one texture atlas and material per room")
+    parser.add_argument("--png-level", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="PNG zlib level, 1 is several times faster than the default 6")
+    parser.add_argument("--indexed", action="store_true", help="tex: keep the 4 / 8-bit indices and palettes instead of RGBA")
+    parser.add_argument("--compression", default="none", choices=("none", "zlib", "lz4"), help="tex payload compression")
+    parser.add_argument("--force", action="store_true", help="export everything, even outputs that are up to date")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    jobs = select_jobs(args.data, args.maps, args.characters, args.weapons) + path_jobs(args.data, args.paths)
+    if not jobs:
+        parser.error("nothing selected, give paths or --maps / --characters / --weapons")
+
+    if args.compression == "lz4":
+        from src.texture_container import load_lz4
+        try:
+            load_lz4()
+        except ValueError as e:
+            parser.error(str(e))
+
+    for job in jobs:
+        job["textures"] = {"png_level": args.png_level, "indexed": args.indexed, "compression": args.compression}
+        if args.atlas and job["kind"] == "map":
+            job["atlas"] = True
+
+    manifest = ExportManifest(args.output, MANIFEST_MODULES)
+    plan = plan_jobs(jobs, formats, None if args.force else manifest, args.fps)
+
+    print(f"{len(jobs)} assets -> {', '.join(formats)} in {args.output}, {len(jobs) - len(plan)} up to date")
+    try:
+        failed = run_jobs(plan, args.output, args.workers, args.fps, manifest)
+    finally:
+        # whatever finished is kept, an interrupted run resumes from there
+        manifest.save()
+
+    if failed:
+        print(f"{len(failed)} of {len(plan)} failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
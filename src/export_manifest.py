@@ -0,0 +1,147 @@
+"""
+Incremental export bookkeeping.
+
+export_manifest.json in an output folder records, per output, the content
+hash of every source file, a hash of the parser and exporter code that
+produced it and the export options. An output whose record still matches
+and whose files all exist is skipped, so after a parser fix only the
+assets read by that parser are written again.
+
+    manifest = ExportManifest(output_dir)
+    if not manifest.is_current(key, sources, "map", "fbx", options):
+        written = ...
+        manifest.record(key, sources, "map", "fbx", options, written)
+    manifest.save()
+"""
+import hashlib
+import importlib.util
+import json
+import os
+
+MANIFEST_NAME = "export_manifest.json"
+FORMAT_VERSION = 1
+
+# bump to invalidate every output, e.g. for a new fbx SDK
+EXPORTER_VERSION = 1
+
+# modules whose source decides what an export looks like
+COMMON_MODULES = ("src.Reader", "src.VSTOOLS", "src.V3DClasses")
+
+KIND_MODULES = {
+    "map": ("src.MPD", "src.MPDGroup", "src.MPDmesh", "src.MPDFace", "src.ZND", "src.TIM", "src.FrameBuffer", "src.atlas"),
+    "character": ("src.SHP", "src.WEP", "src.WEP_classes", "src.SEQ", "src.SEQAnimation"),
+    "weapon": ("src.WEP", "src.WEP_classes"),
+}
+
+FORMAT_MODULES = {
+    "fbx": ("src.FBX_exporter", "src.BVH_exporter"),
+    "glb": ("src.GLTF_exporter",),
+    "obj": ("src.OBJexporter",),
+    "png": (),
+    "tex": ("src.texture_container",),
+}
+
+_code_versions = {}
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def code_version(kind, fmt, extra_modules=()):
+    """Hash of the module sources behind one asset kind and format."""
+    key = (kind, fmt, tuple(extra_modules))
+
+    if key not in _code_versions:
+        h = hashlib.sha1(str(EXPORTER_VERSION).encode())
+        for name in COMMON_MODULES + KIND_MODULES.get(kind, ()) + FORMAT_MODULES.get(fmt, ()) + tuple(extra_modules):
+            h.update(name.encode())
+            h.update(file_hash(importlib.util.find_spec(name).origin).encode())
+        _code_versions[key] = h.hexdigest()
+
+    return _code_versions[key]
+
+
+class ExportManifest:
+    def __init__(self, output_dir, extra_modules=()):
+        """
+        output_dir     folder the manifest lives in, output paths are kept relative to it
+        extra_modules  more modules shaping the output, e.g. the caller building the meshes
+        """
+        self.output_dir = output_dir or "."
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.extra_modules = tuple(extra_modules)
+        self.changed = False
+
+        data = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if data.get("version") != FORMAT_VERSION:
+            data = {}
+
+        # {abs path: {size, mtime, sha1}}, hashes are reused while size and mtime hold
+        self.sources = data.get("sources", {})
+        # {key: {sources, code, options, files}}
+        self.outputs = data.get("outputs", {})
+
+    def source_hash(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        source_path = os.path.abspath(path)
+        entry = self.sources.get(source_path)
+
+        if not entry or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": file_hash(path)}
+            self.sources[source_path] = entry
+            self.changed = True
+
+        return entry["sha1"]
+
+    def stamp(self, sources, kind, fmt, options):
+        return {
+            "sources": {os.path.abspath(p): self.source_hash(p) for p in sources if p},
+            "code": code_version(kind, fmt, self.extra_modules),
+            # through json so tuples and lists compare equal
+            "options": json.loads(json.dumps(options or {})),
+        }
+
+    def is_current(self, key, sources, kind, fmt, options=None):
+        entry = self.outputs.get(key)
+        if entry is None:
+            return False
+
+        stamp = self.stamp(sources, kind, fmt, options)
+        if any(entry.get(field) != value for field, value in stamp.items()):
+            return False
+
+        return all(os.path.exists(os.path.join(self.output_dir, f)) for f in entry["files"])
+
+    def record(self, key, sources, kind, fmt, options, files):
+        entry = self.stamp(sources, kind, fmt, options)
+        entry["files"] = sorted({os.path.relpath(f, self.output_dir).replace(os.sep, "/") for f in files})
+        self.outputs[key] = entry
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # written aside and swapped in, an interrupted save keeps the old manifest
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "sources": self.sources, "outputs": self.outputs}, f, indent=1)
+        os.replace(temp_path, self.path)
+        self.changed = False
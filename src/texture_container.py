@@ -0,0 +1,169 @@
+"""
+Raw texture container, ready to upload or memory-map without a PNG decode.
+
+    offset  size  field
+    0       4     magic b"VSTX"
+    4       2     version
+    6       2     format       0 RGBA8, 1 INDEXED8, 2 INDEXED4
+    8       4     width
+    12      4     height
+    16      4     palettes     palette count, 0 for RGBA8
+    20      1     compression  0 none, 1 zlib, 2 lz4 (frame)
+    21      3     padding
+    24      4     payload size as stored
+    28      4     payload size uncompressed
+
+The payload starts at byte 32. RGBA8 is width * height * 4 bytes, rows top
+to bottom. The indexed formats hold palettes * colors * 4 bytes of RGBA
+palettes (16 colors for INDEXED4, 256 for INDEXED8) followed by the
+indices, INDEXED4 packing two texels per byte, low nibble first like the
+PS1 does. An uncompressed payload can be np.memmap'ed straight from disk.
+
+lz4 needs the lz4 package, zlib works everywhere.
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"VSTX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIB3xII")
+
+RGBA8 = 0
+INDEXED8 = 1
+INDEXED4 = 2
+
+FORMAT_NAMES = {RGBA8: "rgba8", INDEXED8: "indexed8", INDEXED4: "indexed4"}
+PALETTE_SIZES = {INDEXED8: 256, INDEXED4: 16}
+
+COMPRESSIONS = {"none": 0, "zlib": 1, "lz4": 2}
+
+EXTENSION = ".vstex"
+
+
+def load_lz4():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise ValueError("lz4 compression needs the lz4 package, use zlib or none") from None
+    return lz4.frame
+
+
+def compress(payload, compression, level):
+    if compression == "zlib":
+        return zlib.compress(payload, level)
+    if compression == "lz4":
+        return load_lz4().compress(payload, compression_level=level)
+    return payload
+
+
+def decompress(payload, compression):
+    if compression == COMPRESSIONS["zlib"]:
+        return zlib.decompress(payload)
+    if compression == COMPRESSIONS["lz4"]:
+        return load_lz4().decompress(payload)
+    return payload
+
+
+def pack_nibbles(indices):
+    """(h, w) 4-bit indices to (h, w / 2) bytes, low nibble first"""
+    indices = np.asarray(indices, dtype=np.uint8)
+    return indices[:, 0::2] | (indices[:, 1::2] << 4)
+
+
+def unpack_nibbles(packed, width):
+    indices = np.empty((len(packed), width), dtype=np.uint8)
+    indices[:, 0::2] = packed & 0x0F
+    indices[:, 1::2] = packed >> 4
+    return indices
+
+
+def write_texture(path, width, height, rgba=None, indices=None, palettes=None, compression="none", level=6):
+    """
+    Writes RGBA texels, or indices plus palettes, to path.
+
+    rgba         bytes-like of width * height * 4
+    indices      (height, width) uint8, with palettes (count, 16 | 256, 4) uint8,
+                 16 colors are stored as INDEXED4
+    compression  "none", "zlib" or "lz4", level is passed to the compressor
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown texture compression: {compression}")
+
+    if indices is not None:
+        palettes = np.asarray(palettes, dtype=np.uint8).reshape(-1, np.shape(palettes)[-2], 4)
+        fmt = INDEXED4 if palettes.shape[1] == 16 else INDEXED8
+
+        if palettes.shape[1] != PALETTE_SIZES[fmt]:
+            raise ValueError(f"Palettes need 16 or 256 colors, got {palettes.shape[1]}")
+        if fmt == INDEXED4 and width % 2:
+            raise ValueError("INDEXED4 textures need an even width")
+
+        indices = np.asarray(indices, dtype=np.uint8).reshape(height, width)
+        texels = pack_nibbles(indices) if fmt == INDEXED4 else indices
+        payload = palettes.tobytes() + texels.tobytes()
+        num_palettes = len(palettes)
+    else:
+        payload = memoryview(rgba).cast("B")
+        if len(payload) != width * height * 4:
+            raise ValueError(f"Buffer size mismatch: got {len(payload)}, expected {width * height * 4}")
+        fmt = RGBA8
+        num_palettes = 0
+
+    stored = compress(payload, compression, level)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, fmt, width, height, num_palettes,
+            COMPRESSIONS[compression], len(stored), len(payload),
+        ))
+        f.write(stored)
+
+    return path
+
+
+def read_texture(path, mmap=True):
+    """
+    {"format", "width", "height", "rgba" (h, w, 4)} or, for indexed files,
+    "indices" (h, w) and "palettes" (count, colors, 4), all uint8 arrays.
+    Uncompressed payloads are memory-mapped unless mmap is False.
+    """
+    with open(path, "rb") as f:
+        magic, version, fmt, width, height, num_palettes, compression, stored, raw = HEADER.unpack(f.read(HEADER.size))
+
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a texture container")
+        if version > VERSION:
+            raise ValueError(f"{path} has container version {version}, this reader knows {VERSION}")
+
+        if compression or not mmap:
+            payload = np.frombuffer(decompress(f.read(stored), compression), dtype=np.uint8)
+        else:
+            payload = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size, shape=(raw,))
+
+    texture = {"format": FORMAT_NAMES[fmt], "width": width, "height": height}
+
+    if fmt == RGBA8:
+        texture["rgba"] = payload.reshape(height, width, 4)
+        return texture
+
+    colors = PALETTE_SIZES[fmt]
+    split = num_palettes * colors * 4
+    texture["palettes"] = payload[:split].reshape(num_palettes, colors, 4)
+
+    if fmt == INDEXED4:
+        texture["indices"] = unpack_nibbles(payload[split:].reshape(height, width // 2), width)
+    else:
+        texture["indices"] = payload[split:].reshape(height, width)
+
+    return texture
+
+
+def to_rgba(texture, palette=0):
+    """(h, w, 4) RGBA of a read texture, indexed ones through the given palette."""
+    if "rgba" in texture:
+        return texture["rgba"]
+    return texture["palettes"][palette][texture["indices"]]
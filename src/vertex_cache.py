@@ -0,0 +1,101 @@
+"""
+Baked vertex animation cache for SHP + SEQ pairs.
+
+Every animation is skinned on the CPU and written as one (frames, vertices, 3)
+.npy file, the static buffers (triangles, uvs, colors) are written once.
+A JSON manifest ties them together. All arrays are plain .npy files so a
+consumer can np.load(..., mmap_mode="r") them and read any frame with
+positions[frame], without touching the rest of the file.
+
+    name.json
+    name.indices.npy          (triangles, 3) uint16 / uint32
+    name.uvs.npy              (vertices, 2) float32
+    name.colors.npy           (vertices, 3) float32
+    name.anim{n}.npy          (frames, vertices, 3) float16 / float32
+"""
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DTYPES = {"float16": np.float16, "float32": np.float32}
+
+
+def write_array(folder, file_name, array):
+    np.save(os.path.join(folder, file_name), np.ascontiguousarray(array))
+    return file_name
+
+
+def export_vertex_cache(shp, animations, output_path, dtype="float32"):
+    """
+    shp          built SHP (or WEP with a skeleton)
+    animations   iterable of SEQAnimation, e.g. seq.animations
+    output_path  manifest path, buffers are written next to it
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown vertex cache dtype: {dtype}")
+
+    folder, manifest_name = os.path.split(output_path)
+    folder = folder or "."
+    name = os.path.splitext(manifest_name)[0]
+    os.makedirs(folder, exist_ok=True)
+
+    attributes = shp.geometry.attributes
+    num_vertices = len(attributes["positions"]) // 3
+
+    # indices are already a triangle list, double sided faces included
+    triangles = np.asarray(attributes["indices"], dtype=np.int64).reshape(-1, 3)
+    index_dtype = np.uint16 if num_vertices <= 0xFFFF else np.uint32
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "vertices": num_vertices,
+        "triangles": len(triangles),
+        "dtype": dtype,
+        "indices": write_array(folder, f"{name}.indices.npy", triangles.astype(index_dtype)),
+        "uvs": write_array(folder, f"{name}.uvs.npy", np.asarray(attributes["uvs"], dtype=np.float32).reshape(-1, 2)),
+        "colors": write_array(folder, f"{name}.colors.npy", np.asarray(attributes["colors"], dtype=np.float32).reshape(num_vertices, -1)),
+        "animations": [],
+    }
+
+    for anim_id, animation in enumerate(animations):
+        positions = shp.pose_positions(animation)
+
+        limit = np.finfo(DTYPES[dtype]).max
+        if np.abs(positions).max(initial=0) > limit:
+            raise ValueError(f"Animation {anim_id} exceeds the {dtype} range, export it as float32")
+
+        positions = positions.astype(DTYPES[dtype])
+
+        manifest["animations"].append({
+            "id": anim_id,
+            "frames": len(positions),
+            "positions": write_array(folder, f"{name}.anim{anim_id}.npy", positions),
+            "min": positions.min(axis=(0, 1)).astype(float).tolist(),
+            "max": positions.max(axis=(0, 1)).astype(float).tolist(),
+        })
+
+    with open(output_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_vertex_cache(manifest_path, mmap_mode="r"):
+    """
+    Reads a manifest back, every buffer is memory-mapped by default.
+    cache["animations"][n]["positions"][frame] is a single (vertices, 3) slice.
+    """
+    folder = os.path.dirname(manifest_path) or "."
+
+    with open(manifest_path) as f:
+        cache = json.load(f)
+
+    for key in ("indices", "uvs", "colors"):
+        cache[key] = np.load(os.path.join(folder, cache[key]), mmap_mode=mmap_mode)
+
+    for animation in cache["animations"]:
+        animation["positions"] = np.load(os.path.join(folder, animation["positions"]), mmap_mode=mmap_mode)
+
+    return cache
@@ -0,0 +1,152 @@
+"""
+Small, valid WEP / SHP / SEQ files built from a seed, so the tests run
+without the game data.
+"""
+import random
+import struct
+
+# texture map of every generated file, format version 1
+TEXTURE_WIDTH = 16
+TEXTURE_HEIGHT = 8
+COLORS_PER_PALETTE = 48
+
+
+def wep_bytes(seed=0, colored=False, num_bones=6, num_groups=6, num_vertices=60, num_triangles=30, num_quads=20,
+              shp=False):
+    """
+    A WEP, or SHP with shp=True, of random bones, vertices and faces.
+    colored picks the version 2 face records carrying vertex colors.
+    Group i is bound to bone i, so num_groups can not exceed num_bones.
+    """
+    rnd = random.Random(seed)
+    b = bytearray()
+
+    b += b"H01\0" + struct.pack("<BBHHH", num_bones, num_groups, num_triangles, num_quads, 0)
+
+    if shp:
+        b += bytes(32)                                        # overlays
+        b += bytes(0x24) + bytes(6)
+        b += struct.pack("<h", 77) + bytes(0xC)              # menu position y
+        b += struct.pack("<hhh", 11, 12, 13) + bytes(4)      # shadow
+        b += struct.pack("<h", 55) + bytes(2) + struct.pack("<h", 66) + bytes(8)
+        b += b"".join(struct.pack("<I", 100 + i) for i in range(12))  # anim lbas
+        b += b"".join(struct.pack("<H", i) for i in range(12))        # chain ids
+        b += b"".join(struct.pack("<I", 200 + i) for i in range(4))   # special lbas
+        b += bytes(0x20)
+        b += struct.pack("<I", 0)                             # magic ptr
+        b += bytes(0x30)
+        b += struct.pack("<IIII", 0, 0, 0, 0)
+    else:
+        b += struct.pack("<I", 0) + bytes(0x30) + struct.pack("<IIII", 0, 0, 0, 0)
+
+    for i in range(num_bones):
+        parent = rnd.randrange(i) if i else num_bones + 1
+        b += struct.pack("<ibbBBbBBB", rnd.randint(-300, 300), parent, i, 0, 0, 0, 0, 0, 0) + bytes(4)
+
+    per_group = num_vertices // num_groups
+    for g in range(num_groups):
+        last = num_vertices if g == num_groups - 1 else (g + 1) * per_group
+        b += struct.pack("<hH", g, last)
+
+    for _ in range(num_vertices):
+        b += struct.pack("<hhh", *[rnd.randint(-500, 500) for _ in range(3)]) + bytes(2)
+
+    faces = [False] * num_triangles + [True] * num_quads
+    rnd.shuffle(faces)
+
+    for quad in faces:
+        vertices = [rnd.randrange(num_vertices) * 4 for _ in range(4 if quad else 3)]
+        uvs = [rnd.randrange(256) for _ in range(8 if quad else 6)]
+        info = rnd.choice([0x04, 0x05])
+
+        if not colored:
+            b += struct.pack("<BBBB", 0x2C if quad else 0x24, 20 if quad else 16, info, 0)
+            b += struct.pack("<" + "H" * len(vertices), *vertices) + bytes(uvs)
+            continue
+
+        colors = [rnd.randrange(256) for _ in range(12)]
+        if quad:
+            b += struct.pack("<HHHH", *vertices)
+            b += bytes(colors[0:3]) + b"\x3c" + bytes(colors[3:6]) + b"\x24" + bytes(colors[6:9]) + bytes([info])
+            b += bytes(colors[9:12]) + b"\0" + bytes(uvs)
+        else:
+            b += struct.pack("<HHH", *vertices) + bytes(uvs[0:2])
+            b += bytes(colors[0:3]) + b"\x34" + bytes(colors[3:6]) + b"\x1c" + bytes(colors[6:9]) + bytes([info])
+            b += bytes(uvs[2:6])
+
+    if shp:
+        b += struct.pack("<I", 0)  # magic
+        b += struct.pack("<I", 0)  # akao length
+
+    num_palettes = 2 if shp else 7
+    b += struct.pack("<IBBBB", 0, 1, TEXTURE_WIDTH // 2, TEXTURE_HEIGHT // 2, COLORS_PER_PALETTE)
+
+    if shp:
+        for _ in range(num_palettes * COLORS_PER_PALETTE):
+            b += struct.pack("<H", rnd.randrange(65536))
+    else:
+        # a shared third of the colors, then the rest of every palette
+        for _ in range(COLORS_PER_PALETTE // 3 + num_palettes * (COLORS_PER_PALETTE // 3) * 2):
+            b += struct.pack("<H", rnd.randrange(65536))
+
+    b += bytes(rnd.randrange(COLORS_PER_PALETTE) for _ in range(TEXTURE_WIDTH * TEXTURE_HEIGHT))
+    return bytes(b)
+
+
+def key_bytes(rnd, length):
+    """Keyframe stream covering length frames, random axes and deltas."""
+    out = bytearray()
+    frame = 0
+
+    while frame < length - 1:
+        frames = rnd.randint(1, 6)
+        mask = rnd.choice([0x80, 0x40, 0x20, 0xE0, 0xA0, 0x60, 0xC0])
+        out.append(mask | (frames - 1))
+        for bit in (0x80, 0x40, 0x20):
+            if mask & bit:
+                out += struct.pack("<b", rnd.randint(-20, 20))
+        frame += frames
+
+    return bytes(out)
+
+
+def seq_bytes(seed=0, num_bones=6, num_animations=4, scale_flags=(0, 1, 2, 3)):
+    """
+    A SEQ of random animations, every odd one based on the one before it.
+    """
+    rnd = random.Random(seed)
+    num_slots = 4
+    headers_end = 16 + num_animations * (num_bones * 4 + 10)
+
+    data = bytearray()
+    headers = bytearray()
+
+    for a in range(num_animations):
+        length = rnd.randint(5, 40)
+        base_animation = -1 if a % 2 == 0 else a - 1
+        flags = scale_flags[a % len(scale_flags)]
+
+        translation_ptr = len(data)
+        data += struct.pack(">hhh", *[rnd.randint(-100, 100) for _ in range(3)]) + key_bytes(rnd, length)
+
+        rotation_ptrs, scale_ptrs = [], []
+        for _ in range(num_bones):
+            rotation_ptrs.append(len(data))
+            if base_animation == -1:
+                data += struct.pack(">hhh", *[rnd.randint(-1000, 1000) for _ in range(3)])
+            data += key_bytes(rnd, length)
+
+            scale_ptrs.append(len(data))
+            if flags & 1:
+                data += bytes(rnd.randint(32, 96) for _ in range(3))
+            if flags & 2:
+                data += key_bytes(rnd, length)
+
+        headers += struct.pack("<HbBHH", length, base_animation, flags, 0, translation_ptr) + bytes(2)
+        headers += struct.pack("<" + "H" * num_bones, *rotation_ptrs)
+        headers += struct.pack("<" + "H" * num_bones, *scale_ptrs)
+
+    b = bytearray(struct.pack("<HBB", num_slots, num_bones, 0))
+    b += struct.pack("<III", 0, 0, headers_end - 8)
+    b += headers + bytes([0, 1, 255, 2]) + data
+    return bytes(b)
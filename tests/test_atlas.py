@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from src.atlas import bake_room_atlas, blit, next_pow2, pack_rects
+from src.MPDmesh import MPDMesh
+from src.V3DClasses import Geometry
+
+
+class Room:
+    def __init__(self, meshes):
+        self.meshes = meshes
+
+
+def make_mesh(rng, texture_id, width, height, num_vertices=9, uv_range=(0.0, 1.0)):
+    mesh = MPDMesh(None, None, texture_id, 0)
+    mesh.positions = rng.normal(size=num_vertices * 3).tolist()
+    mesh.normals = [0.0, 1.0, 0.0] * num_vertices
+    mesh.colors = [0.5] * num_vertices * 3
+    mesh.indices = list(range(num_vertices))
+
+    # texel centres, so a lookup never lands on a rect edge
+    texels = rng.integers(0, (width, height), size=(num_vertices, 2))
+    uvs = (texels + 0.5) / (width, height)
+    uvs = uv_range[0] + uvs * (uv_range[1] - uv_range[0])
+    mesh.uvs = uvs.ravel().tolist()
+
+    mesh.geometry = Geometry()
+    for name in ("positions", "normals", "colors", "uvs", "indices"):
+        mesh.geometry.attributes[name] = getattr(mesh, name)
+
+    mesh.material = {
+        "data": rng.integers(0, 256, size=width * height * 4, dtype=np.uint8).tobytes(),
+        "width": width,
+        "height": height,
+    }
+    mesh.material_id = f"{texture_id}-0"
+    mesh.rotation_x = np.pi
+    mesh.scale = (0.1, 0.1, 0.1)
+    return mesh
+
+
+def texel(material, uv):
+    image = np.frombuffer(material["data"], dtype=np.uint8).reshape(material["height"], material["width"], 4)
+    x = int(uv[0] * material["width"])
+    y = int(uv[1] * material["height"])
+    return image[y, x]
+
+
+def test_next_pow2():
+    assert [next_pow2(n) for n in (0, 1, 2, 3, 64, 65, 255.5)] == [1, 1, 2, 4, 64, 128, 256]
+
+
+@pytest.mark.parametrize("padding", [0, 2])
+def test_pack_rects_never_overlap(padding):
+    rng = np.random.default_rng(0)
+    sizes = [tuple(s) for s in rng.integers(4, 130, size=(40, 2)).tolist()]
+
+    positions, (width, height) = pack_rects(sizes, padding)
+
+    assert width == next_pow2(width) and height == next_pow2(height)
+
+    used = np.zeros((height, width), dtype=np.int64)
+    for (x, y), (w, h) in zip(positions, sizes):
+        assert x - padding >= 0 and y - padding >= 0
+        assert x + w + padding <= width and y + h + padding <= height
+        used[y - padding:y + h + padding, x - padding:x + w + padding] += 1
+
+    assert used.max() == 1
+
+
+def test_blit_wraps_the_gutter():
+    image = np.arange(3 * 4 * 4, dtype=np.uint8).reshape(3, 4, 4)
+    atlas = np.zeros((8, 8, 4), dtype=np.uint8)
+
+    blit(atlas, image, 2, 2, 2)
+
+    assert np.array_equal(atlas[2:5, 2:6], image)
+    assert np.array_equal(atlas[0:7, 0:8], np.pad(image, ((2, 2), (2, 2), (0, 0)), mode="wrap"))
+
+
+def test_baked_room_samples_the_same_texels():
+    rng = np.random.default_rng(1)
+    meshes = [make_mesh(rng, i, *size) for i, size in enumerate([(64, 64), (32, 128), (256, 16), (16, 16)])]
+    repeating = make_mesh(rng, 9, 32, 32, uv_range=(0.0, 2.0))
+    room = Room(meshes + [repeating])
+
+    baked = bake_room_atlas(room, material_id="room_atlas")
+
+    assert room.meshes[0] is meshes[0]
+    assert len(baked.meshes) == 2
+    assert baked.meshes[1] is repeating
+    assert sorted(baked.atlas) == [m.material_id for m in meshes]
+
+    atlased = baked.meshes[0]
+    assert atlased.material_id == "room_atlas"
+    assert len(atlased.indices) == sum(len(m.indices) for m in meshes)
+
+    uvs = np.asarray(atlased.uvs).reshape(-1, 2)
+    start = 0
+    for mesh in meshes:
+        original = np.asarray(mesh.uvs).reshape(-1, 2)
+        for before, after in zip(original, uvs[start:start + len(original)]):
+            assert np.array_equal(texel(mesh.material, before), texel(atlased.material, after))
+        start += len(original)
+
+
+def test_nothing_to_bake():
+    rng = np.random.default_rng(2)
+    room = Room([make_mesh(rng, 0, 16, 16, uv_range=(-1.0, 1.0))])
+    assert bake_room_atlas(room) is room
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src import catalogue
+from src.Reader import Reader
+from src.SHP import SHP
+from src.WEP import WEP
+from tests.synthetic import wep_bytes
+
+
+@pytest.fixture
+def obj_dir(tmp_path):
+    folder = tmp_path / "OBJ"
+    folder.mkdir()
+    (folder / "01.WEP").write_bytes(wep_bytes(seed=1, num_bones=4, num_groups=4, num_triangles=10, num_quads=5))
+    (folder / "02.WEP").write_bytes(wep_bytes(seed=2, colored=True, num_bones=9, num_triangles=40, num_quads=2))
+    (folder / "00.SHP").write_bytes(wep_bytes(seed=3, num_bones=6, shp=True))
+    (folder / "00_COM.SEQ").write_bytes(b"not a model")
+    return folder
+
+
+@pytest.mark.parametrize("name, cls", [("01.WEP", WEP), ("02.WEP", WEP), ("00.SHP", SHP)])
+def test_probe_matches_full_read(obj_dir, name, cls):
+    path = obj_dir / name
+    entry = catalogue.probe(str(path))
+
+    model = cls(Reader(path.read_bytes()))
+    model.read()
+
+    assert entry["file"] == name
+    assert entry["size"] == path.stat().st_size
+    for field in ("num_bones", "num_groups", "num_triangles", "num_quads", "num_polygons", "num_all_polygons"):
+        assert entry[field] == getattr(model, field)
+
+    if cls is SHP:
+        assert entry["menu_position_y"] == model.menu_position_y
+        assert entry["anim_lbas"] == model.anim_lbas
+        assert "Animations:" in catalogue.describe(entry)
+
+
+def test_scan_caches_unchanged_files(obj_dir, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache.json")
+
+    entries = catalogue.scan(str(obj_dir), cache_path)
+    assert sorted(entries) == ["00.SHP", "01.WEP", "02.WEP"]
+
+    probed = []
+    probe = catalogue.probe
+    monkeypatch.setattr(catalogue, "probe", lambda path: probed.append(os.path.basename(path)) or probe(path))
+
+    assert catalogue.scan(str(obj_dir), cache_path) == entries
+    assert probed == []
+
+    path = obj_dir / "01.WEP"
+    path.write_bytes(wep_bytes(seed=5, num_bones=7))
+    os.utime(path, (1, 1))
+
+    rescanned = catalogue.scan(str(obj_dir), cache_path, workers=0)
+    assert probed == ["01.WEP"]
+    assert rescanned["01.WEP"]["num_bones"] == 7
+    assert rescanned["02.WEP"] == entries["02.WEP"]
+
+
+def test_sort_and_filter_items():
+    entries = {
+        "01.WEP": {"num_bones": 4, "num_all_polygons": 15, "num_groups": 6},
+        "02.WEP": {"num_bones": 9, "num_all_polygons": 42, "num_groups": 6},
+        "03.WEP": {"num_bones": 2, "num_all_polygons": 80, "num_groups": 1},
+    }
+    items = [("Dirk", "01.WEP"), ("Battle Knife", "02.WEP"), ("Kris", "03.WEP"), ("Unknown", "04.WEP")]
+
+    assert catalogue.sort_items(items, entries, "Bones") == [items[2], items[0], items[1], items[3]]
+    assert catalogue.sort_items(items, entries, "Polygons", reverse=True)[:3] == [items[2], items[1], items[0]]
+    assert catalogue.sort_items(items, entries, "Name")[0] == items[1]
+
+    assert catalogue.filter_items(items, entries, "") == items
+    assert catalogue.filter_items(items, entries, "kni") == [items[1]]
+    assert catalogue.filter_items(items, entries, "bones > 3") == [items[0], items[1]]
+    assert catalogue.filter_items(items, entries, "polygons>=42 groups=6") == [items[1]]
+    assert catalogue.filter_items(items, entries, "ris bones<5") == [items[2]]
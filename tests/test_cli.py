@@ -0,0 +1,163 @@
+import json
+import os
+
+import pytest
+
+from src import cli
+from src.export_manifest import ExportManifest
+from tests.synthetic import seq_bytes, wep_bytes
+
+LEVELS = {
+    "Wine Cellar": [[1, 0, "MAP010.MPD", "Entrance to Darkness"], [1, 0, "MAP011.MPD", "Hall of Struggle"]],
+    "Snowfly Forest": [[2, 0, "MAP100.MPD", "Hewn from Nature"]],
+}
+CHARACTERS = {"?????": "?????", "00.SHP": "Ashley Riot (Normal)", "01.SHP": "Romeo Guildenstern"}
+WEAPONS = {"Battle Knife": "01", "Dirk": "02", "Unused": ""}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    folder = tmp_path / "data"
+    obj_dir = folder / "OBJ"
+    obj_dir.mkdir(parents=True)
+
+    for name, content in (("level_map_names.json", LEVELS), ("characters.json", CHARACTERS),
+                          ("weapon_name_map.json", WEAPONS)):
+        (folder / name).write_text(json.dumps(content))
+
+    (obj_dir / "00.SHP").write_bytes(wep_bytes(seed=1, num_bones=6, shp=True))
+    (obj_dir / "00_COM.SEQ").write_bytes(seq_bytes(seed=1, num_bones=6))
+    (obj_dir / "01.WEP").write_bytes(wep_bytes(seed=2, num_bones=4, num_groups=4))
+    (obj_dir / "02.WEP").write_bytes(wep_bytes(seed=3, colored=True))
+    (obj_dir / "README.TXT").write_text("not an asset")
+    return str(folder)
+
+
+def labels(jobs):
+    return [job["label"] for job in jobs]
+
+
+def with_textures(jobs):
+    """the texture options main adds to every job"""
+    for job in jobs:
+        job["textures"] = {"png_level": 1, "indexed": False, "compression": "none"}
+    return jobs
+
+
+def test_select_jobs(data_dir):
+    assert cli.select_jobs(data_dir) == []
+
+    maps = cli.select_jobs(data_dir, maps=[])
+    assert labels(maps) == ["Wine Cellar / Entrance to Darkness", "Wine Cellar / Hall of Struggle",
+                            "Snowfly Forest / Hewn from Nature"]
+    assert maps[0]["mpd"] == os.path.join(data_dir, "MAP", "MAP010.MPD")
+    assert maps[0]["znd"] == os.path.join(data_dir, "MAP", "ZONE001.ZND")
+    assert maps[0]["name"] == "MAP010_EntranceToDarkness"
+    assert maps[0]["folder"] == os.path.join("levels", "WineCellar")
+
+    # area, file or room title, case insensitive
+    assert labels(cli.select_jobs(data_dir, maps=["wine cellar"])) == labels(maps[:2])
+    assert labels(cli.select_jobs(data_dir, maps=["map100.mpd"])) == labels(maps[2:])
+    assert labels(cli.select_jobs(data_dir, maps=["HALL OF STRUGGLE"])) == labels(maps[1:2])
+
+    characters = cli.select_jobs(data_dir, characters=[])
+    assert labels(characters) == ["Ashley Riot (Normal)", "Romeo Guildenstern"]
+    assert characters[0]["seqs"] == [os.path.join(data_dir, "OBJ", "00_COM.SEQ")]
+    assert characters[1]["seqs"] == []
+
+    weapons = cli.select_jobs(data_dir, weapons=["dirk", "01.wep"])
+    assert labels(weapons) == ["Battle Knife", "Dirk"]
+    assert weapons[1]["wep"] == os.path.join(data_dir, "OBJ", "02.WEP")
+    assert weapons[1]["name"] == "Dirk"
+
+
+def test_path_jobs(data_dir, tmp_path):
+    obj_dir = os.path.join(data_dir, "OBJ")
+    jobs = cli.path_jobs(data_dir, [obj_dir])
+
+    assert [(job["kind"], job["label"]) for job in jobs] == [
+        ("character", "00.SHP"), ("weapon", "01.WEP"), ("weapon", "02.WEP"),
+    ]
+    assert jobs[0]["seqs"] == [os.path.join(obj_dir, "00_COM.SEQ")]
+
+    # a known room keeps its names, the ZND is looked for next to the MPD
+    other = tmp_path / "elsewhere"
+    other.mkdir()
+    known, unknown = str(other / "map011.mpd"), str(other / "MAP999.MPD")
+    room, plain = cli.path_jobs(data_dir, [known, unknown])
+
+    assert room["label"] == "Wine Cellar / Hall of Struggle"
+    assert room["mpd"] == known
+    assert room["znd"] == str(other / "ZONE001.ZND")
+    assert plain == {"kind": "map", "label": "MAP999", "name": "MAP999", "folder": "levels", "znd": None,
+                     "mpd": unknown}
+
+
+def test_plan_jobs_skips_current_outputs(data_dir, tmp_path):
+    jobs = with_textures(cli.select_jobs(data_dir, weapons=["Battle Knife"]))
+    output_dir = tmp_path / "out"
+    manifest = ExportManifest(str(output_dir))
+
+    assert cli.plan_jobs(jobs, ["glb", "obj"]) == [(jobs[0], ["glb", "obj"])]
+    assert cli.plan_jobs(jobs, ["glb", "obj"], manifest) == [(jobs[0], ["glb", "obj"])]
+
+    output = output_dir / "weapons" / "BattleKnife" / "BattleKnife.glb"
+    output.parent.mkdir(parents=True)
+    output.write_bytes(b"glb")
+    job = jobs[0]
+    manifest.record(cli.job_key(job, "glb"), cli.job_sources(job), job["kind"], "glb",
+                    cli.job_options(job, "glb", 30), [str(output)])
+
+    assert cli.plan_jobs(jobs, ["glb", "obj"], manifest) == [(job, ["obj"])]
+    assert cli.plan_jobs(jobs, ["glb"], manifest) == []
+    # without a manifest nothing counts as current
+    assert cli.plan_jobs(jobs, ["glb"]) == [(job, ["glb"])]
+
+    output.unlink()
+    assert cli.plan_jobs(jobs, ["glb"], manifest) == [(job, ["glb"])]
+
+
+def test_run_jobs_and_rerun(data_dir, tmp_path, capsys):
+    formats = ["glb", "obj", "png"]
+    output_dir = str(tmp_path / "out")
+    jobs = with_textures(cli.path_jobs(data_dir, [os.path.join(data_dir, "OBJ")]))
+
+    manifest = ExportManifest(output_dir, cli.MANIFEST_MODULES)
+    plan = cli.plan_jobs(jobs, formats, manifest)
+    assert len(plan) == 3
+
+    assert cli.run_jobs(plan, output_dir, workers=1, manifest=manifest) == []
+    manifest.save()
+    assert "[3/3]" in capsys.readouterr().out
+
+    shp_glb = os.path.join(output_dir, "characters", "00", "00.glb")
+    wep_obj = os.path.join(output_dir, "weapons", "01", "01.obj")
+    wep_png = os.path.join(output_dir, "weapons", "01", "01_0.png")
+    for path in (shp_glb, wep_obj, wep_png, wep_obj[:-3] + "mtl"):
+        assert os.path.getsize(path)
+
+    # the OBJ points at the PNG export rather than writing its own copy
+    with open(wep_obj[:-3] + "mtl") as f:
+        assert "map_Kd 01_0.png" in f.read()
+    pngs = [f"01_{i}.png" for i in range(7)]
+    assert sorted(os.listdir(os.path.dirname(wep_obj))) == ["01.glb", "01.mtl", "01.obj"] + pngs
+
+    manifest = ExportManifest(output_dir, cli.MANIFEST_MODULES)
+    assert cli.plan_jobs(jobs, formats, manifest) == []
+
+    # only the animated export depends on the frame rate
+    assert cli.plan_jobs(jobs, formats, manifest, fps=60) == [(jobs[0], ["glb"])]
+
+    # a changed SEQ, a deleted texture the OBJ uses, a failing job
+    with open(jobs[0]["seqs"][0], "wb") as f:
+        f.write(seq_bytes(seed=9, num_bones=6))
+    os.remove(wep_png)
+    with open(jobs[2]["wep"], "wb") as f:
+        f.write(b"H01\0broken")
+
+    plan = cli.plan_jobs(jobs, formats, manifest)
+    assert plan == [(jobs[0], formats), (jobs[1], ["obj", "png"]), (jobs[2], formats)]
+
+    assert cli.run_jobs(plan, output_dir, workers=1, manifest=manifest) == [jobs[2]]
+    assert "FAILED 02.WEP" in capsys.readouterr().err
+    assert cli.plan_jobs(jobs, formats, manifest) == [(jobs[2], formats)]
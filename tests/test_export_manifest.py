@@ -0,0 +1,81 @@
+import os
+
+from src import export_manifest
+from src.export_manifest import MANIFEST_NAME, ExportManifest
+
+
+def make_export(tmp_path):
+    source = tmp_path / "01.WEP"
+    source.write_bytes(b"weapon")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    output = output_dir / "01.glb"
+    output.write_bytes(b"glb")
+    return str(source), str(output_dir), str(output)
+
+
+def test_recorded_output_is_current(tmp_path):
+    source, output_dir, output = make_export(tmp_path)
+
+    manifest = ExportManifest(output_dir)
+    assert not manifest.is_current("01.glb", [source], "weapon", "glb", {"fps": 30})
+
+    manifest.record("01.glb", [source], "weapon", "glb", {"fps": 30}, [output])
+    manifest.save()
+    assert os.path.exists(os.path.join(output_dir, MANIFEST_NAME))
+
+    reloaded = ExportManifest(output_dir)
+    assert reloaded.is_current("01.glb", [source], "weapon", "glb", {"fps": 30})
+    assert reloaded.outputs["01.glb"]["files"] == ["01.glb"]
+
+    # options go through json, a tuple matches the list it was saved as
+    assert reloaded.is_current("01.glb", [source], "weapon", "glb", {"size": (1, 2)}) is False
+    reloaded.record("01.glb", [source], "weapon", "glb", {"size": (1, 2)}, [output])
+    assert reloaded.is_current("01.glb", [source], "weapon", "glb", {"size": [1, 2]})
+
+
+def test_changes_invalidate_the_output(tmp_path):
+    source, output_dir, output = make_export(tmp_path)
+
+    manifest = ExportManifest(output_dir)
+    manifest.record("01.glb", [source], "weapon", "glb", None, [output])
+
+    assert not manifest.is_current("01.glb", [source], "weapon", "glb", {"fps": 60})
+    assert not manifest.is_current("01.glb", [source], "weapon", "obj", None)
+    assert not manifest.is_current("01.glb", [source, str(tmp_path / "00.SEQ")], "weapon", "glb", None)
+
+    with open(source, "wb") as f:
+        f.write(b"patched weapon")
+    assert not manifest.is_current("01.glb", [source], "weapon", "glb", None)
+
+    manifest.record("01.glb", [source], "weapon", "glb", None, [output])
+    assert manifest.is_current("01.glb", [source], "weapon", "glb", None)
+
+    os.remove(output)
+    assert not manifest.is_current("01.glb", [source], "weapon", "glb", None)
+
+
+def test_source_hashes_are_reused(tmp_path, monkeypatch):
+    source, output_dir, _ = make_export(tmp_path)
+
+    manifest = ExportManifest(output_dir)
+    first = manifest.source_hash(source)
+
+    hashed = []
+    monkeypatch.setattr(export_manifest, "file_hash", lambda path: hashed.append(path) or "changed")
+
+    assert manifest.source_hash(source) == first
+    assert hashed == []
+
+    os.utime(source, (1, 1))
+    assert manifest.source_hash(source) == "changed"
+    assert hashed == [source]
+
+
+def test_code_version_covers_the_modules():
+    weapon = export_manifest.code_version("weapon", "glb")
+
+    assert weapon == export_manifest.code_version("weapon", "glb")
+    assert weapon != export_manifest.code_version("weapon", "obj")
+    assert weapon != export_manifest.code_version("map", "glb")
+    assert weapon != export_manifest.code_version("weapon", "glb", ("src.atlas",))
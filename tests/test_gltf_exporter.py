@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+pygltflib = pytest.importorskip("pygltflib")
+
+from src.GLTF_exporter import export_glb
+from src.Reader import Reader
+from src.SEQ import SEQ
+from src.SHP import SHP
+from src.WEP import WEP
+from tests.synthetic import seq_bytes, wep_bytes
+
+COMPONENT_SIZES = {5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4}
+COMPONENT_DTYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+TYPE_WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+
+def build(cls, data):
+    model = cls(Reader(data))
+    model.read()
+    model.build()
+    return model
+
+
+def load_glb(path):
+    gltf = pygltflib.GLTF2().load_binary(str(path))
+    return gltf, gltf.binary_blob()
+
+
+def accessor_data(gltf, blob, index):
+    """(count, width) array of an accessor, read back the way a loader would"""
+    accessor = gltf.accessors[index]
+    view = gltf.bufferViews[accessor.bufferView]
+    start = view.byteOffset + (accessor.byteOffset or 0)
+    width = TYPE_WIDTHS[accessor.type]
+    dtype = COMPONENT_DTYPES[accessor.componentType]
+    return np.frombuffer(blob, dtype=dtype, count=accessor.count * width, offset=start).reshape(-1, width)
+
+
+def check_layout(gltf, blob):
+    assert len(gltf.buffers) == 1
+    assert gltf.buffers[0].byteLength == len(blob)
+
+    for view in gltf.bufferViews:
+        assert view.byteOffset % 4 == 0
+        assert view.byteOffset + view.byteLength <= len(blob)
+
+    for accessor in gltf.accessors:
+        view = gltf.bufferViews[accessor.bufferView]
+        size = accessor.count * COMPONENT_SIZES[accessor.componentType] * TYPE_WIDTHS[accessor.type]
+        assert (accessor.byteOffset or 0) + size == view.byteLength
+
+
+def test_wep_round_trip(tmp_path):
+    wep = build(WEP, wep_bytes(seed=4, colored=True))
+    path = export_glb(str(tmp_path / "model.glb"), wep)
+
+    gltf, blob = load_glb(path)
+    check_layout(gltf, blob)
+    assert not gltf.animations
+
+    attributes = wep.geometry.attributes
+    primitive = gltf.meshes[0].primitives[0]
+    positions = accessor_data(gltf, blob, primitive.attributes.POSITION)
+    triangles = accessor_data(gltf, blob, primitive.indices)
+
+    assert np.allclose(positions, np.asarray(attributes["positions"]).reshape(-1, 3))
+    assert triangles.ravel().tolist() == np.asarray(attributes["indices"]).ravel().tolist()
+    assert gltf.accessors[primitive.attributes.POSITION].min == positions.min(axis=0).tolist()
+
+    joints = accessor_data(gltf, blob, primitive.attributes.JOINTS_0)
+    assert joints.max() < len(gltf.skins[0].joints)
+
+
+def test_inverse_bind_matrices_are_column_major(tmp_path):
+    wep = build(WEP, wep_bytes(seed=5, num_bones=8))
+    gltf, blob = load_glb(export_glb(str(tmp_path / "model.glb"), wep))
+
+    skin = gltf.skins[0]
+    columns = accessor_data(gltf, blob, skin.inverseBindMatrices)
+    inverses = columns.reshape(-1, 4, 4).transpose(0, 2, 1)
+
+    # column major puts the translation in elements 12..14, the last row stays 0 0 0 1
+    assert np.allclose(columns[:, [3, 7, 11, 15]], [0, 0, 0, 1])
+    assert np.allclose(inverses, wep.Skeleton.boneInverses, atol=1e-4)
+
+    # every joint's bind transform, walked from the node translations, undoes its inverse
+    parents = {child: node for node, n in enumerate(gltf.nodes) for child in (n.children or [])}
+    for joint, inverse in zip(skin.joints, inverses):
+        bind = np.eye(4)
+        node = joint
+        while node in skin.joints:
+            local = np.eye(4)
+            local[:3, 3] = gltf.nodes[node].translation
+            bind = local @ bind
+            node = parents.get(node)
+        assert np.allclose(bind @ inverse, np.eye(4), atol=1e-3)
+
+
+def test_shp_seq_round_trip(tmp_path):
+    shp = build(SHP, wep_bytes(seed=6, num_bones=6, shp=True))
+    seq = SEQ(Reader(seq_bytes(seed=6, num_bones=6)))
+    seq.read()
+    seq.build()
+    animations = list(seq.animations)
+
+    fps = 30
+    gltf, blob = load_glb(export_glb(str(tmp_path / "model.glb"), shp, animations, fps))
+    check_layout(gltf, blob)
+
+    assert len(gltf.animations) == len(animations)
+    joints = gltf.skins[0].joints
+
+    for animation, exported in zip(animations, gltf.animations):
+        pose = animation.bake()
+        num_frames = len(pose["rotation"])
+
+        for channel in exported.channels:
+            sampler = exported.samplers[channel.sampler]
+            times = gltf.accessors[sampler.input]
+            output = gltf.accessors[sampler.output]
+
+            assert channel.target.node in joints
+            assert sampler.interpolation == "LINEAR"
+            # LINEAR keeps one output element per keyframe time
+            assert output.count == times.count == num_frames
+            assert times.max[0] == pytest.approx((num_frames - 1) / fps)
+
+            values = accessor_data(gltf, blob, sampler.output)
+            bone_id = joints.index(channel.target.node)
+            if channel.target.path == "rotation":
+                assert output.type == "VEC4"
+                assert np.allclose(values, pose["rotation"][:, bone_id], atol=1e-6)
+            elif channel.target.path == "scale":
+                assert output.type == "VEC3"
+                assert np.allclose(values, pose["scale"][:, bone_id], atol=1e-6)
+            else:
+                assert output.type == "VEC3"
+                assert np.allclose(values, pose["translation"], atol=1e-6)
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.OBJexporter import export_obj, export_obj_scene, node_matrix
+from src.Reader import Reader
+from src.WEP import WEP
+from tests.synthetic import wep_bytes
+
+
+def build_wep(seed, colored=False):
+    wep = WEP(Reader(wep_bytes(seed=seed, colored=colored)))
+    wep.read()
+    wep.build()
+    return wep
+
+
+def room(*weps):
+    """an MPD stand-in, one untextured part per WEP, scaled like a room"""
+    meshes = [
+        SimpleNamespace(material_id=f"{i}-0", material=None, geometry=wep.geometry, rotation_x=np.pi,
+                        scale=(0.1, 0.1, 0.1))
+        for i, wep in enumerate(weps)
+    ]
+    return SimpleNamespace(meshes=meshes)
+
+
+def parse_obj(path):
+    """(v rows, (T, 3, 3) corner values of position, uv and normal), indices resolved"""
+    pools = {"v": [], "vt": [], "vn": []}
+    corners = []
+
+    with open(path) as f:
+        for line in f:
+            prefix, *values = line.split()
+            if prefix in pools:
+                pools[prefix].append([float(x) for x in values])
+            elif prefix == "f":
+                corners.append([[int(i) - 1 for i in corner.split("/")] for corner in values])
+
+    v, vt, vn = (np.array(pools[key]) for key in ("v", "vt", "vn"))
+    corners = np.array(corners)
+    return v, (v[corners[..., 0], :3], vt[corners[..., 1]], vn[corners[..., 2]])
+
+
+def reference_obj(attributes, transform, path):
+    """the per-vertex export_obj of the same geometry, moved the way the scene export moves it"""
+    matrix = node_matrix(*transform)
+    normals = np.asarray(attributes["normals"], dtype=np.float64).reshape(-1, 3) @ np.linalg.inv(matrix)
+    # degenerate random faces have zero normals, those stay zero
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    mesh = SimpleNamespace(
+        positions=np.asarray(attributes["positions"], dtype=np.float64).reshape(-1, 3) @ matrix.T,
+        normals=np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0),
+        uvs=attributes["uvs"],
+        indices=attributes["indices"],
+    )
+    export_obj(mesh, path)
+    return parse_obj(path)[1]
+
+
+@pytest.mark.parametrize("weld_vertices", [False, True])
+@pytest.mark.parametrize("colored", [False, True])
+def test_scene_matches_per_vertex_export(tmp_path, weld_vertices, colored):
+    wep = build_wep(seed=2, colored=colored)
+    written = export_obj_scene(str(tmp_path / "scene.obj"), wep, weld_vertices, vertex_colors=False)
+    assert written[:2] == [str(tmp_path / "scene.obj"), str(tmp_path / "scene.mtl")]
+
+    v, corners = parse_obj(tmp_path / "scene.obj")
+    expected = reference_obj(wep.geometry.attributes, (np.pi, (1, 1, 1)), tmp_path / "reference.obj")
+
+    num_corners = len(np.asarray(wep.geometry.attributes["indices"]))
+    assert v.shape[1] == 3
+    assert (len(v) < num_corners) if weld_vertices else (len(v) == num_corners)
+    for values, reference in zip(corners, expected):
+        assert np.allclose(values, reference, atol=1e-5)
+
+
+@pytest.mark.parametrize("weld_vertices", [False, True])
+def test_parts_continue_the_index_pools(tmp_path, weld_vertices):
+    weps = [build_wep(seed=3), build_wep(seed=4, colored=True)]
+    export_obj_scene(str(tmp_path / "room.obj"), room(*weps), weld_vertices, vertex_colors=False)
+    _, corners = parse_obj(tmp_path / "room.obj")
+
+    expected = [
+        reference_obj(wep.geometry.attributes, (np.pi, (0.1, 0.1, 0.1)), tmp_path / f"{i}.obj")
+        for i, wep in enumerate(weps)
+    ]
+    for channel, values in enumerate(corners):
+        assert np.allclose(values, np.concatenate([e[channel] for e in expected]), atol=1e-5)
+
+    with open(tmp_path / "room.obj") as f:
+        groups = [line.split()[1] for line in f if line.startswith("usemtl")]
+    assert groups == ["0-0", "1-0"]
+
+
+def test_vertex_colors(tmp_path):
+    wep = build_wep(seed=5, colored=True)
+    export_obj_scene(str(tmp_path / "scene.obj"), wep, weld_vertices=True)
+    v, (positions, _, _) = parse_obj(tmp_path / "scene.obj")
+
+    attributes = wep.geometry.attributes
+    triangles = np.asarray(attributes["indices"])
+    colors = np.asarray(attributes["colors"], dtype=np.float64).reshape(-1, 3)[triangles]
+
+    assert v.shape[1] == 6
+    # welded rows keep position and color together, every color still lands on its corner
+    with open(tmp_path / "scene.obj") as f:
+        faces = [[int(c.split("/")[0]) - 1 for c in line.split()[1:]] for line in f if line.startswith("f ")]
+    assert np.allclose(v[np.ravel(faces), 3:], colors, atol=1e-5)
+    assert np.allclose(v[np.ravel(faces), :3].reshape(-1, 3, 3), positions, atol=1e-9)
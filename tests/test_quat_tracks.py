@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.Reader import Reader
+from src.SEQ import SEQ
+from src.VSTOOLS import quat_slerp_array, sample_quat_track
+from tests.synthetic import seq_bytes
+
+
+def random_quats(rng, n):
+    q = rng.normal(size=(n, 4))
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def slerp(q0, q1, t):
+    """Textbook scalar slerp, the short way round."""
+    q0 = np.asarray(q0, dtype=np.float64)
+    q1 = np.asarray(q1, dtype=np.float64)
+    dot = np.dot(q0, q1)
+    if dot < 0:
+        q1, dot = -q1, -dot
+    if dot > 0.9995:
+        q = q0 + t * (q1 - q0)
+        return q / np.linalg.norm(q)
+    theta = np.arccos(dot)
+    return (np.sin((1 - t) * theta) * q0 + np.sin(t * theta) * q1) / np.sin(theta)
+
+
+def same_rotation(a, b, atol=1e-9):
+    """q and -q are the same rotation"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    return np.allclose(np.abs(np.sum(a * b, axis=1)), 1.0, atol=atol)
+
+
+def test_slerp_matches_scalar_reference():
+    rng = np.random.default_rng(0)
+    q0, q1 = random_quats(rng, 200), random_quats(rng, 200)
+    t = rng.uniform(size=200)
+
+    # a few nearly parallel pairs for the lerp fallback
+    q1[:10] = q0[:10] + rng.normal(scale=1e-5, size=(10, 4))
+
+    expected = np.array([slerp(a, b, s) for a, b, s in zip(q0, q1, t)])
+    assert np.allclose(quat_slerp_array(q0, q1, t), expected, atol=1e-12)
+
+
+def test_sample_quat_track():
+    rng = np.random.default_rng(1)
+    times = np.array([0.0, 2.0, 3.0, 7.0, 12.0])
+    values = random_quats(rng, len(times))
+
+    # exact at the keys, clamped outside them
+    assert same_rotation(sample_quat_track(times, values, times), values)
+    assert same_rotation(sample_quat_track(times, values, [-5.0, 20.0]), values[[0, -1]])
+
+    query = rng.uniform(-1.0, 13.0, size=(6, 7))
+    sampled = sample_quat_track(times, values, query)
+    assert sampled.shape == (6, 7, 4)
+
+    for t, q in zip(query.ravel(), sampled.reshape(-1, 4)):
+        i = min(max(np.searchsorted(times, t, side="right") - 1, 0), len(times) - 2)
+        alpha = np.clip((t - times[i]) / (times[i + 1] - times[i]), 0.0, 1.0)
+        assert np.allclose(q, slerp(values[i], values[i + 1], alpha), atol=1e-12)
+
+
+def test_sample_single_key_track():
+    value = [0.0, 0.0, 0.0, 1.0]
+    sampled = sample_quat_track([4.0], [value], np.arange(5.0))
+    assert np.array_equal(sampled, np.tile(value, (5, 1)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rotation_tracks_match_baked_pose(seed):
+    seq = SEQ(Reader(seq_bytes(seed)))
+    seq.read()
+    seq.build(time_scale=0.5)
+
+    for animation in seq.animations:
+        rotation = animation.bake()["rotation"]
+
+        for bone_id in range(seq.num_bones):
+            track = animation.build_rotation_track(bone_id, time_scale=0.5)
+            frames = np.rint(np.asarray(track["times"]) / 0.5).astype(np.int64)
+
+            assert track["type"] == "rotation"
+            assert np.all(np.diff(frames) > 0)
+
+            # the last key may end past the animation length, bake() stops at it
+            inside = frames < len(rotation)
+            assert same_rotation(np.asarray(track["values"])[inside], rotation[frames[inside], bone_id], atol=1e-6)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src import texture_container
+from src.Reader import Reader
+from src.WEP import WEP
+from src.texture_container import HEADER, MAGIC, read_texture, to_rgba, write_texture
+from tests.synthetic import wep_bytes
+
+
+def random_indexed(rng, colors, width=16, height=8, num_palettes=3):
+    indices = rng.integers(0, colors, size=(height, width), dtype=np.uint8)
+    palettes = rng.integers(0, 256, size=(num_palettes, colors, 4), dtype=np.uint8)
+    return indices, palettes
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_rgba_round_trip(tmp_path, compression, mmap):
+    rgba = np.random.default_rng(0).integers(0, 256, size=(8, 16, 4), dtype=np.uint8)
+    path = write_texture(str(tmp_path / "t.vstex"), 16, 8, rgba=rgba.tobytes(), compression=compression)
+
+    texture = read_texture(path, mmap=mmap)
+
+    assert texture["format"] == "rgba8"
+    assert (texture["width"], texture["height"]) == (16, 8)
+    assert np.array_equal(texture["rgba"], rgba)
+    assert to_rgba(texture) is texture["rgba"]
+
+
+@pytest.mark.parametrize("colors, fmt", [(16, "indexed4"), (256, "indexed8")])
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_indexed_round_trip(tmp_path, colors, fmt, compression):
+    indices, palettes = random_indexed(np.random.default_rng(1), colors)
+    path = write_texture(str(tmp_path / "t.vstex"), 16, 8, indices=indices, palettes=palettes, compression=compression)
+
+    texture = read_texture(path)
+
+    assert texture["format"] == fmt
+    assert np.array_equal(texture["indices"], indices)
+    assert np.array_equal(texture["palettes"], palettes)
+    assert np.array_equal(to_rgba(texture, 2), palettes[2][indices])
+
+
+def test_header_layout(tmp_path):
+    indices, palettes = random_indexed(np.random.default_rng(2), 16, num_palettes=2)
+    path = write_texture(str(tmp_path / "t.vstex"), 16, 8, indices=indices, palettes=palettes)
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    assert HEADER.size == 32
+    magic, version, fmt, width, height, num_palettes, compression, stored, raw = HEADER.unpack_from(data)
+    assert (magic, fmt, width, height, num_palettes, compression) == (MAGIC, 2, 16, 8, 2, 0)
+
+    # palettes, then two texels per byte, low nibble first
+    assert stored == raw == 2 * 16 * 4 + 16 * 8 // 2 == len(data) - HEADER.size
+    assert data[32:32 + 16 * 4] == palettes[0].tobytes()
+    first = data[32 + 2 * 16 * 4]
+    assert (first & 0x0F, first >> 4) == (indices[0, 0], indices[0, 1])
+
+
+def test_nibble_packing():
+    indices = np.random.default_rng(3).integers(0, 16, size=(5, 12), dtype=np.uint8)
+    packed = texture_container.pack_nibbles(indices)
+    assert packed.shape == (5, 6)
+    assert np.array_equal(texture_container.unpack_nibbles(packed, 12), indices)
+
+
+def test_wep_texture_matches_build(tmp_path):
+    wep = WEP(Reader(wep_bytes(seed=4)))
+    wep.read()
+    wep.build()
+    texture_map = wep.texture_map
+
+    path = write_texture(
+        str(tmp_path / "wep.vstex"), texture_map.get_width(), texture_map.height,
+        indices=texture_map.indices(), palettes=texture_map.palette_array(),
+    )
+    texture = read_texture(path)
+
+    assert len(texture["palettes"]) == len(texture_map.textures)
+    for palette, built in enumerate(texture_map.textures):
+        assert to_rgba(texture, palette).tobytes() == bytes(built["data"])
+
+
+def test_rejected_input(tmp_path):
+    indices, palettes = random_indexed(np.random.default_rng(5), 16, width=15)
+    with pytest.raises(ValueError, match="even width"):
+        write_texture(str(tmp_path / "odd.vstex"), 15, 8, indices=indices, palettes=palettes)
+
+    with pytest.raises(ValueError, match="Unknown texture compression"):
+        write_texture(str(tmp_path / "t.vstex"), 1, 1, rgba=bytes(4), compression="bz2")
+
+    with pytest.raises(ValueError, match="Buffer size mismatch"):
+        write_texture(str(tmp_path / "t.vstex"), 2, 2, rgba=bytes(4))
+
+    not_a_texture = tmp_path / "t.png"
+    not_a_texture.write_bytes(bytes(64))
+    with pytest.raises(ValueError, match="not a texture container"):
+        read_texture(str(not_a_texture))
+
+
+def test_lz4_round_trip(tmp_path):
+    pytest.importorskip("lz4.frame")
+
+    rgba = np.random.default_rng(6).integers(0, 256, size=(4, 4, 4), dtype=np.uint8)
+    path = write_texture(str(tmp_path / "t.vstex"), 4, 4, rgba=rgba.tobytes(), compression="lz4")
+    assert np.array_equal(read_texture(path)["rgba"], rgba)
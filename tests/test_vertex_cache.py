@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.Reader import Reader
+from src.SEQ import SEQ
+from src.SHP import SHP
+from src.vertex_cache import export_vertex_cache, load_vertex_cache
+from tests.synthetic import seq_bytes, wep_bytes
+
+
+def build_shp(seed, colored=False):
+    shp = SHP(Reader(wep_bytes(seed=seed, colored=colored, num_bones=6, shp=True)))
+    shp.read()
+    shp.build()
+    return shp
+
+
+def reference_triangles(faces):
+    """One face at a time, the way the original per-face build_geometry laid out its indices."""
+    triangles = []
+    iv = 0
+
+    for quad, double in zip(faces.quad.tolist(), faces.double.tolist()):
+        if quad:
+            triangles += [(iv + 2, iv + 1, iv + 0), (iv + 1, iv + 2, iv + 3)]
+            if double:
+                triangles += [(iv + 0, iv + 1, iv + 2), (iv + 3, iv + 2, iv + 1)]
+            iv += 4
+        else:
+            triangles.append((iv + 2, iv + 1, iv + 0))
+            if double:
+                triangles.append((iv + 0, iv + 1, iv + 2))
+            iv += 3
+
+    return np.array(triangles, dtype=np.int64).reshape(-1, 3), iv
+
+
+@pytest.mark.parametrize("colored", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_triangles_match_per_face_path(tmp_path, seed, colored):
+    shp = build_shp(seed, colored)
+    seq = SEQ(Reader(seq_bytes(seed=seed, num_bones=6)))
+    seq.read()
+    seq.build()
+
+    manifest = export_vertex_cache(shp, [seq.animations[0]], str(tmp_path / "cache.json"))
+    cache = load_vertex_cache(str(tmp_path / "cache.json"))
+
+    expected, num_corners = reference_triangles(shp.faces)
+    assert shp.faces.double.any() and (~shp.faces.double).any()
+
+    assert cache["indices"].dtype == np.uint16
+    assert cache["indices"].tolist() == expected.tolist()
+    assert manifest["triangles"] == len(expected)
+    assert manifest["vertices"] == num_corners
+
+    positions = cache["animations"][0]["positions"]
+    assert positions.shape[1:] == (num_corners, 3)
+    assert len(cache["uvs"]) == len(cache["colors"]) == num_corners
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.VSTOOLS import reduce_keys, weld
+
+
+def greedy_keys(values, tolerance):
+    """Reference reduction, one candidate segment at a time."""
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    n = len(values)
+
+    def fits(a, c):
+        t = (np.arange(a + 1, c) - a) / (c - a)
+        line = values[a] + t[:, None] * (values[c] - values[a])
+        return np.all(np.abs(line - values[a + 1:c]) <= tolerance)
+
+    keep = [0]
+    while keep[-1] < n - 1:
+        b = keep[-1] + 1
+        while b + 1 < n and fits(keep[-1], b + 1):
+            b += 1
+        keep.append(b)
+    return keep
+
+
+def tuple_weld(rows):
+    """Reference weld, a dict of row tuples in first-seen order."""
+    seen = {}
+    first = []
+    index = []
+    for i, row in enumerate(rows):
+        key = tuple(np.ravel(row).tolist())
+        if key not in seen:
+            seen[key] = len(first)
+            first.append(i)
+        index.append(seen[key])
+    return first, index
+
+
+def curves():
+    rng = np.random.default_rng(0)
+    yield np.sin(np.linspace(0.0, 12.0, 200))
+    yield np.linspace(0.0, 1.0, 150)[:, None] ** 2 * (1.0, -2.0, 0.5)
+    yield rng.normal(size=(120, 3)).cumsum(axis=0)
+    yield np.repeat(rng.normal(size=(20, 2)), 7, axis=0)
+    yield rng.normal(size=90)
+
+
+@pytest.mark.parametrize("tolerance", [1e-3, 0.05, 0.5])
+def test_reduce_keys_matches_greedy_reference(tolerance):
+    for values in curves():
+        assert reduce_keys(values, tolerance).tolist() == greedy_keys(values, tolerance)
+
+
+@pytest.mark.parametrize("tolerance", [1e-3, 0.05, 0.5])
+def test_dropped_frames_stay_within_tolerance(tolerance):
+    for values in curves():
+        values = values.reshape(len(values), -1)
+        keep = reduce_keys(values, tolerance)
+
+        assert keep[0] == 0 and keep[-1] == len(values) - 1
+        frames = np.arange(len(values))
+        for channel in values.T:
+            rebuilt = np.interp(frames, keep, channel[keep])
+            assert np.max(np.abs(rebuilt - channel)) <= tolerance + 1e-12
+
+
+def test_reduce_keys_edge_cases():
+    assert reduce_keys(np.zeros(0), 0.1).tolist() == []
+    assert reduce_keys(np.zeros((0, 3)), 0.1).tolist() == []
+    assert reduce_keys([1.0], 0.1).tolist() == [0]
+    assert reduce_keys([1.0, 5.0], 0.1).tolist() == [0, 1]
+
+    # constant curves keep one key, None keeps every frame
+    assert reduce_keys(np.full((30, 3), 2.5), 1e-6).tolist() == [0]
+    assert reduce_keys(np.arange(10.0), None).tolist() == list(range(10))
+    assert reduce_keys(np.arange(10.0), 1e-9).tolist() == [0, 9]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.int64])
+def test_weld_matches_tuple_dict(dtype):
+    rng = np.random.default_rng(2)
+    # few distinct values so plenty of rows repeat
+    rows = rng.integers(0, 3, size=(500, 2, 3)).astype(dtype)
+
+    first, index = weld(rows)
+    expected_first, expected_index = tuple_weld(rows)
+
+    assert first.tolist() == expected_first
+    assert index.tolist() == expected_index
+    assert np.array_equal(rows[first][index], rows)
+
+
+def test_weld_unique_rows_keep_their_order():
+    rows = np.arange(12.0).reshape(4, 3)[::-1]
+    first, index = weld(rows)
+    assert first.tolist() == [0, 1, 2, 3]
+    assert index.tolist() == [0, 1, 2, 3]
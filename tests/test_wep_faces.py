@@ -0,0 +1,111 @@
+import struct
+
+import numpy as np
+import pytest
+
+from src.Reader import Reader
+from src.WEP import WEP
+from src.WEP_classes import FACE_LAYOUTS, WEPFaces
+from tests.synthetic import wep_bytes
+
+
+def read_wep(data):
+    wep = WEP(Reader(data))
+    wep.read()
+    return wep
+
+
+def reference_faces(data, pos, num, colored):
+    """One record at a time with struct, the way the original per-face reader walked them."""
+    faces = []
+
+    for _ in range(num):
+        if not colored:
+            quad = data[pos] == 0x2C
+            n = 4 if quad else 3
+            vertices = struct.unpack_from("<" + "H" * n, data, pos + 4)
+            uvs = data[pos + 4 + 2 * n:pos + 4 + 4 * n]
+            colors = [(0x80, 0x80, 0x80)] * n
+            info = data[pos + 2]
+            pos += 20 if quad else 16
+        else:
+            quad = data[pos + 11] == 0x3C
+            n = 4 if quad else 3
+            vertices = struct.unpack_from("<" + "H" * n, data, pos)
+            colors = [tuple(data[pos + o:pos + o + 3]) for o in (8, 12, 16, 20)[:n]]
+            uv_offsets = (24, 26, 28, 30) if quad else (6, 20, 22)
+            uvs = b"".join(data[pos + o:pos + o + 2] for o in uv_offsets)
+            info = data[pos + 19]
+            pos += 32 if quad else 24
+
+        faces.append({
+            "quad": quad,
+            "vertices": [v // 4 for v in vertices],
+            "uvs": [tuple(uvs[2 * c:2 * c + 2]) for c in range(n)],
+            "colors": colors,
+            "info": info,
+        })
+
+    return faces, pos
+
+
+@pytest.mark.parametrize("colored, version", [(False, 1), (True, 2)])
+def test_face_layout_detected(colored, version):
+    wep = read_wep(wep_bytes(seed=3, colored=colored))
+
+    assert wep.faces.version == version
+    assert wep.version == version
+    assert len(wep.faces) == wep.num_all_polygons
+    assert wep.faces.quad.sum() == wep.num_quads
+
+
+@pytest.mark.parametrize("colored", [False, True])
+@pytest.mark.parametrize("seed", range(4))
+def test_bulk_decode_matches_records(colored, seed):
+    data = wep_bytes(seed=seed, colored=colored)
+    wep = WEP(Reader(data))
+    wep.header()
+    wep.bone_section()
+    wep.group_section()
+    wep.vertex_section()
+
+    start = wep.reader.pos
+    expected, end = reference_faces(data, start, wep.num_all_polygons, colored)
+    wep.face_section()
+    faces = wep.faces
+
+    assert wep.reader.pos == end
+
+    for i, face in enumerate(expected):
+        n = 4 if face["quad"] else 3
+        assert faces.quad[i] == face["quad"]
+        assert faces.info[i] == face["info"]
+        assert faces.double[i] == (face["info"] == 0x05)
+        assert faces.vertices[i, :n].tolist() == face["vertices"]
+        assert [tuple(uv) for uv in faces.uvs[i, :n].tolist()] == face["uvs"]
+        assert [tuple(c) for c in faces.colors[i, :n].tolist()] == face["colors"]
+
+
+def test_record_sizes_cover_every_field():
+    for layout in FACE_LAYOUTS.values():
+        for kind, size in enumerate(layout["record_size"]):
+            offsets = [layout[field][kind] for field in ("type", "size", "info")]
+            for field in ("vertices", "uvs", "colors"):
+                offsets += [o + 1 for o in layout[field][kind] if o is not None]
+            assert max(offsets) < size
+
+
+def test_unknown_face_type():
+    data = np.zeros(64, dtype=np.uint8).tobytes()
+
+    with pytest.raises(ValueError, match="Unknown face type"):
+        WEPFaces(Reader(data)).read(1)
+
+
+def test_no_faces_reads_nothing():
+    # the texture map follows right away, it must not be probed as a face
+    wep = read_wep(wep_bytes(seed=1, num_triangles=0, num_quads=0))
+
+    assert len(wep.faces) == 0
+    assert wep.version == 1
+    assert len(wep.texture_map.palettes) == 7
@@ -3,6 +3,7 @@ import json
 from PySide6.QtCore import QPoint
 from PySide6.QtGui import QFont, QPixmap, QPainter, QColor, QFontMetrics, Qt, QImage, QPainterPath
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QComboBox
+from src.catalogue import describe, filter_items, sort_items
 
 SEED = random.randint(0, 100)
 
@@ -190,6 +191,11 @@ class ArrowComboBase(QWidget):
         super().__init__(parent)
         self.main_widget = parent
 
+        # everything populate() added, sort and filter pick from it
+        self.all_items = None
+        self.sort_key = None
+        self.filter_text = ""
+
         layout = QHBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(4)
@@ -221,6 +227,57 @@ class ArrowComboBase(QWidget):
         if index < self.combo.count() - 1:
             self.combo.setCurrentIndex(index + 1)
 
+    def items(self):
+        return [(self.combo.itemText(i), self.combo.itemData(i)) for i in range(self.combo.count())]
+
+    def catalogue_entry(self, file_name):
+        catalogue = getattr(self.main_widget, 'catalogue', None) or {}
+        return catalogue.get(file_name.upper()) if file_name else None
+
+    def set_tooltips(self):
+        """Shows the header stats of every file the catalogue knows"""
+        for i, (_, file_name) in enumerate(self.items()):
+            entry = self.catalogue_entry(file_name)
+            if entry:
+                self.combo.setItemData(i, describe(entry), Qt.ItemDataRole.ToolTipRole)
+
+    def sort_by(self, key):
+        """Reorders everything after the placeholder item without opening anything"""
+        self.sort_key = key
+        self.refresh()
+
+    def filter_by(self, text):
+        """Hides the files not matching text, see catalogue.filter_items"""
+        self.filter_text = text
+        self.refresh()
+
+    def refresh(self):
+        """Refills the combo with the sorted, filtered items, keeping the selection if it is still listed"""
+        if self.all_items is None:
+            self.all_items = self.items()
+        if not self.all_items:
+            return
+
+        catalogue = getattr(self.main_widget, 'catalogue', None) or {}
+        current = self.combo.currentIndex()
+        current_item = self.items()[current] if current >= 0 else None
+
+        items = self.all_items[1:]
+        if self.filter_text:
+            items = filter_items(items, catalogue, self.filter_text)
+        if self.sort_key:
+            items = sort_items(items, catalogue, self.sort_key, reverse=self.sort_key != 'Name')
+        items = self.all_items[:1] + items
+
+        self.combo.blockSignals(True)
+        self.combo.clear()
+        for text, file_name in items:
+            self.combo.addItem(text, file_name)
+        self.combo.setCurrentIndex(items.index(current_item) if current_item in items else 0)
+        self.combo.blockSignals(False)
+
+        self.set_tooltips()
+
     # ---- hooks for subclasses ----
 
     def populate(self):
@@ -243,7 +300,9 @@ class WeaponSelector(ArrowComboBase):
         self.populate()
 
     def populate(self):
-        self.combo.addItems(self.weapons_name.keys())
+        for name, weapon_id in self.weapons_name.items():
+            self.combo.addItem(name, "{}.WEP".format(weapon_id) if weapon_id else None)
+        self.set_tooltips()
 
     def on_changed(self, index):
         current_weapon = self.combo.currentText()
@@ -299,10 +358,12 @@ class CharacterSelector(ArrowComboBase):
         self.populate()
 
     def populate(self):
-        self.combo.addItems(self.characters_data.values())
+        for file_name, name in self.characters_data.items():
+            self.combo.addItem(name, file_name)
+        self.set_tooltips()
 
     def on_changed(self, index):
         current_character = self.combo.currentText()
         if '?????' not in current_character:
-            character_path = "VagrantStory_data/OBJ/{}".format([x for x in self.characters_data if self.characters_data[x]== current_character][0])
+            character_path = "VagrantStory_data/OBJ/{}".format(self.combo.currentData())
             self.main_widget.open_shp(character_path, autoload_anim=True)
\ No newline at end of file